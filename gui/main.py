@@ -6,7 +6,6 @@ import time
 from tkinter import Tk, Canvas, Frame, BOTH
 
 import pyVor.primitives
-import pyVor.utils
 import pyVor.structures
 
 
@@ -93,10 +92,8 @@ class TriangulationGUI(Frame):
         for vert in face.vertices:
             if vert.point[2] == 0:
                 return
-        center = pyVor.utils.circumcenter(
-            *[vert.point for vert in face.vertices])
-        face_point = next(iter(face.vertices)).point
-        distance = float((face_point - center).norm_squared()) ** .5
+        center = face.circumcenter()
+        distance = face.circumradius_squared() ** .5
         self.canvas.create_oval(center[0] - distance, center[1] - distance,
                                 center[0] + distance, center[1] + distance,
                                 outline=color, dash=(5,), tag="circle")
@@ -142,7 +139,10 @@ class TriangulationGUI(Frame):
 
     def draw_voronoi(self):
         """Draws the voronoi diagram"""
-        self.voronoi = pyVor.structures.Voronoi(self.delt)
+        # It follows the triangulation from then on, so later clicks only
+        # pay for the faces they change
+        if self.voronoi is None:
+            self.voronoi = pyVor.structures.Voronoi(self.delt, follow=True)
         for point in self.voronoi.points:
             self.add_point(point, color="red", tag="voronoipoint")
 
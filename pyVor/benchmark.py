@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+"""Benchmarks for the triangulation code.
+
+Run as `python3 -m pyVor.benchmark <benchmark> [options]`, and see --help for
+the options. Everything is pure python, so the larger sizes take a while.
+"""
+
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+
+from pyVor.ordering import ORDERS
+from pyVor.primitives import Point
+from pyVor.structures import DelaunayTriangulation as DelT
+from pyVor.mesh import ArrayDelaunayTriangulation as ArrayDelT
+
+ENGINES = {'object': DelT, 'array': ArrayDelT}
+
+
+def random_points(count, dimension, seed=0):
+    """Uniformly random points in the unit cube, as Points"""
+    rand = random.Random(seed)
+    return [Point(*(rand.random() for i in range(dimension)))
+            for j in range(count)]
+
+
+def timed(function, *args, **kwargs):
+    """Call function, returning its result and the seconds it took"""
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def mean_walk_length(del_tri, queries):
+    """Average number of faces visited to locate each query point"""
+    total = 0
+    for query in queries:
+        del_tri.locate(query.lift(lambda x: 1))
+        total += del_tri.walk_length
+    return total / len(queries)
+
+
+def counting_walks(engine):
+    """Subclass of engine that adds up walk_length over all insertions"""
+    class Counting(engine):
+        def delaunay_add(self, *args, **kwargs):
+            vertex = super().delaunay_add(*args, **kwargs)
+            self.total_walk_length = (getattr(self, 'total_walk_length', 0) +
+                                      self.walk_length)
+            return vertex
+    return Counting
+
+
+def bench_insertion(sizes, dimensions=(2, 3, 4), seed=0):
+    """Construction time of each insertion algorithm in each dimension
+
+    'array' is the Bowyer-Watson insertion of ArrayDelaunayTriangulation.
+    """
+    builders = [(insertion, DelT, insertion) for insertion in DelT.INSERTIONS]
+    builders.append(('array', ArrayDelT, 'bowyer-watson'))
+    print('{:>5} {:>9} {:>14} {:>10}'.format('dim', 'points', 'insertion',
+                                             'build s'))
+    for dimension in dimensions:
+        for size in sizes:
+            points = random_points(size, dimension, seed)
+            for name, engine, insertion in builders:
+                seconds = timed(engine, points, homogeneous=False,
+                                seed=seed, insertion=insertion)[1]
+                print('{:>5} {:>9} {:>14} {:>10.2f}'.format(
+                    dimension, size, name, seconds))
+
+
+def bench_order(sizes, dimension=2, engine='array', seed=0):
+    """Construction time and walk length for each insertion order"""
+    print('{:>9} {:>8} {:>10} {:>10}'.format('points', 'order', 'build s',
+                                             'walk'))
+    counting = counting_walks(ENGINES[engine])
+    for size in sizes:
+        points = random_points(size, dimension, seed)
+        for order in ORDERS[1:]:
+            del_tri, seconds = timed(counting, points, homogeneous=False,
+                                     order=order, seed=seed)
+            print('{:>9} {:>8} {:>10.2f} {:>10.1f}'.format(
+                size, order, seconds, del_tri.total_walk_length / size))
+
+
+def bench_locate(sizes, dimension=2, queries=1000, engine='array', seed=0):
+    """Point location cost with and without a Delaunay hierarchy
+
+    The queries are random, so without the hierarchy each one walks about
+    n^(1/d) faces from wherever the last one ended up. With it, the cost
+    should grow like log n.
+    """
+    print('{:>9} {:>7} {:>10} {:>10} {:>10} {:>10}'.format(
+        'points', 'levels', 'build s', 'walk', 'plain s', 'plain walk'))
+    query_points = random_points(queries, dimension, seed + 1)
+    for size in sizes:
+        points = random_points(size, dimension, seed)
+        row = [size]
+        for hierarchy in (True, False):
+            del_tri, seconds = timed(ENGINES[engine], points,
+                                     homogeneous=False, hierarchy=hierarchy)
+            if hierarchy:
+                row.append(len(del_tri._levels))
+            row += [seconds, mean_walk_length(del_tri, query_points)]
+        print('{:>9} {:>7} {:>10.2f} {:>10.1f} {:>10.2f} {:>10.1f}'.format(
+            *row))
+
+
+def bench_parallel(sizes, dimension=2, workers=None, seed=0):
+    """Construction time of ArrayDelaunayTriangulation.from_array against
+    the number of worker processes
+
+    workers defaults to 1, 2, 4, ... up to the number of CPUs. The speedup
+    is relative to the sequential build.
+    """
+    if not workers:
+        count = os.cpu_count() or 1
+        workers = [2 ** k for k in range(count.bit_length())
+                   if 2 ** k <= count]
+    print('{:>9} {:>8} {:>10} {:>8}'.format('points', 'workers', 'build s',
+                                            'speedup'))
+    for size in sizes:
+        arr = np.random.RandomState(seed).uniform(0, 1, (size, dimension))
+        sequential = timed(ArrayDelT.from_array, arr, seed=seed)[1]
+        print('{:>9} {:>8} {:>10.2f} {:>8.2f}'.format(
+            size, '-', sequential, 1))
+        for count in workers:
+            seconds = timed(ArrayDelT.from_array, arr, workers=count,
+                            seed=seed)[1]
+            print('{:>9} {:>8} {:>10.2f} {:>8.2f}'.format(
+                size, count, seconds, sequential / seconds))
+
+
+def main():
+    """See argument parser or output of --help"""
+    parser = argparse.ArgumentParser(description="Benchmark pyVor.")
+    subparsers = parser.add_subparsers(dest='benchmark')
+    subparsers.required = True
+    locate = subparsers.add_parser(
+        'locate', help="Point location with and without a hierarchy.")
+    locate.add_argument('-n', '--sizes', type=int, nargs='+',
+                        default=[1000, 10000, 100000],
+                        help="Numbers of points to triangulate.")
+    locate.add_argument('-d', '--dimension', type=int, default=2)
+    locate.add_argument('-q', '--queries', type=int, default=1000)
+    locate.add_argument('-e', '--engine', choices=sorted(ENGINES),
+                        default='array')
+    locate.add_argument('-s', '--seed', type=int, default=0)
+    order = subparsers.add_parser(
+        'order', help="Construction with each insertion order.")
+    order.add_argument('-n', '--sizes', type=int, nargs='+',
+                       default=[1000, 10000, 100000],
+                       help="Numbers of points to triangulate.")
+    order.add_argument('-d', '--dimension', type=int, default=2)
+    order.add_argument('-e', '--engine', choices=sorted(ENGINES),
+                       default='array')
+    order.add_argument('-s', '--seed', type=int, default=0)
+    insertion = subparsers.add_parser(
+        'insertion', help="Construction with each insertion algorithm.")
+    insertion.add_argument('-n', '--sizes', type=int, nargs='+',
+                           default=[100, 1000],
+                           help="Numbers of points to triangulate.")
+    insertion.add_argument('-d', '--dimensions', type=int, nargs='+',
+                           default=[2, 3, 4])
+    insertion.add_argument('-s', '--seed', type=int, default=0)
+    parallel = subparsers.add_parser(
+        'parallel', help="Construction with several worker processes.")
+    parallel.add_argument('-n', '--sizes', type=int, nargs='+',
+                          default=[10000, 100000],
+                          help="Numbers of points to triangulate.")
+    parallel.add_argument('-d', '--dimension', type=int, default=2)
+    parallel.add_argument('-w', '--workers', type=int, nargs='+',
+                          help="Numbers of processes (default: powers of "
+                          "two up to the number of CPUs).")
+    parallel.add_argument('-s', '--seed', type=int, default=0)
+    args = parser.parse_args()
+    if args.benchmark == 'locate':
+        bench_locate(args.sizes, args.dimension, args.queries, args.engine,
+                     args.seed)
+    elif args.benchmark == 'order':
+        bench_order(args.sizes, args.dimension, args.engine, args.seed)
+    elif args.benchmark == 'insertion':
+        bench_insertion(args.sizes, args.dimensions, args.seed)
+    elif args.benchmark == 'parallel':
+        bench_parallel(args.sizes, args.dimension, args.workers, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Writing triangulations out as indexed simplices.
+
+A triangulation goes out as the (m, d+1) array of simplex_indices: each row is
+a simplex, as the rows of the input its vertices came from. The formats are
+
+text: a simplex per line, the indices separated by spaces
+npy: the array itself, as a .npy file of int64
+off, ply: a mesh for viewers, with the input points as the vertices (2D ones
+    get z = 0). These are made of polygons, so in 3D the faces are the
+    triangles of the tetrahedra, each one once. PLY files are binary.
+
+Everything is written CHUNK_ROWS rows at a time, so the formatted output is
+never all in memory at once.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+FORMATS = ('text', 'npy', 'off', 'ply')
+# File extensions for the formats, when no format is given
+EXTENSIONS = {'.npy': 'npy', '.off': 'off', '.ply': 'ply'}
+CHUNK_ROWS = 1 << 16
+
+
+def _chunks(arr, chunk):
+    """Consecutive slices of the rows of arr"""
+    for start in range(0, len(arr), chunk):
+        yield arr[start:start + chunk]
+
+
+def _triangles(simplices):
+    """The faces of a mesh of the simplices: triangles in 2D, and the
+    distinct facets of the tetrahedra in 3D
+    """
+    if simplices.shape[1] == 3:
+        return simplices
+    if simplices.shape[1] != 4:
+        raise ValueError("OFF and PLY are only for 2D and 3D")
+    facets = simplices[:, [[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]]]
+    facets = facets.reshape(-1, 3)
+    first = np.unique(np.sort(facets, axis=1), axis=0, return_index=True)[1]
+    return facets[np.sort(first)]
+
+
+def _vertices(points):
+    """The points as (n, 3) coordinates for a mesh"""
+    points = np.asarray(points, dtype=float)
+    if points.shape[1] == 2:
+        return np.hstack([points, np.zeros((len(points), 1))])
+    return points
+
+
+def _write_text(out, simplices, chunk):
+    for rows in _chunks(simplices, chunk):
+        np.savetxt(out, rows, fmt='%d')
+
+
+def _write_npy(out, simplices, chunk):
+    np.lib.format.write_array_header_1_0(out, {
+        'descr': np.lib.format.dtype_to_descr(np.dtype('<i8')),
+        'fortran_order': False, 'shape': simplices.shape})
+    for rows in _chunks(simplices, chunk):
+        out.write(rows.astype('<i8').tobytes())
+
+
+def _write_off(out, simplices, points, chunk):
+    triangles = _triangles(simplices)
+    out.write('OFF\n{} {} 0\n'.format(len(points), len(triangles)).encode())
+    for rows in _chunks(points, chunk):
+        np.savetxt(out, _vertices(rows), fmt='%.17g')
+    for rows in _chunks(triangles, chunk):
+        np.savetxt(out, np.hstack([np.full((len(rows), 1), 3), rows]),
+                   fmt='%d')
+
+
+def _write_ply(out, simplices, points, chunk):
+    triangles = _triangles(simplices)
+    out.write('\n'.join([
+        'ply', 'format binary_little_endian 1.0',
+        'element vertex {}'.format(len(points)),
+        'property double x', 'property double y', 'property double z',
+        'element face {}'.format(len(triangles)),
+        'property list uchar int vertex_indices', 'end_header', '']).encode())
+    for rows in _chunks(points, chunk):
+        out.write(_vertices(rows).astype('<f8').tobytes())
+    face = np.dtype([('count', 'u1'), ('vertices', '<i4', (3,))])
+    for rows in _chunks(triangles, chunk):
+        faces = np.empty(len(rows), dtype=face)
+        faces['count'] = 3
+        faces['vertices'] = rows
+        out.write(faces.tobytes())
+
+
+def format_for(path):
+    """The format for a file name, going by its extension"""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), 'text')
+
+
+def write_simplices(out, simplices, points=None, format=None,
+                    chunk=CHUNK_ROWS):
+    """Write simplices (say, from simplex_indices) in one of FORMATS
+
+    out is a file name, '-' for stdout, or a file opened in binary mode.
+    format is guessed from the file name if it is not given. points are
+    the (n, d) cartesian input the indices refer to, which off and ply
+    need for their vertices.
+    """
+    simplices = np.asarray(simplices)
+    if format is None:
+        format = format_for(out) if isinstance(out, str) else 'text'
+    if format not in FORMATS:
+        raise ValueError("format must be one of {}, not {!r}".format(
+            ', '.join(FORMATS), format))
+    if format in ('off', 'ply') and points is None:
+        raise ValueError("{} output needs the points".format(format))
+    if isinstance(out, str):
+        if out == '-':
+            write_simplices(sys.stdout.buffer, simplices, points, format,
+                            chunk)
+            sys.stdout.buffer.flush()
+            return
+        with open(out, 'wb') as opened:
+            write_simplices(opened, simplices, points, format, chunk)
+        return
+    if format == 'text':
+        _write_text(out, simplices, chunk)
+    elif format == 'npy':
+        _write_npy(out, simplices, chunk)
+    elif format == 'off':
+        _write_off(out, simplices, points, chunk)
+    else:
+        _write_ply(out, simplices, points, chunk)
@@ -0,0 +1,166 @@
+"""
+Interpolation of values given at the sites of a triangulation.
+
+The values are indexed like the input the triangulation was built from (see
+DelaunayTriangulation.from_array and simplex_indices): values[i] belongs to
+row i of the input. Each function takes a whole (q, d) array of queries and
+answers them in order along a Hilbert curve, so that each point location
+starts next to the last one. The answer is a (q,) array for a (n,) array of
+values, and (q, k) for (n, k).
+
+Queries outside of the convex hull of the sites get nan, or with
+outside='nearest' the value at the nearest site.
+"""
+
+import numpy as np
+
+from pyVor.ordering import hilbert_keys
+from pyVor.primitives import Point
+from pyVor.utils import voronoi_pieces
+
+OUTSIDE = ('nan', 'nearest')
+
+
+def _query_order(queries):
+    """The order to answer the rows of queries in (see the module docstring)"""
+    if len(queries) < 2:
+        return np.arange(len(queries))
+    return np.argsort(hilbert_keys(queries), kind='stable')
+
+
+def _located(triangulation, queries, conflict=False):
+    """Run _query_faces for each row of queries, in a coherent order
+
+    Returns, for the queries in their original order, a list of the input
+    index arrays and a list of the coordinate arrays.
+    """
+    indices = [None] * len(queries)
+    coords = [None] * len(queries)
+    hint = None
+    for row in _query_order(queries):
+        query = Point(*queries[row], 1)
+        indices[row], coords[row], hint = triangulation._query_faces(
+            query, hint, conflict)
+    return indices, coords
+
+
+def _finish(triangulation, values, queries, result, outside):
+    """Fill the queries outside of the hull (rows of nan) by policy"""
+    missing = np.isnan(result).any(axis=1)
+    if outside == 'nearest' and missing.any():
+        nearest = triangulation.nearest_vertices(queries[missing])
+        filled = np.full((len(nearest), values.shape[1]), np.nan)
+        filled[nearest >= 0] = values[nearest[nearest >= 0]]
+        result[missing] = filled
+    return result
+
+
+def _check(values, queries, outside):
+    """Validate the arguments, and return values as (n, k) and queries as
+    (q, d) float arrays
+    """
+    if outside not in OUTSIDE:
+        raise ValueError("outside must be one of {}, not {!r}".format(
+            ', '.join(OUTSIDE), outside))
+    values = np.asarray(values, dtype=float)
+    queries = np.asarray(queries, dtype=float)
+    return values.reshape(len(values), -1), queries.reshape(len(queries), -1)
+
+
+def barycentric(triangulation, values, queries, outside='nan'):
+    """Piecewise linear interpolation over the faces of the triangulation
+
+    Each query gets the combination of the values at the corners of the
+    face containing it, weighted by its barycentric coordinates. The
+    coordinates for all of the queries come from one batched solve.
+    """
+    shape = np.shape(values)[1:]
+    values, queries = _check(values, queries, outside)
+    indices, coords = _located(triangulation, queries)
+    indices = np.concatenate(indices).reshape(len(queries), -1)
+    coords = np.concatenate(coords).reshape(
+        (len(queries),) + (indices.shape[1],) * 2)
+    inside = (indices >= 0).all(axis=1) & (coords[:, :, -1] != 0).all(axis=1)
+    result = np.full((len(queries), values.shape[1]), np.nan)
+    if inside.any():
+        # The columns are the corners, so the last row makes the weights
+        # add up to 1
+        weights = np.linalg.solve(
+            coords[inside].transpose(0, 2, 1),
+            np.hstack([queries[inside], np.ones((inside.sum(), 1))]))
+        result[inside] = np.einsum('qi,qik->qk', weights,
+                                   values[indices[inside]])
+    result = _finish(triangulation, values, queries, result, outside)
+    return result.reshape((len(queries),) + shape)
+
+
+def sibson(triangulation, values, queries, outside='nan'):
+    """Natural neighbor interpolation (Sibson, 1981)
+
+    The weight of each site is the share of the Voronoi cell a query would
+    get if it was inserted that it would take from the cell of that site.
+    Only the faces whose circumspheres contain the query change, so the
+    shares are the pieces of cells (see utils.voronoi_pieces) of those
+    faces, less the pieces of the faces that would replace them. The pieces
+    for all of the queries are computed together.
+    """
+    shape = np.shape(values)[1:]
+    values, queries = _check(values, queries, outside)
+    dimension = queries.shape[1]
+    result = np.full((len(queries), values.shape[1]), np.nan)
+    # Queries right on a site get its value (their hole would be flat)
+    on_site = {}
+    for row in range(len(queries)):
+        vertex = triangulation.point_index.find(np.append(queries[row], 1.0))
+        if vertex is not None:
+            on_site[row] = triangulation._input_indices([vertex])[0]
+    for row, index in on_site.items():
+        if index >= 0:
+            result[row] = values[index]
+    indices, coords = _located(triangulation, queries, conflict=True)
+    inside = [row not in on_site and (rows >= 0).all() and
+              (points[:, :, -1] != 0).all()
+              for row, (rows, points) in enumerate(zip(indices, coords))]
+    if any(inside):
+        query = np.flatnonzero(inside)
+        counts = [len(indices[row]) for row in query]
+        old = np.concatenate([indices[row] for row in query])
+        corners = np.concatenate([coords[row] for row in query])[:, :, :-1]
+        owner = np.repeat(query, counts)
+        # The facets on the boundary of the hole are the ones that only
+        # one of the old faces has
+        ends = np.cumsum(counts)
+        facets = []
+        for start, end in zip(ends - counts, ends):
+            seen = {}
+            for face in range(start, end):
+                for k in range(dimension + 1):
+                    key = frozenset(np.delete(old[face], k).tolist())
+                    seen[key] = None if key in seen else (face, k)
+            facets += [place for place in seen.values() if place]
+        face, k = np.array(facets, dtype=np.int64).reshape(-1, 2).T
+        # The new faces are those facets with the query point in place of k
+        new = old[face]
+        new_corners = corners[face]
+        new_corners[np.arange(len(face)), k] = queries[owner[face]]
+        new[np.arange(len(face)), k] = -1
+        old_volumes = voronoi_pieces(corners)[0]
+        new_volumes = voronoi_pieces(new_corners)[0]
+        site = np.concatenate([old.ravel(), new.ravel()])
+        stolen = np.concatenate([old_volumes.ravel(), -new_volumes.ravel()])
+        owners = np.concatenate([
+            np.repeat(owner, dimension + 1),
+            np.repeat(owner[face], dimension + 1)])
+        keep = site >= 0
+        pairs, which = np.unique(np.stack([owners[keep], site[keep]]),
+                                 axis=1, return_inverse=True)
+        which = which.ravel()
+        stolen = np.bincount(which, stolen[keep], minlength=pairs.shape[1])
+        total = np.bincount(pairs[0], stolen, minlength=len(queries))
+        weights = stolen / total[pairs[0]]
+        for column in range(values.shape[1]):
+            result[query, column] = np.bincount(
+                pairs[0], weights * values[pairs[1], column],
+                minlength=len(queries))[query]
+    result = _finish(triangulation, values, queries, result, outside)
+    return result.reshape((len(queries),) + shape)
@@ -0,0 +1,872 @@
+#!/usr/bin/env python3
+
+"""Array-backed storage for Delaunay triangulations.
+
+DelaunayTriangulation keeps its simplicial complex as a graph of Face,
+HalfFacet and Vertex objects. That is lovely to poke at from the GUI, but
+it costs a few hundred bytes per simplex. The classes here keep the same
+complex in a handful of contiguous numpy arrays instead, and hand out thin
+Face-like views for code that wants the object API.
+"""
+
+from collections.abc import Set
+
+import numpy as np
+
+from pyVor.primitives import Point
+from pyVor.predicates import (ccw, ccw_coords, ccw_many, incircle_coords,
+                              incircle_many)
+from pyVor.structures import DelaunayTriangulation, outer_face_pts
+from pyVor.utils import circumcenters
+
+
+def _grow(array, length, fill):
+    """Return array with at least length rows, doubling if it must grow."""
+    if length <= len(array):
+        return array
+    bigger = np.full((max(length, 2 * len(array)),) + array.shape[1:], fill,
+                     dtype=array.dtype)
+    bigger[:len(array)] = array
+    return bigger
+
+
+class SimplexMesh:
+    """A simplicial complex in R^d stored as flat arrays.
+
+    coords is an (n, d+1) array of homogeneous vertex coordinates,
+    simplices is an (m, d+1) int32 array of vertex indices, and
+    neighbors[s, i] is the simplex across the facet opposite simplices[s, i]
+    (or -1 if there is none). vertex_simplex[v] is some live simplex
+    containing v (or -1 once v has been removed), and input_index[v] is the
+    position of v in the input the triangulation was built from (or -1).
+
+    The arrays are over-allocated, so only the first num_vertices and
+    num_simplices rows mean anything. Deleted simplices have all their
+    vertices set to -1 and their rows are recycled through a free list.
+    """
+
+    def __init__(self, dimension, capacity=16):
+        width = dimension + 1
+        self.dimension = dimension
+        self.coords = np.zeros((capacity, width))
+        self.simplices = np.full((capacity, width), -1, dtype=np.int32)
+        self.neighbors = np.full((capacity, width), -1, dtype=np.int32)
+        self.vertex_simplex = np.full(capacity, -1, dtype=np.int32)
+        self.input_index = np.full(capacity, -1, dtype=np.int64)
+        self.num_vertices = 0
+        self.num_removed_vertices = 0
+        self.num_simplices = 0
+        self.free = []
+
+    def __len__(self):
+        """The number of live simplices"""
+        return self.num_simplices - len(self.free)
+
+    def add_vertex(self, coords, input_index=-1):
+        """Store a new vertex and return its index"""
+        index = self.num_vertices
+        self.num_vertices += 1
+        self.coords = _grow(self.coords, self.num_vertices, 0)
+        self.vertex_simplex = _grow(self.vertex_simplex, self.num_vertices,
+                                    -1)
+        self.input_index = _grow(self.input_index, self.num_vertices, -1)
+        self.coords[index] = coords
+        self.input_index[index] = input_index
+        return index
+
+    def remove_vertex(self, index):
+        """Mark a vertex as removed. Its row is not reused."""
+        self.vertex_simplex[index] = -1
+        self.num_removed_vertices += 1
+
+    def is_vertex_alive(self, index):
+        """Is the given vertex index in use?"""
+        return (0 <= index < self.num_vertices and
+                self.vertex_simplex[index] >= 0)
+
+    def add_simplex(self, vertices):
+        """Store a new simplex (reusing a free row if possible).
+
+        Returns its index. Neighbors are left at -1 for the caller to link.
+        """
+        if self.free:
+            index = self.free.pop()
+        else:
+            index = self.num_simplices
+            self.num_simplices += 1
+            self.simplices = _grow(self.simplices, self.num_simplices, -1)
+            self.neighbors = _grow(self.neighbors, self.num_simplices, -1)
+        self.simplices[index] = vertices
+        self.neighbors[index] = -1
+        self.vertex_simplex[self.simplices[index]] = index
+        return index
+
+    def remove_simplex(self, index):
+        """Forget a simplex and put its row on the free list"""
+        self.simplices[index] = -1
+        self.neighbors[index] = -1
+        self.free.append(index)
+
+    def is_alive(self, index):
+        """Is the given simplex index in use?"""
+        return (0 <= index < self.num_simplices and
+                self.simplices[index, 0] >= 0)
+
+    def alive(self):
+        """Return the indices of all live simplices as an array"""
+        return np.flatnonzero(self.simplices[:self.num_simplices, 0] >= 0)
+
+    def mirror_index(self, simplex, neighbor):
+        """The position of simplex in the neighbor list of neighbor"""
+        return int(np.flatnonzero(self.neighbors[neighbor] == simplex)[0])
+
+    def link(self, simplex, i, neighbor, j):
+        """Make facet i of simplex and facet j of neighbor twins"""
+        self.neighbors[simplex, i] = neighbor
+        self.neighbors[neighbor, j] = simplex
+
+    def point(self, vertex):
+        """The Point at the given vertex index"""
+        return Point(*self.coords[vertex])
+
+    def points(self, simplex):
+        """The Points of a simplex, in storage order"""
+        return [Point(*row) for row in self.coords[self.simplices[simplex]]]
+
+
+class ArrayDelaunayTriangulation(DelaunayTriangulation):
+    """A DelaunayTriangulation stored in a SimplexMesh.
+
+    Points are inserted with the Bowyer-Watson algorithm: the conflict region
+    of the new point is found with a breadth-first search of incircle tests,
+    deleted, and the boundary of the hole is starred to the new vertex.
+    Every simplex is stored positively oriented, so the orientation of the
+    new simplices comes for free. That is the only insertion algorithm here.
+
+    faces and vertices are read-only views in the style of the object API.
+    Views describe the triangulation at the time they are used, so do not
+    hold on to them across insertions. The GUI visualization hooks are not
+    supported.
+    """
+
+    INSERTIONS = ('bowyer-watson',)
+
+    @classmethod
+    def from_array(cls, arr, homogeneous=False, workers=None, **kwargs):
+        """Construct the delaunay triangulation of the rows of an array
+
+        See DelaunayTriangulation.from_array. With workers, slabs of the
+        input are triangulated in that many processes and then stitched
+        together (see pyVor.parallel). The result is the same as without.
+        """
+        if workers is not None and cls is ArrayDelaunayTriangulation:
+            from pyVor.parallel import build
+            return build(arr, workers, homogeneous, **kwargs)
+        return super().from_array(arr, homogeneous, **kwargs)
+
+    def _setup(self, dimension):
+        """Create a mesh containing just the outer face"""
+        self.mesh = SimplexMesh(dimension)
+        outer = [self.mesh.add_vertex(list(pt))
+                 for pt in outer_face_pts(dimension)]
+        if ccw(*outer_face_pts(dimension)) < 0:
+            outer[0], outer[1] = outer[1], outer[0]
+        self._last_simplex = self.mesh.add_simplex(outer)
+        self.facets = set()
+
+    @property
+    def faces(self):
+        """A set-like view of the faces of the triangulation"""
+        return FaceSet(self)
+
+    @property
+    def vertices(self):
+        """A set-like view of the vertices of the triangulation"""
+        return VertexSet(self)
+
+    @property
+    def point_history(self):
+        """The points inserted so far, in order (made on demand)"""
+        mesh = self.mesh
+        return [mesh.point(vertex) for vertex in
+                range(mesh.dimension + 1, mesh.num_vertices)
+                if mesh.vertex_simplex[vertex] >= 0]
+
+    def delaunay_add(self, point, homogeneous=True, hint=None, index=None):
+        """Add a point and then recover the delaunay property
+
+        Returns a view of the new vertex, or of the existing one if the
+        point is a duplicate. hint is passed on to locate, and index is
+        recorded as the input index of the new vertex.
+        """
+        if homogeneous is False:
+            point = point.lift(lambda x: 1)
+        return VertexView(self, self._add_coords(
+            point.to_array().astype(float), hint, index, point))
+
+    def _add_input(self, coords, index, point=None):
+        """Add row index of the input, with coordinates coords"""
+        self._add_coords(coords, index=index, point=point)
+
+    def _add_coords(self, coords, hint=None, index=None, point=None):
+        """Insert homogeneous coordinates, returning the vertex index
+
+        A Point is only made (if point is None) when there is a hierarchy
+        to keep up to date.
+        """
+        existing = self.point_index.find(coords)
+        if existing is not None:
+            return existing
+        if point is None and self.hierarchy:
+            point = Point(*coords)
+        located = []
+        if hint is None and len(self._levels) > 1:
+            located, hint, _ = self._descend(point)
+        coords = coords.tolist()
+        start = self._locate(coords, hint)
+        boundary = self._cavity_boundary(start, coords)
+        vertex = self.mesh.add_vertex(coords, -1 if index is None else index)
+        new = self._star(boundary, vertex)
+        self._last_simplex = new[-1]
+        self.point_index.add(coords, vertex)
+        if self._listeners:
+            self._notify('faces_born', self._views(new))
+        if self.hierarchy:
+            self._promote(point, located)
+        return vertex
+
+    def _in_conflict(self, simplex, coords):
+        """Is the point inside the circumsphere of the simplex?"""
+        mesh = self.mesh
+        rows = mesh.coords[mesh.simplices[simplex]].tolist()
+        return incircle_coords(*rows, coords) > 0
+
+    def _cavity_boundary(self, start, coords):
+        """Delete the simplices in conflict with coords.
+
+        Returns (vertices, i, outside, j) for every facet on the boundary of
+        the hole, where vertices are those of the deleted simplex, i is the
+        position opposite the facet, and j is the position of the deleted
+        simplex in the neighbor list of outside (if there is an outside).
+        """
+        conflict, boundary = self._conflict_region(start, coords)
+        if self._listeners:
+            self._notify('faces_died', self._views(conflict))
+        for simplex in conflict:
+            self.mesh.remove_simplex(simplex)
+        return boundary
+
+    def _conflict_region(self, start, coords):
+        """The simplices in conflict with coords, and their boundary
+
+        See _cavity_boundary, which this does the searching for.
+        """
+        mesh = self.mesh
+        conflict = {start: True}
+        stack = [start]
+        boundary = []
+        while stack:
+            simplex = stack.pop()
+            for i, neighbor in enumerate(mesh.neighbors[simplex].tolist()):
+                if neighbor >= 0 and neighbor not in conflict:
+                    conflict[neighbor] = self._in_conflict(neighbor, coords)
+                    if conflict[neighbor]:
+                        stack.append(neighbor)
+                if neighbor < 0:
+                    boundary.append((mesh.simplices[simplex].copy(), i,
+                                     neighbor, -1))
+                elif not conflict[neighbor]:
+                    boundary.append((mesh.simplices[simplex].copy(), i,
+                                     neighbor,
+                                     mesh.mirror_index(simplex, neighbor)))
+        return ([simplex for simplex, doomed in conflict.items() if doomed],
+                boundary)
+
+    def delaunay_remove(self, point, homogeneous=True):
+        """Remove the vertex at point, and re-triangulate the hole it leaves
+
+        See DelaunayTriangulation.delaunay_remove. Returns a view of the
+        removed vertex, which keeps its coordinates but is no longer in
+        vertices.
+        """
+        if homogeneous is False:
+            point = point.lift(lambda x: 1)
+        vertex = self.point_index.find(point.to_array())
+        if vertex is None:
+            raise KeyError(point)
+        mesh = self.mesh
+        star = self._star_of(vertex)
+        # What is on the other side of each facet of the hole
+        outside = {}
+        for simplex in star:
+            vertices = mesh.simplices[simplex].tolist()
+            i = vertices.index(vertex)
+            neighbor = int(mesh.neighbors[simplex, i])
+            outside[frozenset(vertices[:i] + vertices[i + 1:])] = (
+                neighbor,
+                -1 if neighbor < 0 else mesh.mirror_index(simplex, neighbor))
+        link = set(mesh.simplices[star].ravel().tolist())
+        link.discard(vertex)
+        # The scratch triangulation numbers its outer vertices like ours
+        finite = sorted(vert for vert in link if vert > mesh.dimension)
+        scratch = self._empty_like()
+        for vert in finite:
+            scratch._add_coords(mesh.coords[vert])
+        to_ours = np.array(list(range(mesh.dimension + 1)) + finite)
+        coords = mesh.coords[vertex].tolist()
+        conflict = scratch._conflict_region(scratch._locate(coords),
+                                            coords)[0]
+        if self._listeners:
+            self._notify('faces_died', self._views(star))
+        for simplex in star:
+            mesh.remove_simplex(simplex)
+        ridges = {}
+        new = []
+        for old in conflict:
+            vertices = to_ours[scratch.mesh.simplices[old]].tolist()
+            simplex = mesh.add_simplex(vertices)
+            new.append(simplex)
+            for k in range(len(vertices)):
+                ridge = frozenset(vertices[:k] + vertices[k + 1:])
+                if ridge in outside:
+                    neighbor, j = outside[ridge]
+                    if neighbor >= 0:
+                        mesh.link(simplex, k, neighbor, j)
+                elif ridge in ridges:
+                    mesh.link(simplex, k, *ridges.pop(ridge))
+                else:
+                    ridges[ridge] = (simplex, k)
+        self._last_simplex = simplex
+        if self._listeners:
+            self._notify('faces_born', self._views(new))
+        mesh.remove_vertex(vertex)
+        self.point_index.remove(coords)
+        for level in self._levels[1:]:
+            if level.point_index.find(coords) is not None:
+                level.delaunay_remove(Point(*coords))
+        return VertexView(self, vertex)
+
+    def _move_in_place(self, vertex, old_point, new_point):
+        """Move vertex to new_point without changing the combinatorics
+
+        See DelaunayTriangulation._move_in_place.
+        """
+        mesh = self.mesh
+        star = np.array(self._star_of(vertex))
+        coords = new_point.to_array().astype(float)
+        simplices = mesh.simplices[star]
+        rows = mesh.coords[simplices]
+        rows[simplices == vertex] = coords
+        if (ccw_many(rows) != 1).any():
+            return None
+        # Test each facet of the star against the vertex across it
+        neighbors = mesh.neighbors[star]
+        simplex, i = np.nonzero(neighbors >= 0)
+        across = neighbors[simplex, i]
+        mirror = np.argmax(mesh.neighbors[across] == star[simplex, None],
+                           axis=1)
+        opposite = mesh.coords[mesh.simplices[across, mirror]]
+        if (incircle_many(np.concatenate([rows[simplex], opposite[:, None]],
+                                         axis=1)) > 0).any():
+            return None
+        old_coords = mesh.coords[vertex].copy()
+        mesh.coords[vertex] = coords
+        self.point_index.remove(old_coords)
+        self.point_index.add(coords, vertex)
+        self._move_in_levels(old_point, new_point)
+        if self._listeners:
+            star = self._views(star.tolist())
+            self._notify('faces_died', star)
+            self._notify('faces_born', star)
+        return VertexView(self, vertex)
+
+    def _rebuild(self, old_points, new_points):
+        """Views of the vertices, rebuilt as DelaunayTriangulation does"""
+        return [VertexView(self, vertex)
+                for vertex in super()._rebuild(old_points, new_points)]
+
+    def _last_hint(self):
+        """A hint for locate near the most recent change"""
+        return self._last_simplex
+
+    def _star_of(self, vertex):
+        """Indices of the simplices containing vertex"""
+        mesh = self.mesh
+        start = int(mesh.vertex_simplex[vertex])
+        star = {start}
+        stack = [start]
+        while stack:
+            simplex = stack.pop()
+            vertices = mesh.simplices[simplex].tolist()
+            for k, neighbor in enumerate(mesh.neighbors[simplex].tolist()):
+                if (vertices[k] != vertex and neighbor >= 0 and
+                        neighbor not in star):
+                    star.add(neighbor)
+                    stack.append(neighbor)
+        return sorted(star)
+
+    def _views(self, simplices):
+        """FaceViews of a list of simplex indices"""
+        return [FaceView(self, simplex) for simplex in simplices]
+
+    def _star(self, boundary, vertex):
+        """Fill the hole left by _cavity_boundary with simplices on vertex
+
+        Returns the indices of the new simplices.
+        """
+        mesh = self.mesh
+        ridges = {}
+        new = []
+        for vertices, i, outside, j in boundary:
+            # The new vertex sees the facet from the same side as the old
+            # opposite vertex did, so the orientation is unchanged.
+            vertices[i] = vertex
+            simplex = mesh.add_simplex(vertices)
+            new.append(simplex)
+            if outside >= 0:
+                mesh.link(simplex, i, outside, j)
+            vertices = vertices.tolist()
+            for k in range(len(vertices)):
+                if k == i:
+                    continue
+                ridge = frozenset(vertices[:k] + vertices[k + 1:])
+                if ridge in ridges:
+                    mesh.link(simplex, k, *ridges.pop(ridge))
+                else:
+                    ridges[ridge] = (simplex, k)
+        return new
+
+    def _orientation(self, simplex, i, coords):
+        """ccw of the simplex with its i-th vertex replaced by coords.
+
+        Since simplices are positively oriented, this is 1 if coords is on
+        the same side of facet i as the vertex it replaces.
+        """
+        mesh = self.mesh
+        rows = mesh.coords[mesh.simplices[simplex]].tolist()
+        rows[i] = coords
+        return ccw_coords(*rows)
+
+    def _locate(self, coords, hint=None, jump=None, steps=0):
+        """Visibility walk, returning a simplex index (see locate)"""
+        mesh = self.mesh
+        simplex = self._start_simplex(coords, hint, jump)
+        self.walk_length = steps
+        not_done = True
+        while not_done:
+            self.walk_length += 1
+            not_done = False
+            for i in range(mesh.dimension + 1):
+                if self._orientation(simplex, i, coords) == -1:
+                    simplex = int(mesh.neighbors[simplex, i])
+                    not_done = True
+                    break
+        return simplex
+
+    def _start_simplex(self, coords, hint, jump):
+        """Pick a simplex to start a visibility walk from (see locate)"""
+        if isinstance(hint, FaceView):
+            hint = hint.index
+        if hint is not None and self.mesh.is_alive(hint):
+            return hint
+        if jump is None:
+            jump = self.jump
+        if jump:
+            vertex = self._closest_sampled_vertex(coords)
+            if vertex is not None:
+                return self._vertex_hint(vertex)
+        if self.mesh.is_alive(self._last_simplex):
+            return self._last_simplex
+        return self._arbitrary_simplex()
+
+    def _vertex_hint(self, vertex):
+        """A simplex containing the vertex, to start a walk from"""
+        return int(self.mesh.vertex_simplex[vertex])
+
+    def _nearest_vertex(self, face, point):
+        """The finite vertex of face closest to the point, and its coordinates
+
+        See DelaunayTriangulation._nearest_vertex. The vertex is an index.
+        """
+        mesh = self.mesh
+        vertices = mesh.simplices[face.index]
+        vertices = vertices[mesh.coords[vertices, -1] != 0]
+        if not len(vertices):
+            return None
+        finite = mesh.coords[vertices]
+        distances = finite - point.to_array()
+        closest = np.argmin(np.einsum('ij,ij->i', distances, distances))
+        return int(vertices[closest]), finite[closest]
+
+    def nearest_vertex(self, query, homogeneous=True):
+        """A view of the vertex closest to the query point, or None
+
+        See DelaunayTriangulation.nearest_vertex.
+        """
+        vertex = super().nearest_vertex(query, homogeneous)
+        return None if vertex is None else VertexView(self, vertex)
+
+    def _neighbors(self, vertex):
+        """The inserted vertices sharing a simplex with vertex (including
+        it), and an array of their coordinates
+        """
+        mesh = self.mesh
+        vertices = np.unique(mesh.simplices[self._star_of(vertex)])
+        vertices = vertices[vertices > mesh.dimension]
+        return vertices.tolist(), mesh.coords[vertices]
+
+    def _query_faces(self, query, hint=None, conflict=False):
+        """The simplices at a homogeneous Point, as arrays
+
+        See DelaunayTriangulation._query_faces. The hint is a simplex index.
+        """
+        mesh = self.mesh
+        coords = [float(x) for x in query]
+        start = self._locate(coords, hint)
+        simplices = [start]
+        if conflict:
+            simplices = self._conflict_region(start, coords)[0]
+        vertices = mesh.simplices[simplices]
+        return (mesh.input_index[vertices].astype(np.int64),
+                mesh.coords[vertices], start)
+
+    def _input_indices(self, vertices):
+        """Input indices of vertex indices, with -1 for None or no index"""
+        vertices = np.array([-1 if vertex is None else vertex
+                             for vertex in vertices], dtype=np.int64)
+        indices = self.mesh.input_index[vertices].astype(np.int64)
+        indices[vertices < 0] = -1
+        return indices
+
+    def _closest_sampled_vertex(self, coords):
+        """Sample about n^(1/(d+1)) vertices, and return the closest one
+
+        Returns None if no live vertex was sampled.
+        """
+        mesh = self.mesh
+        first = mesh.dimension + 1  # skip the outer face
+        size = mesh.num_vertices - first
+        count = min(size, int(np.ceil(size ** (1 / (mesh.dimension + 1)))))
+        candidates = np.array(
+            self._random.sample(range(first, mesh.num_vertices), count),
+            dtype=int)
+        candidates = candidates[mesh.vertex_simplex[candidates] >= 0]
+        if not len(candidates):
+            return None
+        distances = mesh.coords[candidates] - coords
+        return int(candidates[np.argmin(np.einsum('ij,ij->i', distances,
+                                                  distances))])
+
+    def locate(self, point, hint=None, jump=None):
+        """Point location with visibility walk
+
+        hint may be a FaceView or a simplex index. See
+        DelaunayTriangulation.locate for the rest.
+        """
+        steps = 0
+        if hint is None and not jump and len(self._levels) > 1:
+            hint, steps = self._descend(point)[1:]
+        return FaceView(self, self._locate(
+            [float(x) for x in point], hint, jump, steps))
+
+    def test_is_delaunay(self):
+        """Make sure every facet is locally delaunay.
+
+        All of the incircle tests are done in one batch.
+        """
+        mesh = self.mesh
+        alive = mesh.alive()
+        simplices = mesh.simplices[alive]
+        neighbors = mesh.neighbors[alive]
+        simplex, i = np.nonzero(neighbors >= 0)
+        stacks = np.concatenate(
+            [mesh.coords[mesh.simplices[neighbors[simplex, i]]],
+             mesh.coords[simplices[simplex, i]][:, None, :]], axis=1)
+        return not (incircle_many(stacks) > 0).any()
+
+    def face_point_sets(self, homogeneous=False):
+        """Return a set containing a bunch of frozensets of points.
+
+        Of course the frozensets represent the faces of the triangulation.
+        """
+        mesh = self.mesh
+        hidden = mesh.dimension + 1  # the outer face comes first
+        cut = slice(None) if homogeneous else slice(-1)
+        result = set()
+        for simplex in mesh.alive():
+            vertices = mesh.simplices[simplex]
+            if vertices.min() >= hidden:
+                result.add(frozenset(
+                    Point(*row[cut]) for row in mesh.coords[vertices]))
+        return result
+
+    def _finite_simplices(self):
+        """Indices of the live simplices without an outer vertex"""
+        mesh = self.mesh
+        alive = mesh.alive()
+        return alive[mesh.simplices[alive].min(axis=1) > mesh.dimension]
+
+    def simplex_indices(self):
+        """The finite simplices as an (m, d+1) array of input indices
+
+        See DelaunayTriangulation.simplex_indices. Rows are positively
+        oriented.
+        """
+        mesh = self.mesh
+        return mesh.input_index[mesh.simplices[self._finite_simplices()]]
+
+    def neighbor_indices(self):
+        """The neighbors of the rows of simplex_indices, as an (m, d+1) array
+
+        See DelaunayTriangulation.neighbor_indices.
+        """
+        mesh = self.mesh
+        finite = self._finite_simplices()
+        row_of = np.full(mesh.num_simplices, -1, dtype=np.int64)
+        row_of[finite] = np.arange(len(finite))
+        neighbors = mesh.neighbors[finite]
+        return np.where(neighbors >= 0, row_of[neighbors], -1)
+
+    def _site_faces(self):
+        """The cells of the inserted points, as arrays
+
+        See DelaunayTriangulation._site_faces.
+        """
+        mesh = self.mesh
+        vertices = np.arange(mesh.dimension + 1, mesh.num_vertices)
+        vertices = vertices[mesh.vertex_simplex[vertices] >= 0]
+        row_of = np.full(mesh.num_vertices, -1, dtype=np.int64)
+        row_of[vertices] = np.arange(len(vertices))
+        simplices = mesh.simplices[mesh.alive()]
+        finite = simplices.min(axis=1) > mesh.dimension
+        on_hull = np.zeros(len(vertices), dtype=bool)
+        hull = row_of[simplices[~finite]]
+        on_hull[hull[hull >= 0]] = True
+        return (mesh.coords[vertices], row_of[simplices[finite]], on_hull,
+                mesh.input_index[vertices])
+
+    def _arrays(self):
+        """The live part of the mesh, for save
+
+        See DelaunayTriangulation._arrays. The free rows and removed
+        vertices are squeezed out.
+        """
+        mesh = self.mesh
+        alive = mesh.alive()
+        vertices = self._live_vertices()
+        vertex_of = np.full(mesh.num_vertices, -1, dtype=np.int32)
+        vertex_of[vertices] = np.arange(len(vertices))
+        row_of = np.full(mesh.num_simplices, -1, dtype=np.int32)
+        row_of[alive] = np.arange(len(alive))
+        neighbors = mesh.neighbors[alive]
+        return {'coords': mesh.coords[vertices],
+                'simplices': vertex_of[mesh.simplices[alive]],
+                'neighbors': np.where(neighbors >= 0, row_of[neighbors], -1),
+                'input_index': mesh.input_index[vertices]}
+
+    def _live_vertices(self):
+        """The indices of the vertices that have not been removed"""
+        mesh = self.mesh
+        return np.flatnonzero(mesh.vertex_simplex[:mesh.num_vertices] >= 0)
+
+    def _array_vertices(self):
+        """Views of the vertices, in the order of the rows of _arrays"""
+        return [VertexView(self, vertex)
+                for vertex in self._live_vertices().tolist()]
+
+    def _restore(self, arrays):
+        """Take on the triangulation in a dict of arrays from _arrays
+
+        The arrays are used as they are, memory maps included.
+        """
+        mesh = SimplexMesh(self.dimension(), capacity=0)
+        mesh.coords = arrays['coords']
+        mesh.simplices = arrays['simplices'].astype(np.int32, copy=False)
+        mesh.neighbors = arrays['neighbors'].astype(np.int32, copy=False)
+        mesh.vertex_simplex = arrays['vertex_simplex'].astype(np.int32,
+                                                              copy=False)
+        mesh.input_index = arrays['input_index'].astype(np.int64, copy=False)
+        mesh.num_vertices = len(mesh.coords)
+        mesh.num_simplices = len(mesh.simplices)
+        self.mesh = mesh
+        self._last_simplex = mesh.num_simplices - 1
+        outer = mesh.dimension + 1
+        self.point_index.add_many(mesh.coords[outer:],
+                                  range(outer, mesh.num_vertices))
+
+    def circumcenters(self):
+        """Circumcenters of the rows of simplex_indices, as an (m, d) array
+
+        See DelaunayTriangulation.circumcenters.
+        """
+        mesh = self.mesh
+        coords = mesh.coords[mesh.simplices[self._finite_simplices()]]
+        return circumcenters(coords, homogeneous=True)[:, :-1]
+
+    def dimension(self):
+        """get the dimension in some standard way"""
+        return self.mesh.dimension
+
+    def _arbitrary_simplex(self):
+        """Get the index of an arbitrary live simplex"""
+        return int(self.mesh.alive()[0])
+
+    def _arbitrary_face(self):
+        """Get an arbitrary face of the triangulation"""
+        return FaceView(self, self._arbitrary_simplex())
+
+
+class VertexView(DelaunayTriangulation.Vertex):
+    """A Vertex backed by a row of an ArrayDelaunayTriangulation"""
+
+    def __init__(self, triangulation, index):
+        self.triangulation = triangulation
+        self.index = index
+
+    @property
+    def point(self):
+        return self.triangulation.mesh.point(self.index)
+
+    @property
+    def input_index(self):
+        index = int(self.triangulation.mesh.input_index[self.index])
+        return None if index < 0 else index
+
+    def __eq__(self, other):
+        return (isinstance(other, VertexView) and
+                other.triangulation is self.triangulation and
+                other.index == self.index)
+
+    def __hash__(self):
+        return hash(self.index)
+
+
+class FaceView(DelaunayTriangulation.Face):
+    """A Face backed by a simplex of an ArrayDelaunayTriangulation"""
+
+    def __init__(self, triangulation, index):
+        self.triangulation = triangulation
+        self.index = index
+
+    @property
+    def vertices(self):
+        return frozenset(self._vertex_list())
+
+    @property
+    def half_facets(self):
+        return {vertex: HalfFacetView(self.triangulation, self.index, i)
+                for i, vertex in enumerate(self._vertex_list())}
+
+    def _vertex_list(self):
+        """The vertices in storage order"""
+        mesh = self.triangulation.mesh
+        return [VertexView(self.triangulation, vertex)
+                for vertex in mesh.simplices[self.index].tolist()]
+
+    def points(self):
+        """The points of this face, in storage order"""
+        return self.triangulation.mesh.points(self.index)
+
+    def iter_facets(self):
+        """Iterate through the half-facets."""
+        return [HalfFacetView(self.triangulation, self.index, i)
+                for i in range(self.triangulation.mesh.dimension + 1)]
+
+    def __eq__(self, other):
+        return (isinstance(other, FaceView) and
+                other.triangulation is self.triangulation and
+                other.vertices == self.vertices)
+
+    def __hash__(self):
+        return hash(self.vertices)
+
+
+class HalfFacetView(DelaunayTriangulation.HalfFacet):
+    """The facet of a stored simplex opposite its i-th vertex"""
+
+    def __init__(self, triangulation, simplex, i):
+        self.triangulation = triangulation
+        self.simplex = simplex
+        self.i = i
+
+    @property
+    def face(self):
+        return FaceView(self.triangulation, self.simplex)
+
+    @property
+    def opposite(self):
+        return VertexView(self.triangulation, int(
+            self.triangulation.mesh.simplices[self.simplex, self.i]))
+
+    @property
+    def twin(self):
+        mesh = self.triangulation.mesh
+        neighbor = int(mesh.neighbors[self.simplex, self.i])
+        if neighbor < 0:
+            return None
+        return HalfFacetView(self.triangulation, neighbor,
+                             mesh.mirror_index(self.simplex, neighbor))
+
+    @property
+    def side(self):
+        # points() lists the facet in storage order, so moving the opposite
+        # vertex to the end takes (d - i) transpositions.
+        return -1 if (self.triangulation.mesh.dimension - self.i) % 2 else 1
+
+    def __hash__(self):
+        return hash(self.vertices())
+
+    def _vertex_list(self):
+        mesh = self.triangulation.mesh
+        return [VertexView(self.triangulation, vertex) for k, vertex in
+                enumerate(mesh.simplices[self.simplex].tolist())
+                if k != self.i]
+
+    def vertices(self):
+        """The vertices of this facet"""
+        return frozenset(self._vertex_list())
+
+    def points(self):
+        """The points of this facet, in storage order"""
+        return [vertex.point for vertex in self._vertex_list()]
+
+
+class FaceSet(Set):
+    """The live faces of an ArrayDelaunayTriangulation, as a set"""
+
+    def __init__(self, triangulation):
+        self.triangulation = triangulation
+
+    def __len__(self):
+        return len(self.triangulation.mesh)
+
+    def __iter__(self):
+        for simplex in self.triangulation.mesh.alive():
+            yield FaceView(self.triangulation, int(simplex))
+
+    def __contains__(self, face):
+        return (isinstance(face, FaceView) and
+                face.triangulation is self.triangulation and
+                self.triangulation.mesh.is_alive(face.index))
+
+
+class VertexSet(Set):
+    """The vertices of an ArrayDelaunayTriangulation, as a set"""
+
+    def __init__(self, triangulation):
+        self.triangulation = triangulation
+
+    def __len__(self):
+        mesh = self.triangulation.mesh
+        return mesh.num_vertices - mesh.num_removed_vertices
+
+    def __iter__(self):
+        mesh = self.triangulation.mesh
+        for index in range(mesh.num_vertices):
+            if mesh.vertex_simplex[index] >= 0:
+                yield VertexView(self.triangulation, index)
+
+    def __contains__(self, vertex):
+        return (isinstance(vertex, VertexView) and
+                vertex.triangulation is self.triangulation and
+                self.triangulation.mesh.is_vertex_alive(vertex.index))
@@ -0,0 +1,117 @@
+"""
+Insertion orders for building triangulations.
+
+Inserting points in a random order keeps the expected amount of work low, but
+every point lands somewhere far away from the last one, so point location has
+a long way to walk. A biased randomized insertion order (BRIO) keeps most of
+the randomness while visiting the points in spatially coherent rounds: about
+half of the points go in the last round, half of the rest in the round before
+that, and so on, and each round is sorted along a space filling curve.
+"""
+
+import numpy as np
+
+ORDERS = ('input', 'random', 'hilbert', 'morton')
+
+
+def _quantize(coords, bits):
+    """Scale coords to integers in [0, 2^bits) along each axis"""
+    coords = np.asarray(coords, dtype=float)
+    low = coords.min(axis=0)
+    span = coords.max(axis=0) - low
+    span[span == 0] = 1
+    scaled = (coords - low) / span * ((1 << bits) - 1)
+    return np.rint(scaled).astype(np.int64)
+
+
+def _bits_for(dimension):
+    """How many bits per axis fit into an int64 curve index"""
+    return max(1, min(16, 62 // dimension))
+
+
+def _interleave(grid, bits):
+    """Interleave the bits of each row, the first column most significant"""
+    dimension = grid.shape[1]
+    keys = np.zeros(len(grid), dtype=np.int64)
+    for bit in range(bits - 1, -1, -1):
+        for axis in range(dimension):
+            keys = (keys << 1) | ((grid[:, axis] >> bit) & 1)
+    return keys
+
+
+def morton_keys(coords, bits=None):
+    """Position of each row of coords along a Morton (Z-order) curve
+
+    coords is an (n, d) array of cartesian coordinates. The curve runs through
+    a 2^bits grid over the bounding box of the points.
+    """
+    coords = np.asarray(coords, dtype=float)
+    bits = bits or _bits_for(coords.shape[1])
+    return _interleave(_quantize(coords, bits), bits)
+
+
+def hilbert_keys(coords, bits=None):
+    """Position of each row of coords along a Hilbert curve
+
+    Same arguments as morton_keys. This uses Skilling's algorithm ("Programming
+    the Hilbert curve", 2004), which works in any dimension, on all of the
+    rows at once.
+    """
+    coords = np.asarray(coords, dtype=float)
+    dimension = coords.shape[1]
+    bits = bits or _bits_for(dimension)
+    grid = _quantize(coords, bits)
+    # Inverse undo excess work
+    q = 1 << (bits - 1)
+    while q > 1:
+        low_bits = q - 1
+        for axis in range(dimension):
+            flip = (grid[:, axis] & q) != 0
+            grid[flip, 0] ^= low_bits
+            swap = ~flip
+            t = (grid[swap, 0] ^ grid[swap, axis]) & low_bits
+            grid[swap, 0] ^= t
+            grid[swap, axis] ^= t
+        q >>= 1
+    # Gray encode
+    for axis in range(1, dimension):
+        grid[:, axis] ^= grid[:, axis - 1]
+    t = np.zeros(len(grid), dtype=np.int64)
+    q = 1 << (bits - 1)
+    while q > 1:
+        t[(grid[:, -1] & q) != 0] ^= q - 1
+        q >>= 1
+    grid ^= t[:, None]
+    return _interleave(grid, bits)
+
+
+def brio_rounds(count, rand):
+    """Round number for each of count points, with the last round largest
+
+    Each point is in the last round with probability 1/2, in the one before
+    that with probability 1/4, and so on. rand is a random.Random.
+    """
+    state = np.random.RandomState(rand.getrandbits(32))
+    # geometric() counts the flips up to and including the first success
+    return -state.geometric(0.5, size=count)
+
+
+def insertion_order(coords, order='hilbert', rand=None):
+    """Indices of the rows of coords in the order they should be inserted
+
+    order is one of ORDERS: 'input' keeps the given order, 'random' shuffles
+    it, and 'hilbert' and 'morton' give a BRIO whose rounds are sorted along
+    that curve. rand is a random.Random, used for everything but 'input'.
+    """
+    if order not in ORDERS:
+        raise ValueError("order must be one of {}, not {!r}".format(
+            ', '.join(ORDERS), order))
+    count = len(coords)
+    if order == 'input' or count == 0:
+        return list(range(count))
+    if order == 'random':
+        indices = list(range(count))
+        rand.shuffle(indices)
+        return indices
+    keys = hilbert_keys(coords) if order == 'hilbert' else morton_keys(coords)
+    return np.lexsort((keys, brio_rounds(count, rand))).tolist()
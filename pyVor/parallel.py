@@ -0,0 +1,200 @@
+"""
+Building a Delaunay triangulation in several processes at once.
+
+The points are cut into slabs along their widest axis, and each slab is
+triangulated on its own in a ProcessPoolExecutor. A simplex of a slab whose
+circumsphere lies inside the slab is empty of every other point, so it is a
+simplex of the whole triangulation too. Only the rest of them (the ones whose
+circumspheres cross into another slab, or reach out to infinity) need repair.
+
+The repair triangulates the corners of those simplices in the main process.
+Every simplex of the whole triangulation that no slab could vouch for has all
+of its corners among those points, and so is a simplex of their triangulation
+as well. The other simplices of that triangulation cover the region the final
+simplices already cover, and a simplex is thrown out when its centroid lies
+in the corner of a final simplex at one of its vertices.
+
+In general position the Delaunay triangulation is unique, so the result has
+the same simplices as a sequential build.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pyVor.mesh import ArrayDelaunayTriangulation
+from pyVor.structures import outer_face_pts
+
+# Slabs with fewer points than this are not worth a process
+MIN_PART = 256
+# How far (relative to the size of the input) a circumsphere has to stay
+# from the edge of its slab for the simplex to count as final
+MARGIN = 1e-9
+# Barycentric coordinates this close to 0 count as on the simplex
+SLACK = 1e-12
+
+
+def _partition(coords, parts):
+    """Cut the rows of coords into slabs of about equal size
+
+    Returns the axis, the part of each row and the (low, high) bounds of each
+    slab. Rows with the same coordinate along the axis land in the same
+    slab, so duplicates are never split up.
+    """
+    axis = int(np.argmax(np.ptp(coords, axis=0)))
+    cuts = np.unique(np.quantile(coords[:, axis],
+                                 np.arange(1, parts) / parts))
+    part = np.searchsorted(cuts, coords[:, axis], side='right')
+    bounds = np.concatenate([[-np.inf], cuts, [np.inf]])
+    return axis, part, list(zip(bounds[:-1], bounds[1:]))
+
+
+def _triangulate_part(coords, axis, low, high, margin, kwargs):
+    """Triangulate one slab (this runs in a worker process)
+
+    Returns the final simplices, and the points that need repair, both as
+    rows of coords.
+    """
+    del_tri = ArrayDelaunayTriangulation.from_array(coords, **kwargs)
+    simplices = del_tri.simplex_indices()
+    centers = del_tri.circumcenters()
+    radii = np.linalg.norm(coords[simplices[:, 0]] - centers, axis=1)
+    final = ((centers[:, axis] - radii > low + margin) &
+             (centers[:, axis] + radii < high - margin))
+    mesh = del_tri.mesh
+    infinite = mesh.simplices[mesh.alive()]
+    infinite = infinite[infinite.min(axis=1) <= mesh.dimension]
+    hull = mesh.input_index[infinite[infinite > mesh.dimension]]
+    return simplices[final], np.union1d(simplices[~final].ravel(), hull)
+
+
+def _covered(coords, candidates, final):
+    """Which of the candidate simplices overlap the final ones
+
+    The test is at the first vertex v of each candidate: it overlaps if its
+    centroid is in the cone at v of some final simplex around v. That is,
+    if all of the barycentric coordinates of the centroid with respect to
+    that simplex are nonnegative, except maybe the one for v.
+    """
+    width = final.shape[1]
+    corner = candidates[:, 0]
+    # The final simplices around each vertex, as slices of star
+    flat = final.ravel()
+    order = np.argsort(flat, kind='stable')
+    star = order // width
+    starts = np.searchsorted(flat[order], corner, side='left')
+    counts = np.searchsorted(flat[order], corner, side='right') - starts
+    which = np.repeat(np.arange(len(candidates)), counts)
+    offsets = np.arange(len(which)) - np.repeat(np.cumsum(counts) - counts,
+                                                counts)
+    around = star[np.repeat(starts, counts) + offsets]
+    centroids = coords[candidates].mean(axis=1)
+    matrices = np.concatenate([coords[final[around]],
+                               np.ones((len(around), width, 1))], axis=2)
+    targets = np.hstack([centroids[which], np.ones((len(which), 1))])
+    weights = np.linalg.solve(matrices.transpose(0, 2, 1),
+                              targets[:, :, None])[:, :, 0]
+    inside = ((weights >= -SLACK) |
+              (final[around] == corner[which][:, None])).all(axis=1)
+    return np.bincount(which[inside], minlength=len(candidates)) > 0
+
+
+def _assemble(coords, rows, simplices, kwargs):
+    """An ArrayDelaunayTriangulation with the given simplices
+
+    coords are the points (cartesian), rows the ones to use as vertices, and
+    simplices are positively oriented, in terms of rows of coords (or -1 -
+    k for the k-th outer vertex). Returns None if they do not fit together
+    into a closed complex.
+    """
+    dimension = coords.shape[1]
+    width = dimension + 1
+    del_tri = ArrayDelaunayTriangulation.__new__(ArrayDelaunayTriangulation)
+    del_tri._init_empty(dimension, jump=kwargs.get('jump', False),
+                        seed=kwargs.get('seed'))
+    vertex_of = np.full(len(coords), -1, dtype=np.int64)
+    vertex_of[rows] = np.arange(width, width + len(rows))
+    simplices = np.where(simplices >= 0, vertex_of[simplices], -1 - simplices)
+    # Every facet is shared by exactly two simplices, except for the ones
+    # between outer vertices, which have no neighbor. Sorting the facets
+    # puts the twins next to each other.
+    others = np.array([[j for j in range(width) if j != i]
+                       for i in range(width)])
+    facets = np.sort(simplices[:, others], axis=2).reshape(-1, dimension)
+    order = np.lexsort(facets.T[::-1])
+    twins = (facets[order[1:]] == facets[order[:-1]]).all(axis=1)
+    first, second = order[:-1][twins], order[1:][twins]
+    neighbors = np.full(len(facets), -1, dtype=np.int32)
+    neighbors[first] = second // width
+    neighbors[second] = first // width
+    lonely = neighbors < 0
+    if (np.bincount(np.concatenate([first, second]),
+                    minlength=len(facets)) > 1).any() or \
+            (facets[lonely] >= width).any():
+        return None
+    vertex_simplex = np.empty(width + len(rows), dtype=np.int32)
+    vertex_simplex[simplices.ravel()] = np.repeat(
+        np.arange(len(simplices)), width)
+    del_tri._restore({
+        'coords': np.vstack([
+            [list(point) for point in outer_face_pts(dimension)],
+            np.hstack([coords[rows], np.ones((len(rows), 1))])]),
+        'simplices': simplices, 'neighbors': neighbors.reshape(-1, width),
+        'vertex_simplex': vertex_simplex,
+        'input_index': np.concatenate([np.full(width, -1), rows])})
+    return del_tri
+
+
+def build(arr, workers=None, homogeneous=False, **kwargs):
+    """The ArrayDelaunayTriangulation of the rows of arr, built in parallel
+
+    arr and the keyword arguments are as for from_array, which calls this
+    when it is given workers. workers is the number of processes to use (by
+    default, one per CPU). Points at infinity, a tolerance or a hierarchy
+    need the whole input at once, and small inputs are not worth the
+    trouble, so those are built sequentially.
+    """
+    workers = workers or os.cpu_count() or 1
+    coords = np.asarray(arr, dtype=float)
+    if coords.ndim != 2 or not len(coords):
+        raise ValueError("Expected a non-empty (n, d) array")
+    if homogeneous:
+        if (coords[:, -1] == 0).any():
+            return ArrayDelaunayTriangulation.from_array(
+                coords, homogeneous=True, **kwargs)
+        coords = coords[:, :-1] / coords[:, -1:]
+    # The first of each set of duplicates, like a sequential build keeps
+    rows = np.sort(np.unique(coords, axis=0, return_index=True)[1])
+    parts = min(workers, len(rows) // MIN_PART)
+    if (parts < 2 or kwargs.get('tolerance') or kwargs.get('hierarchy') or
+            kwargs.get('gui')):
+        return ArrayDelaunayTriangulation.from_array(coords, **kwargs)
+    axis, part, bounds = _partition(coords[rows], parts)
+    margin = MARGIN * np.ptp(coords[rows], axis=0).max()
+    pieces = [rows[part == k] for k in range(len(bounds))]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_triangulate_part, coords[piece], axis,
+                                   low, high, margin, kwargs)
+                   for piece, (low, high) in zip(pieces, bounds)]
+        results = [future.result() for future in futures]
+    final = np.concatenate([piece[simplices] for piece, (simplices, _)
+                            in zip(pieces, results)])
+    repair = np.concatenate([piece[points] for piece, (_, points)
+                             in zip(pieces, results)])
+    # Triangulate the points that need repair, keeping the simplices that
+    # the final ones do not already cover (and all of the infinite ones)
+    patch = ArrayDelaunayTriangulation.from_array(coords[repair], **kwargs)
+    mesh = patch.mesh
+    simplices = mesh.simplices[mesh.alive()]
+    simplices = np.where(simplices > mesh.dimension,
+                         repair[mesh.input_index[simplices]], -1 - simplices)
+    finite = (simplices >= 0).all(axis=1)
+    keep = ~finite
+    keep[finite] = ~_covered(coords, simplices[finite], final)
+    del_tri = _assemble(coords, rows, np.concatenate([final, simplices[keep]]),
+                        kwargs)
+    if del_tri is None:
+        # Only rounding in nearly degenerate input should get us here
+        return ArrayDelaunayTriangulation.from_array(coords, **kwargs)
+    return del_tri
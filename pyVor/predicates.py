@@ -1,8 +1,234 @@
 #!/usr/bin/env python3
 
-"""This is a collection of linear predicate implementations."""
+"""This is a collection of linear predicate implementations.
 
-from pyVor.primitives import Matrix, Point, Vector
+Each predicate is the sign of a determinant. The determinant is computed in
+floating point first, and if it is further from zero than an error bound we
+trust its sign. Otherwise (which only happens for nearly degenerate input)
+the determinant is recomputed exactly with Fractions. filter_stats counts
+how many times each predicate was called and how many of those calls needed
+the exact fallback.
+
+The predicates in the plane and in space (by far the common case) are
+evaluated with expanded determinant formulas straight from coordinate lists,
+using Shewchuk's error bounds. Other dimensions go through np.linalg.det.
+ccw_coords and incircle_coords take raw homogeneous coordinates (tuples,
+lists or array rows) instead of Points.
+"""
+
+from collections import Counter
+from fractions import Fraction
+import sys
+
+import numpy as np
+
+from pyVor.primitives import Point
+
+# Unit roundoff of a float64
+EPSILON = sys.float_info.epsilon / 2
+
+# Shewchuk's bounds for the first stage of his adaptive predicates
+CCW_BOUND_2D = (3 + 16 * EPSILON) * EPSILON
+CCW_BOUND_3D = (7 + 56 * EPSILON) * EPSILON
+INCIRCLE_BOUND_2D = (10 + 96 * EPSILON) * EPSILON
+INCIRCLE_BOUND_3D = (16 + 224 * EPSILON) * EPSILON
+
+# Keys are predicate names ("ccw") and the same with "_exact" tacked on.
+filter_stats = Counter()
+
+
+def reset_filter_stats():
+    """Zero all of the counters in filter_stats"""
+    filter_stats.clear()
+
+
+def exact_sign_det(rows):
+    """Return the sign of the determinant of a square matrix, exactly.
+
+    rows is a list of rows of Fractions (or ints). This is plain Gaussian
+    elimination, so it is slow, but it is never wrong.
+    """
+    rows = [list(row) for row in rows]
+    size = len(rows)
+    if any(len(row) != size for row in rows):
+        raise ValueError("Matrix is not square")
+    sign = 1
+    for col in range(size):
+        pivot = next((r for r in range(col, size) if rows[r][col] != 0),
+                     None)
+        if pivot is None:
+            return 0
+        if pivot != col:
+            rows[col], rows[pivot] = rows[pivot], rows[col]
+            sign = -sign
+        if rows[col][col] < 0:
+            sign = -sign
+        for r in range(col + 1, size):
+            factor = rows[r][col] / rows[col][col]
+            if factor:
+                rows[r] = [mine - factor * theirs
+                           for mine, theirs in zip(rows[r], rows[col])]
+    return sign
+
+
+def det_error_bound(matrix):
+    """A conservative bound on the error of np.linalg.det(matrix).
+
+    LU factorization perturbs each row by a small multiple of its norm, and
+    Hadamard's inequality bounds what that can do to the determinant. The
+    2^n accounts for the worst case growth of partial pivoting.
+    """
+    size = len(matrix)
+    hadamard = np.prod(np.sqrt(np.einsum('ij,ij->i', matrix, matrix)))
+    return size * size * 2 ** size * EPSILON * hadamard
+
+
+def filtered_sign_det(rows, name, exact_rows=None):
+    """Return the sign of the determinant of rows (as an int in [-1, 0, 1]).
+
+    rows are floats. If the floating point determinant is too close to zero
+    to trust, exact_rows (a function returning the same matrix as Fractions)
+    is used to settle the matter. By default those are just the floats in
+    rows, converted exactly.
+    """
+    filter_stats[name] += 1
+    matrix = np.array(rows, dtype=float)
+    det = np.linalg.det(matrix)
+    bound = det_error_bound(matrix)
+    if det > bound:
+        return 1
+    if det < -bound:
+        return -1
+    filter_stats[name + '_exact'] += 1
+    if exact_rows is None:
+        return exact_sign_det([[Fraction(x) for x in row] for row in matrix])
+    return exact_sign_det(exact_rows())
+
+
+def _sign(value, permanent, bound):
+    """The sign of value if it is bigger than the error bound, else None"""
+    error = bound * permanent
+    if value > error:
+        return 1
+    if value < -error:
+        return -1
+    return None
+
+
+def _det2(rows):
+    """Determinant of a 2x2 matrix, and the matching permanent"""
+    (ax, ay), (bx, by) = rows
+    left = ax * by
+    right = ay * bx
+    return left - right, abs(left) + abs(right)
+
+
+def _det3(rows):
+    """Determinant of a 3x3 matrix, and the matching permanent"""
+    (ax, ay, az), (bx, by, bz), (cx, cy, cz) = rows
+    bxcy = bx * cy
+    bycx = by * cx
+    cxay = cx * ay
+    cyax = cy * ax
+    axby = ax * by
+    aybx = ay * bx
+    det = (az * (bxcy - bycx) + bz * (cxay - cyax) + cz * (axby - aybx))
+    permanent = ((abs(bxcy) + abs(bycx)) * abs(az) +
+                 (abs(cxay) + abs(cyax)) * abs(bz) +
+                 (abs(axby) + abs(aybx)) * abs(cz))
+    return det, permanent
+
+
+def _lifted_det3(rows):
+    """Determinant of the 3x3 matrix with rows (x, y, x^2 + y^2)
+
+    Returns the determinant and the matching permanent.
+    """
+    (adx, ady), (bdx, bdy), (cdx, cdy) = rows
+    bdxcdy = bdx * cdy
+    cdxbdy = cdx * bdy
+    cdxady = cdx * ady
+    adxcdy = adx * cdy
+    adxbdy = adx * bdy
+    bdxady = bdx * ady
+    alift = adx * adx + ady * ady
+    blift = bdx * bdx + bdy * bdy
+    clift = cdx * cdx + cdy * cdy
+    det = (alift * (bdxcdy - cdxbdy) + blift * (cdxady - adxcdy) +
+           clift * (adxbdy - bdxady))
+    permanent = ((abs(bdxcdy) + abs(cdxbdy)) * alift +
+                 (abs(cdxady) + abs(adxcdy)) * blift +
+                 (abs(adxbdy) + abs(bdxady)) * clift)
+    return det, permanent
+
+
+def _lifted_det4(rows):
+    """Determinant of the 4x4 matrix with rows (x, y, z, x^2 + y^2 + z^2)
+
+    Returns the determinant and the matching permanent.
+    """
+    (aex, aey, aez), (bex, bey, bez), (cex, cey, cez), (dex, dey, dez) = rows
+    aexbey = aex * bey
+    bexaey = bex * aey
+    ab = aexbey - bexaey
+    bexcey = bex * cey
+    cexbey = cex * bey
+    bc = bexcey - cexbey
+    cexdey = cex * dey
+    dexcey = dex * cey
+    cd = cexdey - dexcey
+    dexaey = dex * aey
+    aexdey = aex * dey
+    da = dexaey - aexdey
+    aexcey = aex * cey
+    cexaey = cex * aey
+    ac = aexcey - cexaey
+    bexdey = bex * dey
+    dexbey = dex * bey
+    bd = bexdey - dexbey
+    abc = aez * bc - bez * ac + cez * ab
+    bcd = bez * cd - cez * bd + dez * bc
+    cda = cez * da + dez * ac + aez * cd
+    dab = dez * ab + aez * bd + bez * da
+    alift = aex * aex + aey * aey + aez * aez
+    blift = bex * bex + bey * bey + bez * bez
+    clift = cex * cex + cey * cey + cez * cez
+    dlift = dex * dex + dey * dey + dez * dez
+    det = (dlift * abc - clift * dab) + (blift * cda - alift * bcd)
+    aez, bez, cez, dez = abs(aez), abs(bez), abs(cez), abs(dez)
+    aexbey, bexaey = abs(aexbey), abs(bexaey)
+    bexcey, cexbey = abs(bexcey), abs(cexbey)
+    cexdey, dexcey = abs(cexdey), abs(dexcey)
+    dexaey, aexdey = abs(dexaey), abs(aexdey)
+    aexcey, cexaey = abs(aexcey), abs(cexaey)
+    bexdey, dexbey = abs(bexdey), abs(dexbey)
+    permanent = (
+        ((cexdey + dexcey) * bez + (dexbey + bexdey) * cez +
+         (bexcey + cexbey) * dez) * alift +
+        ((dexaey + aexdey) * cez + (aexcey + cexaey) * dez +
+         (cexdey + dexcey) * aez) * blift +
+        ((aexbey + bexaey) * dez + (bexdey + dexbey) * aez +
+         (dexaey + aexdey) * bez) * clift +
+        ((bexcey + cexbey) * aez + (cexaey + aexcey) * bez +
+         (aexbey + bexaey) * cez) * dlift)
+    return det, permanent
+
+
+def _exact_differences(rows, pivot):
+    """rows minus pivot (scaled by their homogeneous coordinate), exactly.
+
+    The homogeneous coordinate itself is dropped.
+    """
+    pivot = [Fraction(x) for x in pivot[:-1]]
+    return [[Fraction(x) - Fraction(row[-1]) * p
+             for x, p in zip(row[:-1], pivot)] for row in rows]
+
+
+def _as_row(point):
+    """The coordinates of a Point (or any sequence) as a list of floats"""
+    if isinstance(point, Point):
+        return point.to_array().astype(float).tolist()
+    return [float(x) for x in point]
 
 
 def ccw(*points, homogeneous=True):
@@ -15,23 +241,42 @@ def ccw(*points, homogeneous=True):
     the other points appear to be well-oriented according
     to the (n-1)-dimensional test.
     """
+    rows = [_as_row(pt) for pt in points]
     if not homogeneous:
-        mtrx = Matrix(*[pt.lift(lambda v: 1).to_vector() for pt in points])
-    else:
-        mtrx = None
-        for pt in points:
-            if pt[-1] == 1:
-                # We need at list one non-infinite point
-                # for this to work normally
-                mtrx = Matrix(*[pt.to_vector() for pt in points])
-                break
-    if mtrx is not None:
-        return mtrx.sign_det()
-    # If all points have 0 for extended homogeneous coordinate,
-    # win by using the ccw test for one dimension higher:
-    return ccw(*points,
-               Point(*(0 for i in range(len(points[0]) - 1)), -1),
-               homogeneous=False)
+        rows = [row + [1.0] for row in rows]
+    return ccw_coords(*rows)
+
+
+def ccw_coords(*rows):
+    """ccw for points given as sequences of homogeneous coordinates."""
+    if not any(row[-1] == 1 for row in rows):
+        # We need at least one non-infinite point for this to work normally.
+        # If all points have 0 for extended homogeneous coordinate,
+        # win by using the ccw test for one dimension higher:
+        return ccw_coords(*(list(row) + [1.0] for row in rows),
+                          [0.0] * (len(rows[0]) - 1) + [-1.0, 1.0])
+    size = len(rows)
+    if (size in (3, 4) and all(len(row) == size for row in rows) and
+            all(row[-1] == 0 or row[-1] == 1 for row in rows)):
+        filter_stats['ccw'] += 1
+        # Subtracting (a multiple of) a finite point from every point is a
+        # column operation, and leaves a single 1 in the pivot's row to
+        # expand along.
+        k = next(i for i, row in enumerate(rows) if row[-1] == 1)
+        pivot = rows[k]
+        others = rows[:k] + rows[k + 1:]
+        sign = -1 if (k + size - 1) % 2 else 1
+        minor = [[x - p if row[-1] else x for x, p in zip(row, pivot)][:-1]
+                 for row in others]
+        if size == 3:
+            result = _sign(*_det2(minor), CCW_BOUND_2D)
+        else:
+            result = _sign(*_det3(minor), CCW_BOUND_3D)
+        if result is None:
+            filter_stats['ccw_exact'] += 1
+            result = exact_sign_det(_exact_differences(others, pivot))
+        return sign * result
+    return filtered_sign_det(rows, 'ccw')
 
 
 def incircle(*points, homogeneous=True):
@@ -40,26 +285,123 @@ def incircle(*points, homogeneous=True):
     The points are interpreted as having extended homogenious
     coordinates unless homogeneous=False is passed.
     """
-
-    if homogeneous:
-        # The points already have homogeneous coordinates
-        vectors = [pt.to_vector() for pt in points]
-    else:
+    rows = [_as_row(pt) for pt in points]
+    if not homogeneous:
         # We'll give each point a homogeneous coordinate of 1
-        vectors = [(pt.to_vector()).lift() for pt in points]
-
-    tmp = []
-    for v in vectors:
-        if v[-1] == 0:
-            v *= 1000000000
-            v += Vector(*([0] * (len(v) - 1)), 1)
-        tmp.append(v)
-    vectors = tmp
-
-    vectors = [vector.lift(lambda v: v[:-1].norm_squared())
-               for vector in vectors]
+        rows = [row + [1.0] for row in rows]
+    return incircle_coords(*rows)
+
+
+def incircle_coords(*rows):
+    """incircle for points given as sequences of homogeneous coordinates."""
+    rows = [[x * 1000000000 for x in row[:-1]] + [1.0] if row[-1] == 0
+            # Infinite points become very, very far away finite points
+            else list(row) for row in rows]
+    size = len(rows)
+    if (size in (4, 5) and all(len(row) == size - 1 for row in rows) and
+            all(row[-1] == 1 for row in rows)):
+        filter_stats['incircle'] += 1
+        # Translate the last point to the origin. What's left is the
+        # standard lifted determinant, with the sign already sorted out.
+        query = rows[-1]
+        minor = [[x - q for x, q in zip(row[:-1], query)]
+                 for row in rows[:-1]]
+        if size == 4:
+            result = _sign(*_lifted_det3(minor), INCIRCLE_BOUND_2D)
+        else:
+            result = _sign(*_lifted_det4(minor), INCIRCLE_BOUND_3D)
+        if result is None:
+            filter_stats['incircle_exact'] += 1
+            exact = _exact_differences(rows[:-1], query)
+            result = exact_sign_det(
+                [row + [sum(x * x for x in row)] for row in exact])
+        return result
+
+    def exact_rows():
+        """The lifted matrix, with the lifting done exactly"""
+        exact = [[Fraction(x) for x in row] for row in rows]
+        return [row + [sum(x * x for x in row[:-1])] for row in exact]
+
+    lifted = [row + [sum(x * x for x in row[:-1])] for row in rows]
     # At this point we could switch the last two elements of each
-    # vector to get the matrix we want to test. But we can
+    # row to get the matrix we want to test. But we can
     # also just use the fact that if you swap 2 rows of a
     # matrix, the sign of the determinant is flipped. So:
-    return - Matrix(*vectors).sign_det()
+    return - filtered_sign_det(lifted, 'incircle', exact_rows)
+
+
+def _many_error_bounds(matrices):
+    """det_error_bound for a stack of square matrices"""
+    size = matrices.shape[-1]
+    hadamard = np.prod(np.sqrt(np.einsum('...ij,...ij->...i',
+                                         matrices, matrices)), axis=-1)
+    return size * size * 2 ** size * EPSILON * hadamard
+
+
+def ccw_many(points, homogeneous=True):
+    """ccw for a whole stack of point sets at once.
+
+    points is an (N, k, d+1) array (or (N, k, d) if homogeneous=False) and
+    the result is an int8 array of N signs, each equal to what ccw would
+    return for that row. One stacked determinant handles the easy cases,
+    and anything close to degenerate (or entirely at infinity) is handed to
+    ccw_coords one at a time.
+    """
+    points = np.array(points, dtype=float)
+    if not homogeneous:
+        points = np.concatenate([points, np.ones(points.shape[:-1] + (1,))],
+                                axis=-1)
+    if points.ndim != 3 or points.shape[1] != points.shape[2]:
+        raise ValueError("Expected an (N, d+1, d+1) array")
+    result = np.zeros(len(points), dtype=np.int8)
+    if not len(points):
+        return result
+    dets = np.linalg.det(points)
+    sure = ((points[:, :, -1] == 1).any(axis=1) &
+            (np.abs(dets) > _many_error_bounds(points)))
+    result[sure] = np.sign(dets[sure])
+    unsure = np.flatnonzero(~sure)
+    filter_stats['ccw_many'] += len(points)
+    filter_stats['ccw_many_fallback'] += len(unsure)
+    for i in unsure:
+        result[i] = ccw_coords(*points[i].tolist())
+    return result
+
+
+def incircle_many(points, homogeneous=True):
+    """incircle for a whole stack of point sets at once.
+
+    points is an (N, d+2, d+1) array (or (N, d+2, d) if homogeneous=False)
+    and the result is an int8 array of N signs, each equal to what incircle
+    would return for that row.
+    """
+    points = np.array(points, dtype=float)
+    if not homogeneous:
+        points = np.concatenate([points, np.ones(points.shape[:-1] + (1,))],
+                                axis=-1)
+    if points.ndim != 3 or points.shape[1] != points.shape[2] + 1:
+        raise ValueError("Expected an (N, d+2, d+1) array")
+    result = np.zeros(len(points), dtype=np.int8)
+    if not len(points):
+        return result
+    scaled = points.copy()
+    infinite = scaled[:, :, -1] == 0
+    # Infinite points become very, very far away finite points
+    scaled[infinite] *= 1000000000
+    scaled[infinite, -1] = 1
+    # Translating the last point to the origin leaves the usual lifted
+    # determinant (see incircle_coords)
+    translated = scaled[:, :-1, :-1] - scaled[:, -1:, :-1]
+    lifted = np.concatenate(
+        [translated, np.einsum('...i,...i', translated, translated)[
+            ..., None]], axis=-1)
+    dets = np.linalg.det(lifted)
+    sure = ((scaled[:, :, -1] == 1).all(axis=1) &
+            (np.abs(dets) > _many_error_bounds(lifted)))
+    result[sure] = np.sign(dets[sure])
+    unsure = np.flatnonzero(~sure)
+    filter_stats['incircle_many'] += len(points)
+    filter_stats['incircle_many_fallback'] += len(unsure)
+    for i in unsure:
+        result[i] = incircle_coords(*points[i].tolist())
+    return result
@@ -11,6 +11,8 @@ class Point:
         if not components:
             raise ValueError("Empty Point")
         self._components = np.array(components)
+        # Read-only, since the hash (and so any index of points) depends on it
+        self._components.flags.writeable = False
 
     def __repr__(self):
         """Return the string of the tuple of the components"""
@@ -50,8 +52,16 @@ class Point:
         return Vector(*[x - y for x, y in zip(self, p)])
 
     def __hash__(self):
-        """Implement hashing for data structures"""
-        return hash(self._components.tostring())
+        """Implement hashing for data structures
+
+        Components are hashed as floats (with -0.0 folded into 0.0), so that
+        points which compare equal hash equal too.
+        """
+        return hash((self._components.astype(float) + 0.0).tobytes())
+
+    def to_array(self):
+        """Return a (read-only) numpy array of the components"""
+        return self._components
 
     def to_vector(self):
         """Turn the point into a vector from the origin"""
@@ -0,0 +1,82 @@
+"""
+A binary container for the arrays of a triangulation.
+
+The file starts with MAGIC, the format version (a little-endian uint16) and
+the length of a JSON header (a little-endian uint32). The header holds some
+metadata, and the dtype, shape and offset of each array. The arrays follow,
+each starting at a multiple of ALIGN bytes so they can be memory-mapped
+straight from the file.
+
+See DelaunayTriangulation.save and DelaunayTriangulation.load.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b'PYVOR\x00'
+VERSION = 1
+ALIGN = 64
+
+
+def _aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def save_arrays(path, arrays, meta):
+    """Write a dict of arrays and a dict of JSON-able metadata to path"""
+    arrays = {name: np.ascontiguousarray(arr)
+              for name, arr in arrays.items()}
+    table = {}
+    prefix = len(MAGIC) + 6
+    header = b''
+    # The offsets depend on the length of the header, which depends on
+    # the offsets. Go around until they agree.
+    while True:
+        offset = _aligned(prefix + len(header))
+        for name, arr in arrays.items():
+            table[name] = {'dtype': arr.dtype.str, 'shape': arr.shape,
+                           'offset': offset}
+            offset = _aligned(offset + arr.nbytes)
+        encoded = json.dumps({'meta': meta, 'arrays': table}).encode()
+        if len(encoded) == len(header):
+            break
+        header = encoded
+    with open(path, 'wb') as out:
+        out.write(MAGIC + struct.pack('<HI', VERSION, len(header)) + header)
+        for name, arr in arrays.items():
+            out.write(b'\0' * (table[name]['offset'] - out.tell()))
+            out.write(arr.tobytes())
+
+
+def load_arrays(path, mmap=True):
+    """Read what save_arrays wrote, returning (arrays, meta)
+
+    With mmap, the arrays are copy-on-write memory maps of the file: they
+    are paged in as they are used, and changing them does not change the
+    file.
+    """
+    with open(path, 'rb') as stream:
+        start = stream.read(len(MAGIC) + 6)
+        if start[:len(MAGIC)] != MAGIC:
+            raise ValueError("{} is not a saved triangulation".format(path))
+        version, length = struct.unpack('<HI', start[len(MAGIC):])
+        if version > VERSION:
+            raise ValueError("{} was saved by a newer version (format {}, "
+                             "this reads up to {})".format(path, version,
+                                                           VERSION))
+        header = json.loads(stream.read(length).decode())
+        arrays = {}
+        for name, spec in header['arrays'].items():
+            dtype = np.dtype(spec['dtype'])
+            shape = tuple(spec['shape'])
+            count = int(np.prod(shape))
+            if mmap and count:
+                arrays[name] = np.memmap(path, dtype, 'c', spec['offset'],
+                                         shape)
+            else:
+                stream.seek(spec['offset'])
+                arrays[name] = np.fromfile(stream, dtype,
+                                           count).reshape(shape)
+    return arrays, header['meta']
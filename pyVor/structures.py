@@ -2,12 +2,18 @@
 
 """Data structures. Enough said."""
 
-from random import shuffle
+from collections import Counter, deque
+from itertools import product
+from random import Random
 # We could seed with /dev/urandom, but
 # "O(n log(n)) for PPT adversaries" is not an important feature
+import numpy as np
+from pyVor.ordering import hilbert_keys, insertion_order
 from pyVor.primitives import Point
-from pyVor.predicates import ccw, incircle
-from pyVor.utils import circumcenter
+from pyVor.predicates import ccw, incircle, ccw_many, incircle_many
+from pyVor.storage import load_arrays, save_arrays
+from pyVor.utils import (circumcenter, circumcenters, clip_polygon,
+                         polygon_area_centroid, voronoi_pieces)
 
 
 def outer_face_pts(dimension):
@@ -39,20 +45,125 @@ class GeneralPositionError(Exception):
         super().__init__("Points not in general position", *args)
 
 
+class PointIndex:
+    """A hash index of points, for spotting duplicates in constant time.
+
+    With tolerance 0, points are keyed on their exact coordinates. With a
+    positive tolerance, space is chopped into a grid of cells that wide, and
+    a point matches anything stored in its own cell or a neighboring one
+    that is within tolerance of it (in the Euclidean sense).
+
+    Each point is stored with a value (say, the vertex it became), which is
+    what find returns.
+    """
+
+    def __init__(self, tolerance=0):
+        if tolerance < 0:
+            raise ValueError("Negative tolerance")
+        self.tolerance = tolerance
+        self._table = {}
+        self._pending = []  # from add_many, not in the table yet
+
+    def __len__(self):
+        if self._pending:
+            self._load()
+        return sum(len(bucket) for bucket in self._table.values())
+
+    def add_many(self, points, values):
+        """Store each row of points with the matching one of values
+
+        This is the same as calling add for each of them, except that they
+        only go in the table once it is needed, so a triangulation that is
+        loaded (see DelaunayTriangulation.load) is ready to use right away.
+        """
+        self._pending.append((points, values))
+
+    def _load(self):
+        """Put the points from add_many into the table"""
+        pending, self._pending = self._pending, []
+        for points, values in pending:
+            for point, value in zip(np.asarray(points, dtype=float), values):
+                self.add(point, value)
+
+    def _key(self, coords):
+        """The dictionary key for some coordinates (as a float array)"""
+        if not self.tolerance:
+            # + 0.0 turns -0.0 into 0.0
+            return (coords + 0.0).tobytes()
+        return tuple(np.floor(coords / self.tolerance).astype(int).tolist())
+
+    def _keys_near(self, coords):
+        """All the keys that a match for coords could be stored under"""
+        if not self.tolerance:
+            yield self._key(coords)
+            return
+        key = self._key(coords)
+        for offset in product((-1, 0, 1), repeat=len(key)):
+            yield tuple(k + o for k, o in zip(key, offset))
+
+    def find(self, point):
+        """Return the value stored with a matching point, or None"""
+        if self._pending:
+            self._load()
+        coords = np.asarray(point, dtype=float)
+        for key in self._keys_near(coords):
+            for stored, value in self._table.get(key, ()):
+                if (not self.tolerance or
+                        np.linalg.norm(stored - coords) <= self.tolerance):
+                    return value
+        return None
+
+    def add(self, point, value):
+        """Store a point, along with a value for find to return"""
+        if self._pending:
+            self._load()
+        coords = np.array(point, dtype=float)
+        self._table.setdefault(self._key(coords), []).append((coords, value))
+
+    def remove(self, point):
+        """Forget a stored point (which must be exactly the stored one)"""
+        if self._pending:
+            self._load()
+        coords = np.asarray(point, dtype=float)
+        key = self._key(coords)
+        bucket = self._table[key]
+        for i, (stored, value) in enumerate(bucket):
+            if np.array_equal(stored, coords):
+                del bucket[i]
+                break
+        else:
+            raise KeyError(point)
+        if not bucket:
+            del self._table[key]
+
+
 class DelaunayTriangulation:
     """A Delaunay triangulation of a finite point set."""
 
+    HIERARCHY_RATIO = 30  # points per level over points in the next one up
+    HIERARCHY_MAX_LEVELS = 5  # including the triangulation itself
+    CHECK_LINKS = False  # cross-check twins by brute force (slow, debugging)
+    INSERTIONS = ('shatter', 'bowyer-watson')  # the first is the default
+    REBUILD_FRACTION = 0.25  # move_many rebuilds if this many vertices move
+    REBUILD_MIN_VERTICES = 500  # but never with fewer vertices than this
+
     class Vertex:
         """Vertices of the simplicial complex, with an order imposed.
 
         Incidence is not implemented at this time. I doubt it will be.
 
-        Never reassign the point attribute, since you'll change the hash.
+        The hash is worked out from the point when the Vertex is made, and
+        does not change after that. Only move_vertex should reassign point.
+
+        input_index is the position of the point in the input that the
+        triangulation was built from, if it came from there.
         """
-        def __init__(self, point):
+        def __init__(self, point, input_index=None):
             if not isinstance(point, Point):
                 raise ValueError
             self.point = point
+            self.input_index = input_index
+            self._hash = hash(point)
 
         def __gt__(self, other):
             # return hash(self) > hash(other)
@@ -83,11 +194,15 @@ class DelaunayTriangulation:
         #    return self.point == other.point
 
         def __hash__(self):
-            return hash(self.point)
+            return self._hash
 
     class Face:
         """The best faces you've ever seen"""
 
+        # Filled in by circumcenter and circumradius_squared when needed
+        _circumcenter = None
+        _circumradius_squared = None
+
         def __init__(self, vertices, initial_half_facets=None):
             self.vertices = frozenset(vertices)
             self.half_facets = initial_half_facets or {}
@@ -120,6 +235,36 @@ class DelaunayTriangulation:
             """
             return [vert.point for vert in self.vertices]
 
+        def circumcenter(self):
+            """The center of the sphere through the points, as a Point
+
+            This is computed the first time it is asked for and then kept.
+            Faces with infinite vertices get a center very far away (see
+            utils.circumcenter).
+            """
+            if self._circumcenter is None:
+                self._circumcenter = circumcenter(*self.points())
+            return self._circumcenter
+
+        def circumradius_squared(self):
+            """The squared radius of the circumsphere (infinite if the face is)
+
+            Kept like the circumcenter.
+            """
+            if self._circumradius_squared is None:
+                points = self.points()
+                if any(point[-1] == 0 for point in points):
+                    self._circumradius_squared = float('inf')
+                else:
+                    self._circumradius_squared = float(
+                        (points[0] - self.circumcenter()).norm_squared())
+            return self._circumradius_squared
+
+        def _forget_circumsphere(self):
+            """Drop the cached circumsphere, after a vertex has moved"""
+            self._circumcenter = None
+            self._circumradius_squared = None
+
         def iter_facets(self):
             """Iterate through the half-facets.
 
@@ -139,12 +284,19 @@ class DelaunayTriangulation:
         and opposite (i.e. the vertex opposite this HF).
         """
 
-        def __init__(self, opposite, vertices, face, twin=None):
-            """Constructor. See class docstring"""
+        def __init__(self, opposite, vertices, face, twin=None, side=None):
+            """Constructor. See class docstring
+
+            If the orientation (ccw of the points, then opposite) has already
+            been computed, pass it as side. The points are taken in the
+            iteration order of vertices, so vertices should be a frozenset.
+            """
             self.face = face
             self._vertices = frozenset(vertices)  # could store implicitly
             self.opposite = opposite
-            if twin and twin.side:
+            if side is not None:
+                self.side = side
+            elif twin and twin.side:
                 # Save a little time.
                 self.side = -1 * twin.side
             else:
@@ -220,30 +372,233 @@ class DelaunayTriangulation:
                  # location_visualizer=None, draw_circle=None,
                  # draw_triangulation=None,
                  # highlight_edge=None,
-                 gui=None):  # visualization=False, delete_edge=None
-
-        """Construct the delaunay triangulation of the point list"""
+                 gui=None,  # visualization=False, delete_edge=None
+                 tolerance=0, jump=False, hierarchy=False, order=None,
+                 seed=None, insertion=None):
+
+        """Construct the delaunay triangulation of the point list
+
+        Points within tolerance of one that is already in the triangulation
+        are treated as duplicates of it (see PointIndex). By default only
+        exact duplicates are.
+
+        If jump is True, point location uses jump-and-walk (see locate)
+        unless told otherwise.
+
+        If hierarchy is True, a Delaunay hierarchy is kept alongside the
+        triangulation: each coarser level holds a random sample of about
+        1/HIERARCHY_RATIO of the points in the level below it. Point location
+        then descends from the coarsest level, which takes O(log n) expected
+        steps instead of a walk across the whole triangulation.
+
+        order is the order the points are inserted in, one of
+        pyVor.ordering.ORDERS. 'hilbert' (the default) and 'morton' insert
+        them in random rounds, each sorted along that space filling curve,
+        so that each point is usually close to the last one. 'random' is a
+        plain shuffle, and 'input' keeps the order of the list, which is
+        also what randomize=False means. The list itself is never changed.
+        seed seeds the random choices made here, for reproducible results.
+
+        insertion picks the algorithm delaunay_add uses, one of INSERTIONS.
+        'shatter' (the default) shatters the face containing the new point
+        and pops facets until everything is locally delaunay again.
+        'bowyer-watson' finds all of the faces in conflict with the new point
+        first, and replaces them in one go, which is faster.
+        """
         if not homogeneous:
             points = [pt.lift(lambda x: 1) for pt in points]
             homogeneous = True  # just for emphasis
-        dimension = len(points[0]) - 1  # -1 because homogenous
-        outer_face = [*map(self.Vertex, outer_face_pts(dimension))]
-        # The resulting "outer face" contains every point in R^d
-        self.faces = set([self.Face(outer_face)])
-        self.vertices = set(outer_face)
-        self.facets = set()
-        self.gui = gui
         # self.gui.draw_point_locate = location_visualizer  # ???
         # self.gui.draw_circle = draw_circle
         # self.gui.draw_triangulation = draw_triangulation
         # self.gui.highlight_edge = highlight_edge
         # self.gui.visualization = visualization
         # self.gui.delete_edge = delete_edge
-        if randomize:
-            shuffle(points)  # randomize this thing (in place)
-        self.point_history = []  # per request of gui folks
-        for point in points:
-            self.delaunay_add(point)
+        coords = np.array([pt.to_array() for pt in points], dtype=float)
+        self._construct(coords, points, randomize, gui, tolerance, jump,
+                        hierarchy, order, seed, insertion)
+
+    @classmethod
+    def from_array(cls, arr, homogeneous=False, **kwargs):
+        """Construct the delaunay triangulation of the rows of an array
+
+        arr is an (n, d) array of points, or (n, d+1) if homogeneous. The
+        keyword arguments are the same as for the constructor. The input
+        index of each vertex is its row in arr, which is what
+        simplex_indices refers to.
+
+        ArrayDelaunayTriangulation.from_array reads the rows directly,
+        without making a Point for each of them.
+        """
+        coords = np.asarray(arr, dtype=float)
+        if coords.ndim != 2 or not len(coords):
+            raise ValueError("Expected a non-empty (n, d) array")
+        if not homogeneous:
+            coords = np.hstack([coords, np.ones((len(coords), 1))])
+        del_tri = cls.__new__(cls)
+        del_tri._construct(coords, None, **kwargs)
+        return del_tri
+
+    def save(self, path):
+        """Write the triangulation to a file, for load to open again
+
+        The file (see pyVor.storage) holds the coordinates of the vertices,
+        the simplices (including the infinite ones) as positively oriented
+        rows of vertex indices, and their neighbors, so loading it does not
+        have to work anything out again. Either engine can load what either
+        one saved. The hierarchy, the gui and any listeners are not saved.
+        """
+        save_arrays(path, *self._state())
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Open a triangulation written by save
+
+        With mmap, an ArrayDelaunayTriangulation keeps its arrays as memory
+        maps of the file, so it can be used (located in, queried, turned into
+        a Voronoi diagram) right away, and only reads what it touches. It
+        can be changed as well, without changing the file.
+        DelaunayTriangulation always reads the whole file to make its faces.
+        """
+        del_tri = cls.__new__(cls)
+        del_tri._set_state(*load_arrays(path, mmap))
+        return del_tri
+
+    def __getstate__(self):
+        """Pickle the flat arrays that save writes, not the faces
+
+        The graph of faces, half-facets and vertices is deep enough to run
+        into the recursion limit, and big. The arrays are neither, and the
+        adjacency comes back from the neighbor array on unpickling. As with
+        save, the hierarchy, the gui and any listeners are left behind.
+        """
+        arrays, meta = self._state()
+        return {'arrays': arrays, 'meta': meta}
+
+    def __setstate__(self, state):
+        self._set_state(state['arrays'], state['meta'])
+
+    def _state(self):
+        """The arrays (see _arrays) and metadata for save and pickle"""
+        arrays = self._arrays()
+        simplices = arrays['simplices']
+        vertex_simplex = np.full(len(arrays['coords']), -1, dtype=np.int32)
+        vertex_simplex[simplices.ravel()] = np.repeat(
+            np.arange(len(simplices), dtype=np.int32), simplices.shape[1])
+        arrays['vertex_simplex'] = vertex_simplex
+        return arrays, {
+            'engine': type(self).__name__, 'dimension': self.dimension(),
+            'tolerance': self.point_index.tolerance, 'jump': self.jump,
+            'insertion': self.insertion}
+
+    def _set_state(self, arrays, meta):
+        """Become the triangulation that _state described"""
+        insertion = meta['insertion']
+        self._init_empty(
+            meta['dimension'], tolerance=meta['tolerance'], jump=meta['jump'],
+            insertion=insertion if insertion in self.INSERTIONS else None)
+        self._restore(arrays)
+
+    def _construct(self, coords, points, randomize=True, gui=None,
+                   tolerance=0, jump=False, hierarchy=False, order=None,
+                   seed=None, insertion=None):
+        """Add the rows of coords (homogeneous) as __init__ describes
+
+        points are the corresponding Points, or None to make them as needed.
+        """
+        dimension = coords.shape[1] - 1  # -1 because homogenous
+        self._init_empty(dimension, gui, tolerance, jump, seed, insertion)
+        self.hierarchy = hierarchy
+        if order is None:
+            order = 'hilbert' if randomize else 'input'
+        weights = coords[:, -1:]
+        cartesian = coords[:, :-1] / np.where(weights == 0, 1, weights)
+        for index in insertion_order(cartesian, order, self._random):
+            self._add_input(coords[index], index,
+                            None if points is None else points[index])
+
+    def _add_input(self, coords, index, point=None):
+        """Add row index of the input, with coordinates coords
+
+        point is the Point for it, if the caller has one already.
+        """
+        if point is None:
+            point = Point(*coords)
+        self.delaunay_add(point, index=index)
+
+    def _init_empty(self, dimension, gui=None, tolerance=0, jump=False,
+                    seed=None, insertion=None):
+        """Set up an empty triangulation, without any points added"""
+        insertion = insertion or self.INSERTIONS[0]
+        if insertion not in self.INSERTIONS:
+            raise ValueError("insertion must be one of {}, not {!r}".format(
+                ', '.join(self.INSERTIONS), insertion))
+        self.insertion = insertion
+        self._setup(dimension)
+        self._random = Random(seed)
+        self.gui = gui
+        self.jump = jump
+        self.walk_length = 0  # faces visited by the last locate
+        self.point_index = PointIndex(tolerance)
+        self.hierarchy = False
+        self._levels = [self]  # this one, then the coarser hierarchy levels
+        self._listeners = []
+        self._last_nearest = None  # a hint for the next nearest_vertex
+
+    def _empty_like(self, insertion=None):
+        """An empty triangulation of the same kind and dimension
+
+        These are used as levels of the hierarchy, and as scratch space.
+        """
+        level = type(self).__new__(type(self))
+        level._init_empty(self.dimension(),
+                          seed=self._random.getrandbits(32),
+                          insertion=insertion or self.insertion)
+        return level
+
+    def subscribe(self, listener):
+        """Tell listener about every face that is made or destroyed
+
+        listener.faces_died(faces) is called with the faces that are about to
+        go, while their neighbors can still be looked up, and
+        listener.faces_born(faces) with the new faces once they are linked
+        in. A face whose vertex moves (see move_vertex) dies and is born
+        again.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Stop telling listener about faces"""
+        self._listeners.remove(listener)
+
+    def _notify(self, event, faces):
+        """Call event ('faces_born' or 'faces_died') on every listener"""
+        for listener in self._listeners:
+            getattr(listener, event)(faces)
+
+    def _setup(self, dimension):
+        """Create the storage for an empty triangulation of R^dimension.
+
+        Subclasses with a different storage engine override this.
+        """
+        outer_face = [*map(self.Vertex, outer_face_pts(dimension))]
+        # The resulting "outer face" contains every point in R^d
+        self.faces = set([self.Face(outer_face)])
+        self.vertices = set(outer_face)
+        self.facets = set()
+        # The inserted vertices, in order, and a list to sample them from
+        # (see _closest_sampled_vertex)
+        self._history = {}
+        self._sample_pool = []
+        # Some face containing each vertex, and the most recent face made
+        self._vertex_face = {vert: next(iter(self.faces))
+                             for vert in outer_face}
+        self._last_face = next(iter(self.faces))
+
+    @property
+    def point_history(self):
+        """The points inserted so far, in order (per request of gui folks)"""
+        return [vertex.point for vertex in self._history]
 
     def __str__(self):
         """ Have the string representation be JSON """
@@ -252,24 +607,307 @@ class DelaunayTriangulation:
     def __repr__(self):
         return self.__str__()
 
-    def delaunay_add(self, point, homogeneous=True):
-        """Add a point and then recover the delaunay property"""
+    def delaunay_add(self, point, homogeneous=True, hint=None, index=None):
+        """Add a point and then recover the delaunay property
+
+        Returns the new Vertex. If the point is a duplicate of one that is
+        already here, nothing changes and the existing Vertex is returned.
+        hint is passed on to locate, and index becomes the input_index of
+        the new Vertex.
+        """
         # print('\n{}'.format(len(self.faces)))
         if homogeneous is False:
             point = point.lift(lambda x: 1)
-        if point in self.point_history:
-            return
-        self.point_history.append(point)
+        existing = self.point_index.find(point.to_array())
+        if existing is not None:
+            return existing
+        located = []
+        if hint is None and len(self._levels) > 1:
+            located, hint, _ = self._descend(point)
+        new_vert = self.Vertex(point, index)
         # dead_face = self.locate(point)
-        hf_stack = set(self._face_shatter(self.locate(point)))
+        if self.insertion == 'bowyer-watson':
+            ld_halffacets = self._cavity_boundary(self.locate(point, hint),
+                                                  new_vert)
+        else:
+            ld_halffacets = self._shatter(self.locate(point, hint), new_vert)
+        self.vertices.add(new_vert)
+        self.point_index.add(point.to_array(), new_vert)
+        self._history[new_vert] = None
+        self._sample_pool.append(new_vert)
+        # (bisect_left(self.vertices, new_vert), new_vert)
+        new_faces = self._star_faces(ld_halffacets, new_vert)
+        self._link_new_faces(new_faces, new_vert)
+        if self.CHECK_LINKS:
+            self._check_links(new_faces)
+        # [face for face in new_faces if face not in self.faces])
+        if self.gui and self.gui.visualization:
+            self.gui.draw_triangulation(self, clear=True)
+        self.faces.update(new_faces)
+        for face in new_faces:
+            for vert in face.vertices:
+                self._vertex_face[vert] = face
+        self._last_face = new_faces[-1]
+        if self._listeners:
+            self._notify('faces_born', new_faces)
+        if self.hierarchy:
+            self._promote(point, located)
+        return new_vert
+
+    def delaunay_remove(self, point, homogeneous=True):
+        """Remove the vertex at point, and re-triangulate the hole it leaves
+
+        The new faces are those of a small triangulation of the vertices
+        around the removed one (its link) that are in conflict with the
+        removed point, which is exactly what the hole needs. So this takes
+        time proportional to the number of faces around the vertex.
+
+        Returns the removed Vertex. Raises KeyError if there is no vertex at
+        point (or, with a tolerance, near it).
+        """
+        if homogeneous is False:
+            point = point.lift(lambda x: 1)
+        vertex = self.point_index.find(point.to_array())
+        if vertex is None:
+            raise KeyError(point)
+        star = self._star_of(vertex)
+        # The facets opposite vertex bound the hole. Remember what is on the
+        # other side of each of them.
+        outside = {}
+        for face in star:
+            halffacet = face.half_facets[vertex]
+            outside[halffacet._vertices] = halffacet.twin
+        link = {vert.point: vert for face in star for vert in face.vertices
+                if vert is not vertex}
+        scratch = self._empty_like('bowyer-watson')
+        for link_point in link:
+            if link_point[-1] != 0:  # the outer face is there already
+                scratch.delaunay_add(link_point)
+        conflict = scratch._conflict_region(scratch.locate(vertex.point),
+                                            scratch.Vertex(vertex.point))[0]
+        new_faces = [self.Face([link[pt] for pt in face.points()])
+                     for face in conflict]
+        if self._listeners:
+            self._notify('faces_died', list(star))
+        unmatched = {}
+        for face in new_faces:
+            for halffacet in face.iter_facets():
+                key = halffacet._vertices
+                if key in outside:
+                    twin = outside[key]
+                else:
+                    twin = unmatched.pop(key, None)
+                    if twin is None:
+                        unmatched[key] = halffacet
+                        continue
+                halffacet.twin = twin
+                if twin is not None:
+                    twin.twin = halffacet
+        self.faces.difference_update(star)
+        self.faces.update(new_faces)
+        for face in new_faces:
+            for vert in face.vertices:
+                self._vertex_face[vert] = face
+        self._last_face = new_faces[-1]
+        if self._listeners:
+            self._notify('faces_born', new_faces)
+        self.vertices.remove(vertex)
+        self.point_index.remove(vertex.point.to_array())
+        del self._vertex_face[vertex]
+        del self._history[vertex]
+        if 2 * len(self._history) < len(self._sample_pool):
+            self._sample_pool = list(self._history)
+        for level in self._levels[1:]:
+            if level.point_index.find(vertex.point.to_array()) is not None:
+                level.delaunay_remove(vertex.point)
+        return vertex
+
+    def move_vertex(self, old_point, new_point, homogeneous=True):
+        """Move the vertex at old_point to new_point
+
+        If the star of the vertex is still a valid triangulation with the
+        vertex at new_point, and every facet of the star is still locally
+        delaunay, only the coordinates change. Otherwise the vertex is
+        removed, and then inserted again with the walk starting where it
+        was removed.
+
+        Returns the vertex at new_point. After a reinsertion that is a new
+        Vertex, with the same input_index. If new_point is a duplicate of
+        another vertex, the moved one is merged into it. Raises KeyError if
+        there is no vertex at old_point.
+        """
+        if homogeneous is False:
+            old_point = old_point.lift(lambda x: 1)
+            new_point = new_point.lift(lambda x: 1)
+        vertex = self.point_index.find(old_point.to_array())
+        if vertex is None:
+            raise KeyError(old_point)
+        occupant = self.point_index.find(new_point.to_array())
+        if occupant is None or occupant == vertex:
+            moved = self._move_in_place(vertex, old_point, new_point)
+            if moved is not None:
+                return moved
+        index = self.delaunay_remove(old_point).input_index
+        return self.delaunay_add(new_point, hint=self._last_hint(),
+                                 index=index)
+
+    def move_many(self, old_points, new_points, homogeneous=True):
+        """Move the vertex at each of old_points to new_points, for a frame
+
+        Moves that can be done in place (see move_vertex) are done first.
+        The other vertices are then all removed, and inserted again along a
+        space filling curve, so that each walk is short. Vertices can trade
+        places. Returns the moved vertices, in order.
+
+        If at least REBUILD_FRACTION of the vertices move, building the
+        whole triangulation again is quicker than that, so that is what
+        happens (see _rebuild). Small triangulations, with fewer than
+        REBUILD_MIN_VERTICES vertices, are never rebuilt.
+        """
+        if homogeneous is False:
+            old_points = [pt.lift(lambda x: 1) for pt in old_points]
+            new_points = [pt.lift(lambda x: 1) for pt in new_points]
+        if len(old_points) != len(new_points):
+            raise ValueError("Expected as many new points as old ones")
+        size = len(self.vertices) - self.dimension() - 1
+        if (size >= self.REBUILD_MIN_VERTICES and
+                len(old_points) >= self.REBUILD_FRACTION * size):
+            return self._rebuild(old_points, new_points)
+        moved = [None] * len(old_points)
+        pending = []
+        for k, (old_point, new_point) in enumerate(zip(old_points,
+                                                       new_points)):
+            vertex = self.point_index.find(old_point.to_array())
+            if vertex is None:
+                raise KeyError(old_point)
+            occupant = self.point_index.find(new_point.to_array())
+            if occupant is None or occupant == vertex:
+                moved[k] = self._move_in_place(vertex, old_point, new_point)
+            if moved[k] is None:
+                pending.append(k)
+        indices = {k: self.delaunay_remove(old_points[k]).input_index
+                   for k in pending}
+        if pending:
+            coords = np.array([new_points[k].to_array() for k in pending],
+                              dtype=float)
+            weights = coords[:, -1:]
+            cartesian = coords[:, :-1] / np.where(weights == 0, 1, weights)
+            for position in insertion_order(cartesian, 'hilbert',
+                                            self._random):
+                k = pending[position]
+                moved[k] = self.delaunay_add(new_points[k],
+                                             hint=self._last_hint(),
+                                             index=indices[k])
+        return moved
+
+    def _rebuild(self, old_points, new_points):
+        """Move the vertices at old_points by triangulating from scratch
+
+        Every vertex is inserted again, in the order and with the settings
+        the constructor would use, keeping its input_index. The listeners
+        hear that all of the old faces died and all of the new ones were
+        born, rather than about each insertion. Returns the moved vertices,
+        as move_many does.
+        """
+        width = self.dimension() + 1
+        arrays = self._arrays()
+        coords = np.array(arrays['coords'][width:], dtype=float)
+        indices = arrays['input_index'][width:].tolist()
+        rows = PointIndex(self.point_index.tolerance)
+        rows.add_many(coords, range(len(coords)))
+        targets = []
+        for old_point in old_points:
+            row = rows.find(old_point.to_array())
+            if row is None:
+                raise KeyError(old_point)
+            targets.append(row)
+        for row, new_point in zip(targets, new_points):
+            coords[row] = new_point.to_array()
+        listeners = self._listeners
+        if listeners:
+            self._notify('faces_died', list(self.faces))
+        random, hierarchy = self._random, self.hierarchy
+        self._init_empty(self.dimension(), self.gui,
+                         self.point_index.tolerance, self.jump,
+                         insertion=self.insertion)
+        self._random, self.hierarchy = random, hierarchy
+        weights = coords[:, -1:]
+        cartesian = coords[:, :-1] / np.where(weights == 0, 1, weights)
+        for row in insertion_order(cartesian, 'hilbert', self._random):
+            self._add_input(coords[row],
+                            None if indices[row] < 0 else indices[row])
+        self._listeners = listeners
+        if listeners:
+            self._notify('faces_born', list(self.faces))
+        return [self.point_index.find(new_point.to_array())
+                for new_point in new_points]
+
+    def _move_in_place(self, vertex, old_point, new_point):
+        """Move vertex to new_point without changing the combinatorics
+
+        Returns the vertex if that worked, and None (having changed nothing)
+        if the star of the vertex would stop being valid or delaunay.
+        """
+        star = self._star_of(vertex)
+        facets = [face.half_facets[vertex] for face in star]
+        sides = ccw_many([[pt.to_array() for pt in halffacet.points()] +
+                          [new_point.to_array()] for halffacet in facets])
+        if (sides != [halffacet.side for halffacet in facets]).any():
+            return None
+        vertex.point = new_point
+        if not self._locally_delaunay(star):
+            vertex.point = old_point
+            return None
+        self.point_index.remove(old_point.to_array())
+        self.point_index.add(new_point.to_array(), vertex)
+        self._move_in_levels(old_point, new_point)
+        for face in star:
+            face._forget_circumsphere()
+        if self._listeners:
+            self._notify('faces_died', star)
+            self._notify('faces_born', star)
+        return vertex
+
+    def _move_in_levels(self, old_point, new_point):
+        """Move a point in the coarser hierarchy levels that have it"""
+        for level in self._levels[1:]:
+            if level.point_index.find(old_point.to_array()) is not None:
+                level.move_vertex(old_point, new_point)
+
+    def _last_hint(self):
+        """A hint for locate near the most recent change"""
+        return self._last_face
+
+    def _star_of(self, vertex):
+        """The faces containing vertex, found by walking around it"""
+        start = self._vertex_face[vertex]
+        star = {start}
+        stack = [start]
+        while stack:
+            face = stack.pop()
+            for opposite, halffacet in face.half_facets.items():
+                if opposite is vertex or halffacet.twin is None:
+                    continue
+                neighbor = halffacet.twin.face
+                if neighbor not in star:
+                    star.add(neighbor)
+                    stack.append(neighbor)
+        return star
+
+    def _shatter(self, start, new_vert):
+        """Shatter start and pop facets until everything is locally delaunay
+
+        This is the default insertion algorithm, and the one the GUI can
+        animate. The faces in conflict with new_vert are removed from
+        self.faces one at a time. Returns the halffacets on the boundary of
+        the hole they leave.
+        """
+        hf_stack = set(self._face_shatter(start))
         if self.gui and self.gui.visualization:
             for facet in hf_stack:
                 if not facet.is_infinite():
                     self.gui.highlight_edge(facet)
         # already_processed = set()
-        new_vert = self.Vertex(point)
-        self.vertices.add(new_vert)
-        # (bisect_left(self.vertices, new_vert), new_vert)
         ld_halffacets = set()  # locally delaunay halffacets
         while hf_stack:
             free_facet = hf_stack.pop()
@@ -309,15 +947,74 @@ class DelaunayTriangulation:
                     self.gui.delete_edge(free_facet)
             if self.gui and self.gui.visualization:
                 self.gui.draw_triangulation(self, sleep=True)
-        new_faces = []
-        for halffacet in ld_halffacets:
-            # I have to link up all these edges now
-            new_faces.append(self.Face(
-                [*halffacet.vertices(), new_vert],
-                initial_half_facets={new_vert: halffacet}))
-        # Now link the halffaces to their twins, by brute force
+        return ld_halffacets
+
+    def _cavity_boundary(self, start, new_vert):
+        """Remove the faces in conflict with new_vert (Bowyer-Watson)
+
+        The conflict region is found with a breadth first search of incircle
+        tests from start (which must contain the new point), and then deleted
+        all at once. Returns the halffacets on the boundary of the hole.
+        """
+        conflict, boundary = self._conflict_region(start, new_vert)
+        if self._listeners:
+            self._notify('faces_died', conflict)
+        self.faces.difference_update(conflict)
+        return boundary
+
+    def _conflict_region(self, start, new_vert):
+        """The faces in conflict with new_vert, and their boundary
+
+        See _cavity_boundary, which this does the searching for.
+        """
+        conflict = {start: True}
+        queue = deque([start])
+        boundary = []
+        while queue:
+            face = queue.popleft()
+            for halffacet in face.iter_facets():
+                twin = halffacet.twin
+                if twin is None:
+                    boundary.append(halffacet)
+                    continue
+                neighbor = twin.face
+                if neighbor not in conflict:
+                    conflict[neighbor] = not halffacet.locally_delaunay(
+                        new_vert)
+                    if conflict[neighbor]:
+                        queue.append(neighbor)
+                if not conflict[neighbor]:
+                    boundary.append(halffacet)
+        return ([face for face, in_conflict in conflict.items()
+                 if in_conflict], boundary)
+
+    def _link_new_faces(self, new_faces, new_vert):
+        """Link the halffacets shared by the new faces to their twins
+
+        Two new faces share a ridge through new_vert exactly when the
+        halffacets opposite their other vertices have the same vertices, so
+        a dict keyed on those vertices pairs them up in one pass.
+        """
+        unmatched = {}
+        for face in new_faces:
+            for vert, halffacet in face.half_facets.items():
+                if vert is new_vert:
+                    continue  # the old boundary, linked by _star_faces
+                twin = unmatched.pop(halffacet._vertices, None)
+                if twin is None:
+                    unmatched[halffacet._vertices] = halffacet
+                else:
+                    halffacet.twin = twin
+                    twin.twin = halffacet
+
+    def _check_links(self, new_faces):
+        """Compare the twins of the new faces against a brute force search
+
+        This is quadratic in the number of new faces, so it only runs if
+        CHECK_LINKS is set. Raises AssertionError on a mismatch.
+        """
         for face_0 in new_faces:
-            for face_1 in new_faces:  # j in range(i+1, len(new_faces)):
+            for face_1 in new_faces:
                 diff = face_0.vertices.symmetric_difference(
                     face_1.vertices)
                 if len(diff) == 2:
@@ -329,13 +1026,36 @@ class DelaunayTriangulation:
                             link_us.append(face_0.half_facets[vert])
                         else:
                             link_us.append(face_1.half_facets[vert])
-                    # Now link them
-                    link_us[0].twin = link_us[1]
-                    link_us[1].twin = link_us[0]
-        # [face for face in new_faces if face not in self.faces])
-        if self.gui and self.gui.visualization:
-            self.gui.draw_triangulation(self, clear=True)
-        self.faces.update(new_faces)
+                    assert link_us[0].twin is link_us[1]
+                    assert link_us[1].twin is link_us[0]
+
+    def _star_faces(self, boundary, new_vert):
+        """Make a face from each boundary HalfFacet and new_vert.
+
+        The HalfFacets in boundary are reused (opposite new_vert). Each new
+        face also needs d brand new HalfFacets, and their orientation tests
+        are done all at once with ccw_many.
+        """
+        pending = []
+        for halffacet in boundary:
+            for vertex in halffacet.vertices():
+                pending.append((halffacet, vertex, frozenset(
+                    [*halffacet.vertices(), new_vert]).difference([vertex])))
+        # The frozensets are passed on to the HalfFacets as they are, so the
+        # point order used here is the one they will use.
+        sides = ccw_many([[vert.point.to_array() for vert in facet] +
+                          [vertex.point.to_array()]
+                          for halffacet, vertex, facet in pending])
+        if not sides.all():
+            raise GeneralPositionError
+        half_facets = {halffacet: {new_vert: halffacet}
+                       for halffacet in boundary}
+        for (halffacet, vertex, facet), side in zip(pending, sides):
+            half_facets[halffacet][vertex] = self.HalfFacet(
+                vertex, facet, None, side=int(side))
+        return [self.Face([*halffacet.vertices(), new_vert],
+                          initial_half_facets=half_facets[halffacet])
+                for halffacet in boundary]
 
     def _face_shatter(self, face):
         """Remove a face from self.faces and return all of its HalfFacets.
@@ -343,6 +1063,8 @@ class DelaunayTriangulation:
         (We shall do science to them.)
         """
         self.faces.remove(face)  # constant time set operation win!
+        if self._listeners:
+            self._notify('faces_died', [face])
         return face.iter_facets()
 
     def _facet_pop(self, facet, fsopuwmcd=None):
@@ -358,13 +1080,29 @@ class DelaunayTriangulation:
         return [fct for fct in self._face_shatter(fsopuwmcd) if fct !=
                 facet.twin]
 
-    def locate(self, point):
-        """Point location with visibility walk"""
+    def locate(self, point, hint=None, jump=None):
+        """Point location with visibility walk
+
+        The walk starts at hint (a Face) if there is one and it is still part
+        of the triangulation. Otherwise it starts at the last face made by
+        delaunay_add, which is close by for spatially coherent input. With
+        jump=True (or self.jump), it instead samples about n^(1/(d+1))
+        vertices and starts next to the closest one ("jump-and-walk"). If
+        there is a hierarchy, and neither a hint nor jump is given, the
+        walk starts where descending the hierarchy ends up instead.
+
+        walk_length is set to the number of faces visited, on all levels.
+        """
+        steps = 0
+        if hint is None and not jump and len(self._levels) > 1:
+            hint, steps = self._descend(point)[1:]
         not_done = True
-        current_face = self._arbitrary_face()
+        current_face = self._start_face(point, hint, jump)
+        self.walk_length = steps
         while not_done:
             if self.gui and self.gui.visualization:
                 self.gui.draw_point_locate(current_face)
+            self.walk_length += 1
             not_done = False
             for halffacet in current_face.iter_facets():
                 if halffacet.lineside(point) == -1:
@@ -373,14 +1111,214 @@ class DelaunayTriangulation:
                     break
         return current_face
 
+    def nearest_vertex(self, query, homogeneous=True):
+        """The vertex closest to the query point (None if there is none)
+
+        The query is located, starting next to the answer to the previous
+        query so that a stream of nearby queries is cheap, and then the
+        search walks from the closest vertex of that face along Delaunay
+        edges to closer and closer vertices. Every vertex but the nearest one
+        has a Delaunay neighbor that is closer to the query, so the walk ends
+        at the nearest one.
+        """
+        if homogeneous is False:
+            query = query.lift(lambda x: 1)
+        return self._nearest(query)
+
+    def nearest_vertices(self, queries, homogeneous=False):
+        """Input indices of the vertices nearest to each row of queries
+
+        queries is a (q, d) array (or (q, d+1) if homogeneous). They are
+        answered in order along a Hilbert curve, so that each one starts
+        next to the last. Vertices added without an input index (see
+        simplex_indices) show up as -1, as does every query if there are no
+        vertices.
+        """
+        queries = np.asarray(queries, dtype=float)
+        if homogeneous is False:
+            queries = np.hstack([queries, np.ones((len(queries), 1))])
+        nearest = np.full(len(queries), -1, dtype=np.int64)
+        if len(queries) > 1:
+            order = np.argsort(hilbert_keys(queries[:, :-1] /
+                                            queries[:, -1:]), kind='stable')
+        else:
+            order = np.arange(len(queries))
+        nearest[order] = self._input_indices(
+            [self._nearest(Point(*row)) for row in queries[order].tolist()])
+        return nearest
+
+    def _nearest(self, query):
+        """The handle of the vertex nearest to a homogeneous Point, or None"""
+        face = self.locate(query, hint=self._last_nearest)
+        nearest = self._nearest_vertex(face, query)
+        if nearest is None:
+            return None
+        # The vertex itself, not a lookup by coordinates, which would fill
+        # in the point index of a triangulation that was just loaded
+        vertex, coords = nearest
+        query = query.to_array().astype(float)
+        distance = np.dot(coords - query, coords - query)
+        while True:
+            vertices, rows = self._neighbors(vertex)
+            offsets = rows - query
+            distances = np.einsum('ij,ij->i', offsets, offsets)
+            closest = int(np.argmin(distances))
+            if distances[closest] >= distance:
+                break
+            vertex, distance = vertices[closest], distances[closest]
+        self._last_nearest = self._vertex_hint(vertex)
+        return vertex
+
+    def _query_faces(self, query, hint=None, conflict=False):
+        """The faces at a homogeneous Point, as arrays
+
+        That is the face containing it, or with conflict=True every face
+        whose circumsphere contains it (the ones that inserting it would
+        destroy). Returns their vertices as an (f, d+1) array of input
+        indices, an (f, d+1, d+1) array of their coordinates, and a hint to
+        locate the next query with.
+        """
+        face = self.locate(query, hint)
+        faces = [face]
+        if conflict:
+            faces = self._conflict_region(face, self.Vertex(query))[0]
+        vertices = [vert for face in faces for vert in face.vertices]
+        dimension = self.dimension()
+        return (self._input_indices(vertices).reshape(-1, dimension + 1),
+                np.array([vert.point.to_array() for vert in vertices],
+                         dtype=float).reshape(-1, dimension + 1,
+                                              dimension + 1),
+                face)
+
+    def _neighbors(self, vertex):
+        """The inserted vertices sharing a face with vertex (including it),
+        and an array of their coordinates
+        """
+        vertices = list({vert for face in self._star_of(vertex)
+                         for vert in face.vertices if vert in self._history})
+        return vertices, np.array([vert.point.to_array()
+                                   for vert in vertices], dtype=float)
+
+    def _input_indices(self, vertices):
+        """Input indices of vertex handles, with -1 for None or no index"""
+        return np.array([-1 if vertex is None or vertex.input_index is None
+                         else vertex.input_index for vertex in vertices],
+                        dtype=np.int64)
+
+    def _start_face(self, point, hint, jump):
+        """Pick a face to start a visibility walk from (see locate)"""
+        if hint is not None and hint in self.faces:
+            return hint
+        if jump is None:
+            jump = self.jump
+        if jump:
+            vertex = self._closest_sampled_vertex(point)
+            if vertex is not None:
+                return self._vertex_hint(vertex)
+        if self._last_face in self.faces:
+            return self._last_face
+        return self._arbitrary_face()
+
+    def _vertex_hint(self, vertex):
+        """A face containing the vertex, to start a walk from"""
+        return self._vertex_face[vertex]
+
+    def _nearest_vertex(self, face, point):
+        """The finite vertex of face closest to the point, and its coordinates
+
+        Returns None if all of the vertices are infinite.
+        """
+        vertices = [vertex for vertex in face.vertices
+                    if vertex.point[-1] != 0]
+        if not vertices:
+            return None
+        finite = np.array([vertex.point.to_array() for vertex in vertices],
+                          dtype=float)
+        distances = finite - point.to_array()
+        closest = np.argmin(np.einsum('ij,ij->i', distances, distances))
+        return vertices[closest], finite[closest]
+
+    def _descend(self, point):
+        """Locate point in each coarser level, from the coarsest one down
+
+        Each walk starts next to the vertex nearest to the point in the face
+        found on the level above. Returns the faces found (the one from the
+        level just above this first), a hint for locating on this level, and
+        the number of faces visited.
+        """
+        hint = None
+        located = []
+        steps = 0
+        for index in range(len(self._levels) - 1, 0, -1):
+            level, below = self._levels[index], self._levels[index - 1]
+            face = level.locate(point, hint)
+            steps += level.walk_length
+            located.append(face)
+            nearest = level._nearest_vertex(face, point)
+            vertex = (None if nearest is None else
+                      below.point_index.find(nearest[1]))
+            hint = None if vertex is None else below._vertex_hint(vertex)
+        located.reverse()
+        return located, hint, steps
+
+    def _promote(self, point, located):
+        """Add a new point to a random number of coarser levels
+
+        The point goes up one more level with probability 1/HIERARCHY_RATIO,
+        up to HIERARCHY_MAX_LEVELS levels in all. located are the faces
+        found for it by _descend, which are used as hints.
+        """
+        for index in range(1, self.HIERARCHY_MAX_LEVELS):
+            if self._random.random() * self.HIERARCHY_RATIO >= 1:
+                break
+            if index == len(self._levels):
+                self._levels.append(self._empty_like())
+            hint = located[index - 1] if index <= len(located) else None
+            self._levels[index].delaunay_add(point, hint=hint)
+
+    def _closest_sampled_vertex(self, point):
+        """Sample about n^(1/(d+1)) vertices, and return the closest one
+
+        Returns None if no vertex that is still here was sampled.
+        """
+        size = len(self._sample_pool)
+        count = min(size, int(np.ceil(size ** (1 / (self.dimension() + 1)))))
+        candidates = [vert for vert in self._random.sample(self._sample_pool,
+                                                           count)
+                      if vert in self._history]
+        if not candidates:
+            return None
+        distances = np.array([vert.point.to_array() for vert in candidates],
+                             dtype=float) - point.to_array()
+        return candidates[int(np.argmin(np.einsum('ij,ij->i', distances,
+                                                  distances)))]
+
     def test_is_delaunay(self):
-        """Make sure every facet is locally delaunay."""
-        for face in self.faces:
+        """Make sure every facet is locally delaunay.
+
+        All of the incircle tests are done in one batch.
+        """
+        return self._locally_delaunay(self.faces)
+
+    @staticmethod
+    def _locally_delaunay(faces):
+        """Are all of the facets of the faces locally delaunay?
+
+        All of the incircle tests are done in one batch.
+        """
+        tests = []
+        sides = []
+        for face in faces:
             for halffacet in face.iter_facets():
-                if not halffacet.locally_delaunay():
-                    # print(halffacet)
-                    return False
-        return True
+                if halffacet.twin:
+                    twin = halffacet.twin
+                    tests.append([pt.to_array() for pt in twin.points()] +
+                                 [twin.opposite.point.to_array(),
+                                  halffacet.opposite.point.to_array()])
+                    sides.append(twin.side)
+        if not tests:
+            return True
+        return not (np.array(sides) * incircle_many(tests) > 0).any()
 
     def face_point_sets(self, homogeneous=False):
         """Return a set containing a bunch of frozensets of points.
@@ -409,6 +1347,179 @@ class DelaunayTriangulation:
                     for point in subresult]))
         return result
 
+    def _finite_faces(self):
+        """The faces without an outer vertex, each with a vertex list"""
+        hidden_points = frozenset(outer_face_pts(self.dimension()))
+        return [(face, list(face.vertices)) for face in self.faces
+                if hidden_points.isdisjoint(face.points())]
+
+    def simplex_indices(self):
+        """The finite simplices as an (m, d+1) array of input indices
+
+        Each entry is the input_index of a vertex, so it refers back to the
+        row of the array (or the position in the list) the triangulation
+        was built from. Vertices added later without an index show up as -1.
+        """
+        rows = [[-1 if vertex.input_index is None else vertex.input_index
+                 for vertex in vertices]
+                for face, vertices in self._finite_faces()]
+        return np.array(rows, dtype=np.int64).reshape(
+            -1, self.dimension() + 1)
+
+    def _arrays(self):
+        """The triangulation as arrays, for save
+
+        Returns a dict with the vertex 'coords' (the outer ones first, in
+        the order of outer_face_pts, then the rest in the order they were
+        inserted), their 'input_index' (-1 for none), and all of the
+        'simplices' as rows of vertex indices, with their 'neighbors' (entry
+        [s, i] is the simplex across the facet opposite vertex i of simplex
+        s, or -1).
+        """
+        vertices = self._array_vertices()
+        number = {vertex: row for row, vertex in enumerate(vertices)}
+        faces = list(self.faces)
+        row_of = {face: row for row, face in enumerate(faces)}
+        simplices = []
+        neighbors = []
+        for face in faces:
+            twins = [face.half_facets[vertex].twin for vertex in face.vertices]
+            simplices.append([number[vertex] for vertex in face.vertices])
+            neighbors.append([-1 if twin is None else row_of[twin.face]
+                              for twin in twins])
+        width = self.dimension() + 1
+        simplices = np.array(simplices, dtype=np.int32).reshape(-1, width)
+        neighbors = np.array(neighbors, dtype=np.int32).reshape(-1, width)
+        coords = np.array([vertex.point.to_array() for vertex in vertices],
+                          dtype=float)
+        # Swap two vertices (and their neighbors) of the negative ones
+        flip = ccw_many(coords[simplices]) < 0
+        simplices[flip, :2] = simplices[flip, 1::-1]
+        neighbors[flip, :2] = neighbors[flip, 1::-1]
+        return {'coords': coords, 'simplices': simplices,
+                'neighbors': neighbors,
+                'input_index': np.array(
+                    [-1 if vertex.input_index is None else vertex.input_index
+                     for vertex in vertices], dtype=np.int64)}
+
+    def _array_vertices(self):
+        """The vertices, in the order of the rows of _arrays"""
+        # The outer vertices go in the order of outer_face_pts, which is
+        # the order the array engine expects them in
+        outer = {vertex.point: vertex for vertex in self.vertices
+                 if vertex not in self._history}
+        return [outer[point] for point in outer_face_pts(self.dimension())] + \
+            list(self._history)
+
+    def _restore(self, arrays):
+        """Take on the triangulation in a dict of arrays from _arrays
+
+        The sides of the half-facets are worked out together with ccw_many.
+        """
+        width = self.dimension() + 1
+        vertices = [self.Vertex(Point(*row), None if index < 0 else index)
+                    for row, index in zip(arrays['coords'].tolist(),
+                                          arrays['input_index'].tolist())]
+        simplices = arrays['simplices'].tolist()
+        faces = []
+        half_facets = []
+        for row in simplices:
+            corners = [vertices[vertex] for vertex in row]
+            hfs = {vertex: self.HalfFacet(
+                       vertex, [other for other in corners
+                                if other is not vertex], None, side=1)
+                   for vertex in corners}
+            faces.append(self.Face(corners, hfs))
+            half_facets += [hfs[vertex] for vertex in corners]
+        number = {vertex: row for row, vertex in enumerate(vertices)}
+        stacks = np.array([[number[vertex] for vertex in hf.vertices()] +
+                           [number[hf.opposite]] for hf in half_facets],
+                          dtype=np.int64).reshape(-1, width)
+        sides = ccw_many(arrays['coords'][stacks]).tolist()
+        neighbors = arrays['neighbors'].tolist()
+        for face, row, around in zip(faces, simplices, neighbors):
+            for vertex, neighbor in zip(row, around):
+                half_facet = face.half_facets[vertices[vertex]]
+                if neighbor >= 0:
+                    other = set(faces[neighbor].vertices) - face.vertices
+                    half_facet.twin = faces[neighbor].half_facets[other.pop()]
+        for half_facet, side in zip(half_facets, sides):
+            half_facet.side = side
+        # The outer vertices come first, one per column
+        self.faces = set(faces)
+        self.vertices = set(vertices)
+        self._history = dict.fromkeys(vertices[width:])
+        self._sample_pool = vertices[width:]
+        self._vertex_face = {
+            vertices[vertex]: faces[simplex] for vertex, simplex in
+            enumerate(arrays['vertex_simplex'].tolist())}
+        self._last_face = faces[-1]
+        self.point_index.add_many(arrays['coords'][width:], vertices[width:])
+
+    def neighbor_indices(self):
+        """The neighbors of the rows of simplex_indices, as an (m, d+1) array
+
+        Entry [s, i] is the row of the simplex across the facet opposite the
+        vertex in entry [s, i] of simplex_indices, or -1 if that facet is on
+        the convex hull.
+        """
+        finite = self._finite_faces()
+        row_of = {face: row for row, (face, vertices) in enumerate(finite)}
+        rows = []
+        for face, vertices in finite:
+            twins = [face.half_facets[vertex].twin for vertex in vertices]
+            rows.append([-1 if twin is None else row_of.get(twin.face, -1)
+                         for twin in twins])
+        return np.array(rows, dtype=np.int64).reshape(
+            -1, self.dimension() + 1)
+
+    def _site_faces(self):
+        """The cells of the inserted points, as arrays
+
+        Returns the points (in the order of point_history) as an (n, d+1)
+        array, the finite faces as rows of indices into it, whether each
+        point is on an infinite face, and the input index of each point (-1
+        for none).
+        """
+        dimension = self.dimension()
+        row_of = {vertex: row for row, vertex in enumerate(self._history)}
+        on_hull = np.zeros(len(row_of), dtype=bool)
+        rows = []
+        for face in self.faces:
+            row = [row_of.get(vertex, -1) for vertex in face.vertices]
+            if -1 not in row:
+                rows.append(row)
+            else:
+                on_hull[[r for r in row if r >= 0]] = True
+        points = np.array([vertex.point.to_array() for vertex in row_of],
+                          dtype=float).reshape(-1, dimension + 1)
+        indices = np.array([-1 if vertex.input_index is None
+                            else vertex.input_index for vertex in row_of],
+                           dtype=np.int64)
+        return (points, np.array(rows, dtype=np.int64).reshape(
+            -1, dimension + 1), on_hull, indices)
+
+    def voronoi_cells(self, box=None):
+        """The Voronoi cell of every site, as a VoronoiCells
+
+        This works straight from the faces, without building a Voronoi
+        first. box is as for Voronoi.cells.
+        """
+        return VoronoiCells(self, box)
+
+    def circumcenters(self):
+        """Circumcenters of the rows of simplex_indices, as an (m, d) array
+
+        These are the finite vertices of the Voronoi diagram, and
+        neighbor_indices says which of them are joined by its edges.
+        """
+        dimension = self.dimension()
+        coords = np.array([[vertex.point.to_array() for vertex in vertices]
+                           for face, vertices in self._finite_faces()],
+                          dtype=float).reshape(-1, dimension + 1,
+                                               dimension + 1)
+        return circumcenters(coords, homogeneous=True)[:, :-1]
+
     def dimension(self):
         """get the dimension in some standard way"""
         # -1 because homogeneous
@@ -440,24 +1551,337 @@ class DelaunayTriangulation:
 
 
 class Voronoi:
-    """A data structure primarily used for drawing the Voronoi diagram"""
-    def __init__(self, triangulation):
+    """A data structure primarily used for drawing the Voronoi diagram
+
+    points are the circumcenters of the finite faces, and edges are pairs of
+    them for neighboring faces. Where the neighbor is an infinite face the
+    other end is a direction, with a last coordinate of 0.
+
+    The diagram is built from the arrays of the triangulation (see
+    DelaunayTriangulation._arrays), with all of the circumcenters solved for
+    together. With follow=True this subscribes to the triangulation, and
+    keeps points and edges up to date by only looking at the faces that
+    changed, which is much cheaper than building a new one after every
+    insertion.
+    """
+    def __init__(self, triangulation, follow=False):
+        self.triangulation = triangulation
         self.points = set()
         self.edges = set()
-        finite_faces = (f for f in triangulation.faces if self._is_finite(f))
-        for face in finite_faces:
-            point = circumcenter(*face.points())
-            self.points.add(point)
+        # Voronoi point of each finite face and the edge between each pair of
+        # neighbors, keyed by vertex sets so nothing needs to be recomputed
+        # when a face dies. Equal points from different faces are counted.
+        # These are only kept when following.
+        self._centers = {}
+        self._edges = {}
+        self._counts = Counter()
+        self._build(follow)
+        if follow:
+            triangulation.subscribe(self)
+
+    def _build(self, follow):
+        """Make the points and edges of all of the faces at once"""
+        arrays = self.triangulation._arrays()
+        simplices = arrays['simplices']
+        centers = [Point(*row) for row in
+                   self._center_rows(arrays['coords'][simplices]).tolist()]
+        finite = [center[-1] == 1 for center in centers]
+        # Each pair of neighbors once, leaving out the ones between two
+        # infinite faces
+        neighbors = arrays['neighbors']
+        face, i = np.nonzero(neighbors > np.arange(len(neighbors))[:, None])
+        pairs = [(s, t) for s, t in zip(face.tolist(),
+                                        neighbors[face, i].tolist())
+                 if finite[s] or finite[t]]
+        edges = [frozenset([centers[s], centers[t]]) for s, t in pairs]
+        points = [center for center, is_finite in zip(centers, finite)
+                  if is_finite]
+        self._counts.update(points)
+        self._counts.update(edges)
+        self.points.update(points)
+        self.edges.update(edges)
+        if follow:
+            vertices = self.triangulation._array_vertices()
+            keys = [frozenset(vertices[vertex] for vertex in row)
+                    for row in simplices.tolist()]
+            self._centers = {key: center for key, center, is_finite
+                             in zip(keys, centers, finite) if is_finite}
+            self._edges = {frozenset([keys[s], keys[t]]): edge
+                           for (s, t), edge in zip(pairs, edges)}
+
+    @staticmethod
+    def _center_rows(coords):
+        """The Voronoi points of simplices, from their (m, d+1, d+1) corners
+
+        Finite simplices give their circumcenter (with a last coordinate of
+        1), and infinite ones the direction of their very far away one (with
+        a last coordinate of 0). The corners of each simplex are sorted
+        first, so that a face gets exactly the same point whichever order
+        its corners come in.
+        """
+        coords = np.asarray(coords, dtype=float)
+        count, width = coords.shape[:2]
+        rows = coords.reshape(count * width, -1)
+        order = np.lexsort(np.vstack([rows.T[::-1],
+                                      np.repeat(np.arange(count), width)]))
+        coords = rows[order].reshape(coords.shape)
+        centers = circumcenters(coords, homogeneous=True)
+        infinite = (coords[:, :, -1] == 0).any(axis=1)
+        centers[infinite, :-1] *= 1 / 1000000000
+        centers[infinite, -1] = 0
+        return centers
+
+    def detach(self):
+        """Stop following the triangulation"""
+        self.triangulation.unsubscribe(self)
+
+    def cells(self, box=None):
+        """The Voronoi cell of every site, as a VoronoiCells
+
+        With box=(low, high), the corners of an axis aligned box, every cell
+        is clipped to the box, which gives the unbounded ones a size too.
+        That is only supported in the plane. This is the same as
+        triangulation.voronoi_cells(box), which does not need the diagram.
+        """
+        return VoronoiCells(self.triangulation, box)
+
+    def faces_born(self, faces):
+        """Add the points and edges of new faces (see subscribe)"""
+        finite = [face for face in faces if self._is_finite(face)]
+        if finite:
+            centers = self._center_rows(
+                [[point.to_array() for point in face.points()]
+                 for face in finite]).tolist()
+            for face, center in zip(finite, centers):
+                center = Point(*center)
+                self._centers[face.vertices] = center
+                self._count(self.points, center, 1)
+        for face in faces:
+            for half_facet in face.iter_facets():
+                if half_facet.twin:
+                    self._add_edge(face, half_facet.twin.face)
+
+    def faces_died(self, faces):
+        """Remove the points and edges of faces"""
+        for face in faces:
+            key = face.vertices
+            center = self._centers.pop(key, None)
+            if center is not None:
+                self._count(self.points, center, -1)
             for half_facet in face.iter_facets():
                 if half_facet.twin:
-                    adj_point = circumcenter(*half_facet.twin.face.points())
-                    if not self._is_finite(half_facet.twin.face):
-                        tmp_vec = ((adj_point.to_vector()[:-1]) *
-                                   (1 / 1000000000))
-                        adj_point = Point(*tmp_vec.to_array())
-                        adj_point = adj_point.lift(lambda *args: 0)
-                    self.edges.add(frozenset([point, adj_point]))
+                    edge = self._edges.pop(
+                        frozenset([key, half_facet.twin.face.vertices]), None)
+                    if edge is not None:
+                        self._count(self.edges, edge, -1)
+
+    def _add_edge(self, face, adj_face):
+        """Add the edge between two neighboring faces, if it is not there"""
+        key = frozenset([face.vertices, adj_face.vertices])
+        if key in self._edges:
+            return
+        if face.vertices not in self._centers:
+            face, adj_face = adj_face, face
+        point = self._centers.get(face.vertices)
+        if point is None:  # both are infinite
+            return
+        adj_point = self._centers.get(adj_face.vertices)
+        if adj_point is None:
+            adj_point = Point(*self._center_rows(
+                [[pt.to_array() for pt in adj_face.points()]])[0])
+        edge = frozenset([point, adj_point])
+        self._edges[key] = edge
+        self._count(self.edges, edge, 1)
+
+    def _count(self, items, item, change):
+        """Change how many faces give item, keeping items to those above 0"""
+        self._counts[item] += change
+        if self._counts[item] > 0:
+            items.add(item)
+        else:
+            del self._counts[item]
+            items.discard(item)
 
     def _is_finite(self, face):
         """Checks if the face is only made of finite points"""
         return [p[-1] for p in face.points()] == [1] * len(face.points())
+
+
+class VoronoiCells:
+    """The Voronoi cells of all the sites of a triangulation
+
+    Row i of everything is about sites[i]. The rows go by input_index (the
+    rows of the input, as for simplex_indices), with the sites that have
+    none after the rest, in the order they were inserted. input_index[i] is
+    the input index of sites[i], or -1.
+
+    vertices[i] is a (k, d) array of the corners of the cell, which are the
+    circumcenters of the faces around the site. In the plane they go
+    counterclockwise around the cell (when the cell is unbounded, from one
+    ray to the other). In higher dimensions facets[i] maps the row of each
+    neighboring site to the indices (into vertices[i]) of the facet the two
+    cells share; in three dimensions those go around the facet.
+
+    bounded, measures and centroids are arrays: whether each cell is
+    bounded (sites on the convex hull have unbounded cells), and the area
+    or volume and the centroid of each cell, nan where it is unbounded.
+
+    Everything comes from one pass over the faces, which sees the star of
+    every site, and the measures of all of the cells are computed together.
+    """
+
+    def __init__(self, triangulation, box=None):
+        if box is not None and triangulation.dimension() != 2:
+            raise ValueError("cells can only be clipped to a box in the plane")
+        points, faces, on_hull, indices = triangulation._site_faces()
+        order = np.argsort(np.where(indices >= 0, indices,
+                                    np.iinfo(np.int64).max), kind='stable')
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        history = triangulation.point_history
+        self.sites = [history[row] for row in order.tolist()]
+        self.input_index = indices[order]
+        self.points = points[order, :-1]
+        self.bounded = ~on_hull[order]
+        faces = rank[faces]
+        corners = self.points[faces]
+        centers = circumcenters(corners)
+        stars = self._stars(faces, corners)
+        self.vertices = [centers[star] for star in stars]
+        self.facets = self._facets(faces, corners, stars)
+        if box is None:
+            self._measure(faces, corners, centers)
+        else:
+            self._clip(box, faces, stars)
+
+    def __len__(self):
+        return len(self.sites)
+
+    def _stars(self, faces, corners):
+        """The finite faces around each site, in order around it in the
+        plane (see vertices)
+        """
+        count, dimension = self.points.shape
+        site = faces.ravel()
+        face = np.repeat(np.arange(len(faces)), dimension + 1)
+        if dimension == 2:
+            offset = corners.mean(axis=1)[face] - self.points[site]
+            angle = np.arctan2(offset[:, 1], offset[:, 0])
+        else:
+            angle = np.zeros(len(face))
+        order = np.lexsort((angle, site))
+        splits = np.cumsum(np.bincount(site, minlength=count))[:-1]
+        stars = np.split(face[order], splits)
+        if dimension == 2:
+            # An open fan should start just after the gap in it
+            angles = np.split(angle[order], splits)
+            for row in np.nonzero(~self.bounded)[0]:
+                if len(stars[row]):
+                    gaps = np.diff(angles[row], append=angles[row][0] +
+                                   2 * np.pi)
+                    stars[row] = np.roll(stars[row], -1 - np.argmax(gaps))
+        return stars
+
+    def _facets(self, faces, corners, stars):
+        """The facets of each cell in three or more dimensions (see
+        facets), or None in the plane and on the line
+        """
+        count, dimension = self.points.shape
+        if dimension < 3:
+            return None
+        # position[f, p] is where face f is in the star of its p-th vertex
+        position = np.zeros(faces.shape, dtype=np.int64)
+        for row, star in enumerate(stars):
+            position[star, np.argmax(faces[star] == row, axis=1)] = \
+                np.arange(len(star))
+        pairs = np.array([(p, q) for p in range(dimension + 1)
+                          for q in range(dimension + 1) if p != q])
+        site = faces[:, pairs[:, 0]].ravel()
+        other = faces[:, pairs[:, 1]].ravel()
+        face = np.repeat(np.arange(len(faces)), len(pairs))
+        index = position[:, pairs[:, 0]].ravel()
+        if dimension == 3:
+            # Go around the Delaunay edge from site to other
+            axis = self.points[other] - self.points[site]
+            helper = np.eye(3)[np.argmin(np.abs(axis), axis=1)]
+            first = np.cross(axis, helper)
+            second = np.cross(axis, first)
+            offset = corners.mean(axis=1)[face] - self.points[site]
+            angle = np.arctan2((offset * second).sum(axis=1),
+                               (offset * first).sum(axis=1))
+        else:
+            angle = np.zeros(len(face))
+        order = np.lexsort((angle, other, site))
+        site, other, index = site[order], other[order], index[order]
+        starts = np.flatnonzero(np.diff(site, prepend=-1) |
+                                np.diff(other, prepend=-1))
+        facets = [{} for row in range(count)]
+        for start, stop in zip(starts, np.append(starts[1:], len(site))):
+            facets[site[start]][int(other[start])] = index[start:stop]
+        return facets
+
+    def _measure(self, faces, corners, centers):
+        """Volumes and centroids of all of the bounded cells
+
+        Each cell is the sum of its pieces from the faces around the site
+        (see utils.voronoi_pieces).
+        """
+        count, dimension = self.points.shape
+        volumes, moments = voronoi_pieces(corners, centers)
+        site = faces.ravel()
+        self.measures = np.bincount(site, volumes.ravel(), minlength=count)
+        moments = moments.reshape(-1, dimension)
+        moments = np.stack([np.bincount(site, moments[:, axis],
+                                        minlength=count)
+                            for axis in range(dimension)], axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.centroids = moments / self.measures[:, None]
+        self.measures[~self.bounded] = np.nan
+        self.centroids[~self.bounded] = np.nan
+
+    def _clip(self, box, faces, stars):
+        """Clip the cells in the plane to a box, and measure what is left"""
+        low, high = (np.asarray(corner, dtype=float) for corner in box)
+        # Far enough away that the box cannot see past it
+        far = 8 * (max(np.abs(np.vstack([self.points, [low, high]])).max(),
+                       max((np.abs(cell).max() for cell in self.vertices
+                            if len(cell)), default=0)) + 1)
+        self.measures = np.full(len(self), np.nan)
+        self.centroids = np.full((len(self), 2), np.nan)
+        for row, cell in enumerate(self.vertices):
+            if not len(cell):
+                continue
+            if not self.bounded[row]:
+                cell = self._close(row, faces[stars[row]], cell, far)
+            cell = clip_polygon(cell, low, high)
+            area, centroid = polygon_area_centroid(cell)
+            self.vertices[row] = cell if area >= 0 else cell[::-1]
+            self.measures[row], self.centroids[row] = abs(area), centroid
+
+    def _close(self, row, faces, cell, far):
+        """Close up an unbounded cell in the plane far away
+
+        The rays leave the cell at its first and last corners, at right
+        angles to the two Delaunay edges on the convex hull.
+        """
+        site = self.points[row]
+        neighbors = Counter(faces.ravel().tolist())
+        hull = [other for other, times in neighbors.items()
+                if times == 1 and other != row]
+        first = next(other for other in faces[0] if other in hull)
+        last = next(other for other in hull if other != first)
+        rays = []
+        for face, other in ((faces[0], first), (faces[-1], last)):
+            third = next(vert for vert in face if vert not in (row, other))
+            edge = self.points[other] - site
+            ray = np.array([-edge[1], edge[0]])
+            if np.dot(ray, self.points[third] - site) > 0:
+                ray = -ray
+            rays.append(ray / np.linalg.norm(ray))
+        angles = [np.arctan2(ray[1], ray[0]) for ray in rays]
+        turn = (angles[0] - angles[1] + np.pi) % (2 * np.pi) - np.pi
+        middle = (cell[0] + cell[-1]) / 2
+        arc = [middle + far * np.array([np.cos(angle), np.sin(angle)])
+               for angle in angles[1] + turn * np.linspace(0, 1, 9)[1:-1]]
+        return np.vstack([cell, [cell[-1] + far * rays[1]], arc,
+                          [cell[0] + far * rays[0]]])
@@ -4,11 +4,19 @@ Unit tests for triangulation class
 """
 
 import unittest
+from unittest import mock
 import csv
 import os
+import pickle
+import random
+
+import numpy as np
+
 from pyVor.primitives import Point
 from pyVor.structures import DelaunayTriangulation as DelT
 from pyVor.structures import Voronoi
+from pyVor.structures import PointIndex
+from pyVor.utils import polygon_area_centroid
 
 
 class DelaunayTriangulationTestCase(unittest.TestCase):
@@ -181,6 +189,327 @@ class DelaunayTriangulationTestCase(unittest.TestCase):
         del_tri = DelT(points, homogeneous=True, randomize=False)
         self.assertEqual(len(del_tri.face_point_sets()), 3)
 
+    def test_duplicates(self):
+        """Duplicates are dropped, and we learn who they merged into."""
+        points = [Point(0, 0), Point(1, 0), Point(0, 1), Point(0.0, 0.0),
+                  Point(1, 0), Point(5, 5)]
+        del_tri = DelT(points, homogeneous=False, randomize=False)
+        self.assertEqual(del_tri.point_history,
+                         [Point(0, 0, 1), Point(1, 0, 1), Point(0, 1, 1),
+                          Point(5, 5, 1)])
+        self.assertEqual(len(del_tri.face_point_sets()), 2)
+        vertex = del_tri.delaunay_add(Point(0, 1), homogeneous=False)
+        self.assertEqual(vertex.point, Point(0, 1, 1))
+        self.assertIn(vertex, del_tri.vertices)
+        self.assertEqual(len(del_tri.point_history), 4)
+
+        # Now with some slack
+        del_tri = DelT(points[:3], homogeneous=False, randomize=False,
+                       tolerance=0.01)
+        vertex = del_tri.delaunay_add(Point(1.005, 0.005), homogeneous=False)
+        self.assertEqual(vertex.point, Point(1, 0, 1))
+        self.assertEqual(len(del_tri.point_history), 3)
+        del_tri.delaunay_add(Point(1.02, 0), homogeneous=False)
+        self.assertEqual(len(del_tri.point_history), 4)
+        self.assertTrue(del_tri.test_is_delaunay())
+
+    def test_point_index(self):
+        """Exact and grid-based lookups"""
+        index = PointIndex()
+        index.add(Point(1, 2, 1).to_array(), 'a')
+        self.assertEqual(index.find([1.0, 2.0, 1.0]), 'a')
+        self.assertIsNone(index.find([1.0, 2.0000001, 1.0]))
+        index.remove([1, 2, 1])
+        self.assertIsNone(index.find([1, 2, 1]))
+        self.assertEqual(len(index), 0)
+
+        index = PointIndex(tolerance=0.5)
+        index.add([0.99, 0.99, 1], 'b')
+        # Different grid cell, but close enough
+        self.assertEqual(index.find([1.01, 1.01, 1]), 'b')
+        self.assertIsNone(index.find([1.5, 0.99, 1]))
+        self.assertRaises(KeyError, index.remove, [1.01, 1.01, 1])
+        self.assertRaises(ValueError, PointIndex, -1)
+
+        # add_many only fills the table when it has to
+        index = PointIndex()
+        index.add_many(np.array([[1, 2, 1], [3, 4, 1]]), 'cd')
+        self.assertEqual(index._table, {})
+        self.assertEqual(index.find([3, 4, 1]), 'd')
+        self.assertEqual(len(index), 2)
+
+    def test_locate_hints(self):
+        """Hints, the last insertion, and jump-and-walk all locate alike"""
+        rand = random.Random(6)
+        points = [Point(rand.uniform(-10, 10), rand.uniform(-10, 10))
+                  for i in range(60)]
+        del_tri = DelT(points, homogeneous=False)
+        jump_tri = DelT(points, homogeneous=False, jump=True)
+        self.assertEqual(del_tri.face_point_sets(), jump_tri.face_point_sets())
+        query = Point(0.5, 0.5, 1)
+        face = del_tri.locate(query)
+        self.assertEqual(del_tri.locate(query, hint=face), face)
+        self.assertEqual(del_tri.walk_length, 1)
+        self.assertEqual(del_tri.locate(query, jump=True), face)
+        # A dead hint is ignored
+        vertex = del_tri.delaunay_add(Point(0.5, 0.6), homogeneous=False,
+                                      hint=face)
+        self.assertNotIn(face, del_tri.faces)
+        self.assertIn(vertex.point, del_tri.locate(query, hint=face).points())
+
+    def test_hierarchy(self):
+        """Every level is a delaunay triangulation of a sample of the next"""
+        class Coarse(DelT):
+            HIERARCHY_RATIO = 4
+        rand = random.Random(7)
+        points = [Point(rand.uniform(-10, 10), rand.uniform(-10, 10))
+                  for i in range(150)]
+        del_tri = Coarse(points, homogeneous=False, hierarchy=True, seed=7)
+        self.assertEqual(del_tri.face_point_sets(),
+                         DelT(points, homogeneous=False).face_point_sets())
+        self.assertGreater(len(del_tri._levels), 2)
+        for level, below in zip(del_tri._levels[1:], del_tri._levels):
+            self.assertTrue(level.test_is_delaunay())
+            self.assertLessEqual(set(level.point_history),
+                                 set(below.point_history))
+        query = Point(0.5, 0.5, 1)
+        self.assertEqual(del_tri.locate(query),
+                         del_tri.locate(query, hint=del_tri._arbitrary_face()))
+
+    def test_insertion_order(self):
+        """The caller's list is left alone, and seeds are reproducible"""
+        rand = random.Random(8)
+        points = [Point(rand.uniform(-10, 10), rand.uniform(-10, 10))
+                  for i in range(50)]
+        original = list(points)
+        expected = DelT(points, homogeneous=False).face_point_sets()
+        self.assertEqual(points, original)
+        for order in ('input', 'random', 'hilbert', 'morton'):
+            del_tri = DelT(points, homogeneous=False, order=order, seed=3)
+            self.assertEqual(points, original)
+            self.assertEqual(del_tri.face_point_sets(), expected)
+            self.assertEqual(
+                del_tri.point_history,
+                DelT(points, homogeneous=False, order=order,
+                     seed=3).point_history)
+        del_tri = DelT(points, homogeneous=False, randomize=False)
+        self.assertEqual(del_tri.point_history,
+                         [pt.lift(lambda x: 1) for pt in points])
+
+    def test_from_array(self):
+        """Index arrays refer back to the rows of the input"""
+        arr = np.random.RandomState(9).uniform(-10, 10, (40, 2))
+        arr[5] = arr[3]  # a duplicate
+        original = arr.copy()
+        del_tri = DelT.from_array(arr, seed=1)
+        self.assertTrue(np.array_equal(arr, original))
+        simplices = del_tri.simplex_indices()
+        self.assertEqual(simplices.shape, (len(del_tri.face_point_sets()), 3))
+        self.assertNotIn(5, simplices)
+        self.assertEqual(
+            {frozenset(Point(*arr[i]) for i in row) for row in simplices},
+            del_tri.face_point_sets())
+        neighbors = del_tri.neighbor_indices()
+        for row, column in zip(*np.nonzero(neighbors >= 0)):
+            other = neighbors[row, column]
+            self.assertIn(row, neighbors[other])
+            shared = set(simplices[row]) - {simplices[row, column]}
+            self.assertLess(shared, set(simplices[other]))
+        # Euler: hull edges = 2 * points - 2 - triangles
+        self.assertEqual((neighbors < 0).sum(), 2 * 39 - 2 - len(simplices))
+        homogeneous = DelT.from_array(np.hstack([arr, np.ones((40, 1))]),
+                                      homogeneous=True, seed=1)
+        self.assertEqual(homogeneous.face_point_sets(),
+                         del_tri.face_point_sets())
+        vertex = del_tri.delaunay_add(Point(20, 20), homogeneous=False)
+        self.assertIsNone(vertex.input_index)
+        self.assertIn(-1, del_tri.simplex_indices())
+
+    def test_link_check(self):
+        """The hashed twin links agree with the brute force ones"""
+        class Checked(DelT):
+            CHECK_LINKS = True
+        rand = random.Random(10)
+        for dimension in (2, 3, 4):
+            points = [Point(*(rand.uniform(-10, 10)
+                              for i in range(dimension)))
+                      for j in range(30)]
+            del_tri = Checked(points, homogeneous=False)
+            self.assertTrue(del_tri.test_is_delaunay())
+            for face in del_tri.faces:
+                for halffacet in face.iter_facets():
+                    if halffacet.twin is not None:
+                        self.assertIs(halffacet.twin.twin, halffacet)
+                        self.assertIn(halffacet.twin.face, del_tri.faces)
+
+    def test_bowyer_watson(self):
+        """Both insertion algorithms make the same triangulation"""
+        rand = random.Random(11)
+        for dimension in (1, 2, 3, 4):
+            points = [Point(*(rand.uniform(-10, 10)
+                              for i in range(dimension)))
+                      for j in range(25)]
+            del_tri = DelT(points, homogeneous=False,
+                           insertion='bowyer-watson')
+            self.assertTrue(del_tri.test_is_delaunay())
+            self.assertEqual(del_tri.face_point_sets(),
+                             DelT(points, homogeneous=False).face_point_sets())
+            self.assertEqual(len(del_tri.faces),
+                             len(DelT(points, homogeneous=False).faces))
+        self.assertRaises(ValueError, DelT, points, insertion='flip')
+
+    def test_remove(self):
+        """Removing points leaves the triangulation of the rest"""
+        rand = random.Random(12)
+        for dimension in (1, 2, 3):
+            points = [Point(*(rand.uniform(-10, 10)
+                              for i in range(dimension)))
+                      for j in range(30)]
+            del_tri = DelT(points, homogeneous=False, hierarchy=True, seed=2)
+            for point in points[:20]:
+                del_tri.delaunay_remove(point, homogeneous=False)
+            self.assertTrue(del_tri.test_is_delaunay())
+            self.assertEqual(
+                del_tri.face_point_sets(),
+                DelT(points[20:], homogeneous=False).face_point_sets())
+            self.assertEqual(len(del_tri.vertices), dimension + 11)
+            self.assertEqual(set(del_tri.point_history),
+                             {pt.lift(lambda x: 1) for pt in points[20:]})
+            for face in del_tri.faces:
+                for halffacet in face.iter_facets():
+                    if halffacet.twin is not None:
+                        self.assertEqual(halffacet.twin.twin, halffacet)
+            for level in del_tri._levels:
+                self.assertLessEqual(set(level.point_history),
+                                     set(del_tri.point_history))
+            # Hints and jumps still work afterwards
+            query = Point(*([0.5] * dimension), 1)
+            self.assertEqual(del_tri.locate(query, jump=True),
+                             del_tri.locate(query))
+            for point in points[20:]:
+                del_tri.delaunay_remove(point, homogeneous=False)
+            self.assertEqual(len(del_tri.faces), 1)
+            del_tri.delaunay_add(points[0], homogeneous=False)
+            self.assertEqual(len(del_tri.faces), dimension + 1)
+        self.assertRaises(KeyError, del_tri.delaunay_remove, points[1],
+                          homogeneous=False)
+
+    def test_move(self):
+        """Moved vertices end up where a fresh triangulation puts them"""
+        rand = random.Random(13)
+        for dimension in (2, 3):
+            points = [Point(*(rand.uniform(-10, 10)
+                              for i in range(dimension)))
+                      for j in range(40)]
+            del_tri = DelT(points, homogeneous=False, hierarchy=True, seed=3)
+            # A few vertices move one at a time (small moves mostly in
+            # place, big ones not), and so does a whole frame of a small
+            # triangulation. Otherwise a whole frame rebuilds.
+            for minimum, count, scale in ((0, 5, 0.01), (0, 5, 5),
+                                          (0, 40, 0.01), (0, 40, 5),
+                                          (500, 40, 0.01), (500, 40, 5)):
+                del_tri.REBUILD_MIN_VERTICES = minimum
+                new_points = [Point(*(x + rand.gauss(0, scale) for x in pt))
+                              for pt in points[:count]] + points[count:]
+                with mock.patch.object(del_tri, '_rebuild',
+                                       wraps=del_tri._rebuild) as rebuild:
+                    moved = del_tri.move_many(points[:count],
+                                              new_points[:count],
+                                              homogeneous=False)
+                self.assertEqual(rebuild.called, minimum == 0 and count == 40)
+                self.assertEqual([vert.input_index for vert in moved],
+                                 list(range(count)))
+                points = new_points
+                self.assertTrue(del_tri.test_is_delaunay())
+                self.assertEqual(
+                    del_tri.face_point_sets(),
+                    DelT(points, homogeneous=False).face_point_sets())
+                for level in del_tri._levels:
+                    self.assertTrue(level.test_is_delaunay())
+            # Swapping two vertices
+            moved = del_tri.move_many(points[:2], points[1::-1],
+                                      homogeneous=False)
+            self.assertEqual([vert.input_index for vert in moved], [0, 1])
+            self.assertEqual(moved[0].point, points[1].lift(lambda x: 1))
+            far = Point(*([20] * dimension))
+            vertex = del_tri.move_vertex(points[2], far, homogeneous=False)
+            self.assertEqual(vertex.point, far.lift(lambda x: 1))
+            self.assertEqual(vertex.input_index, 2)
+            self.assertTrue(del_tri.test_is_delaunay())
+            # Moving onto another vertex merges them
+            del_tri.move_vertex(far, points[3], homogeneous=False)
+            self.assertEqual(len(del_tri.point_history), 39)
+        self.assertRaises(KeyError, del_tri.move_vertex, far, points[3],
+                          homogeneous=False)
+
+    def test_nearest(self):
+        """Nearest vertex queries agree with brute force"""
+        rand = np.random.RandomState(18)
+        for dimension in (1, 2, 3):
+            arr = rand.uniform(-10, 10, (50, dimension))
+            del_tri = DelT.from_array(arr, seed=1)
+            # Including some queries outside of the convex hull
+            queries = rand.uniform(-15, 15, (200, dimension))
+            expected = np.argmin(((queries[:, None] - arr) ** 2).sum(axis=2),
+                                 axis=1)
+            self.assertTrue(np.array_equal(del_tri.nearest_vertices(queries),
+                                           expected))
+            vertex = del_tri.nearest_vertex(Point(*queries[0]),
+                                            homogeneous=False)
+            self.assertEqual(vertex.input_index, expected[0])
+        del_tri.delaunay_add(Point(100, 100, 100), homogeneous=False)
+        self.assertEqual(
+            del_tri.nearest_vertices([[90, 90, 90], arr[3]]).tolist(), [-1, 3])
+        for point in del_tri.point_history:
+            del_tri.delaunay_remove(point)
+        self.assertIsNone(del_tri.nearest_vertex(Point(0, 0, 0, 1)))
+        self.assertEqual(del_tri.nearest_vertices([[0, 0, 0]]).tolist(), [-1])
+
+    def test_circumsphere_cache(self):
+        """Faces keep their circumsphere until a vertex moves"""
+        del_tri = DelT([Point(3, 4), Point(-3, 4), Point(0, -5)],
+                       homogeneous=False, randomize=False)
+        face = next(face for face in del_tri.faces
+                    if all(pt[-1] == 1 for pt in face.points()))
+        center = face.circumcenter()
+        self.assertEqual(center, Point(0.0, 0.0, 1.0))
+        self.assertIs(face.circumcenter(), center)
+        self.assertAlmostEqual(face.circumradius_squared(), 25)
+        for other in del_tri.faces - {face}:
+            self.assertEqual(other.circumradius_squared(), float('inf'))
+        del_tri.move_vertex(Point(0, -5), Point(0, -5.5), homogeneous=False)
+        self.assertIn(face, del_tri.faces)
+        self.assertNotEqual(face.circumcenter(), center)
+        self.assertAlmostEqual(face.circumradius_squared(),
+                               float((Point(3, 4, 1) -
+                                      face.circumcenter()).norm_squared()))
+
+    def test_pickle(self):
+        """Pickles are flat, so big triangulations go through too"""
+        arr = np.random.RandomState(25).uniform(-10, 10, (1500, 2))
+        del_tri = DelT.from_array(arr, seed=1, tolerance=1e-9,
+                                  insertion='bowyer-watson')
+        Voronoi(del_tri, follow=True)
+        copy = pickle.loads(pickle.dumps(del_tri))
+        self.assertIsInstance(copy, DelT)
+        self.assertEqual(copy.face_point_sets(), del_tri.face_point_sets())
+        self.assertEqual(copy.point_history, del_tri.point_history)
+        self.assertEqual(copy.insertion, 'bowyer-watson')
+        self.assertEqual(copy.point_index.tolerance, 1e-9)
+        self.assertEqual(copy._listeners, [])
+        for face in copy.faces:
+            for halffacet in face.iter_facets():
+                self.assertEqual(halffacet.lineside(halffacet.opposite.point),
+                                 1)
+                if halffacet.twin is not None:
+                    self.assertIs(halffacet.twin.twin, halffacet)
+        self.assertTrue(copy.test_is_delaunay())
+        self.assertEqual(copy.delaunay_add(Point(*arr[7] + 1e-12),
+                                           homogeneous=False).input_index, 7)
+        copy.delaunay_add(Point(0.5, 0.5), homogeneous=False)
+        copy.delaunay_remove(Point(*arr[0]), homogeneous=False)
+        self.assertTrue(copy.test_is_delaunay())
+
 
 class VoronoiTestCase(unittest.TestCase):
     """Tests for the voronoi data structure."""
@@ -198,5 +527,93 @@ class VoronoiTestCase(unittest.TestCase):
         self.assertTrue(len(vor.points) == 1)
         self.assertTrue(len(vor.edges) == 3)
 
+    def test_cells(self):
+        """Cell measures agree with the cell corners"""
+        rand = random.Random(17)
+        points = [Point(rand.random(), rand.random()) for i in range(60)]
+        cells = Voronoi(DelT(points, homogeneous=False)).cells()
+        self.assertEqual(len(cells), 60)
+        self.assertEqual(cells.facets, None)
+        self.assertTrue(cells.bounded.any() and not cells.bounded.all())
+        for row in range(len(cells)):
+            if cells.bounded[row]:
+                # The corners go counterclockwise around the cell
+                area, centroid = polygon_area_centroid(cells.vertices[row])
+                self.assertAlmostEqual(area, cells.measures[row])
+                self.assertTrue(np.allclose(centroid, cells.centroids[row]))
+            else:
+                self.assertTrue(np.isnan(cells.measures[row]))
+        # Clipped cells tile the box
+        clipped = Voronoi(DelT(points, homogeneous=False)).cells(
+            box=([0, 0], [1, 1]))
+        self.assertAlmostEqual(clipped.measures.sum(), 1)
+        for row in range(len(cells)):
+            self.assertGreater(polygon_area_centroid(
+                clipped.vertices[row])[0], 0)
+            self.assertTrue((0 <= clipped.centroids[row]).all() and
+                            (clipped.centroids[row] <= 1).all())
+        # In three dimensions, add up pyramids on the ordered facets
+        points = [Point(rand.random(), rand.random(), rand.random())
+                  for i in range(50)]
+        del_tri = DelT(points, homogeneous=False)
+        cells = Voronoi(del_tri).cells()
+        for row in np.flatnonzero(cells.bounded):
+            volume = 0
+            for indices in cells.facets[row].values():
+                facet = cells.vertices[row][indices]
+                normal = sum(np.cross(facet[k - 1], facet[k])
+                             for k in range(len(facet))) / 2
+                volume += abs(np.dot(normal, facet[0] - cells.points[row])) / 3
+            self.assertAlmostEqual(volume, cells.measures[row])
+        self.assertRaises(ValueError, Voronoi(del_tri).cells,
+                          box=([0, 0, 0], [1, 1, 1]))
+
+    def test_cells_order(self):
+        """Cells come straight from the triangulation, in input order"""
+        arr = np.random.RandomState(17).uniform(0, 1, (60, 2))
+        del_tri = DelT.from_array(arr, seed=1)
+        added = del_tri.delaunay_add(Point(0.5, 0.5), homogeneous=False)
+        cells = del_tri.voronoi_cells()
+        self.assertTrue(np.array_equal(cells.points[:60], arr))
+        self.assertEqual(cells.input_index.tolist(), list(range(60)) + [-1])
+        self.assertEqual(cells.sites[-1], added.point)
+        expected = Voronoi(del_tri).cells()
+        self.assertTrue(np.allclose(cells.measures, expected.measures,
+                                    equal_nan=True))
+        # The cells of the sites tile the square
+        clipped = del_tri.voronoi_cells(box=([0, 0], [1, 1]))
+        self.assertAlmostEqual(clipped.measures.sum(), 1)
+        for row in range(len(clipped)):
+            self.assertTrue(np.allclose(
+                polygon_area_centroid(clipped.vertices[row])[1],
+                clipped.centroids[row]))
+
+    def test_follow(self):
+        """A following diagram matches a fresh one after every change"""
+        rand = random.Random(14)
+        points = [Point(rand.uniform(-10, 10), rand.uniform(-10, 10))
+                  for i in range(30)]
+        for insertion in DelT.INSERTIONS:
+            del_tri = DelT(points[:3], homogeneous=False,
+                           insertion=insertion)
+            vor = Voronoi(del_tri, follow=True)
+            for point in points[3:]:
+                del_tri.delaunay_add(point, homogeneous=False)
+                fresh = Voronoi(del_tri)
+                self.assertEqual(vor.points, fresh.points)
+                self.assertEqual(vor.edges, fresh.edges)
+            new_points = [Point(x + rand.gauss(0, 0.05),
+                                y + rand.gauss(0, 0.05)) for x, y in points]
+            del_tri.move_many(points, new_points, homogeneous=False)
+            for point in new_points[:10]:
+                del_tri.delaunay_remove(point, homogeneous=False)
+            fresh = Voronoi(del_tri)
+            self.assertEqual(vor.points, fresh.points)
+            self.assertEqual(vor.edges, fresh.edges)
+            vor.detach()
+            del_tri.delaunay_add(points[0], homogeneous=False)
+            self.assertEqual(vor.points, fresh.points)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,72 @@
+"""Unit tests for writing triangulations out."""
+
+import io
+import unittest
+
+import numpy as np
+
+from pyVor.export import write_simplices
+from pyVor.mesh import ArrayDelaunayTriangulation as ArrayDelT
+
+
+class WriteSimplicesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rand = np.random.RandomState(23)
+        self.points = {dimension: rand.uniform(0, 1, (40, dimension))
+                       for dimension in (2, 3)}
+        self.simplices = {
+            dimension: ArrayDelT.from_array(points).simplex_indices()
+            for dimension, points in self.points.items()}
+
+    def written(self, *args, **kwargs):
+        out = io.BytesIO()
+        write_simplices(out, *args, **kwargs)
+        return out.getvalue()
+
+    def test_indexed(self):
+        simplices = self.simplices[3]
+        for chunk in (7, 1000):
+            text = self.written(simplices, format='text', chunk=chunk)
+            self.assertTrue(np.array_equal(
+                np.loadtxt(io.BytesIO(text), dtype=np.int64), simplices))
+            data = self.written(simplices, format='npy', chunk=chunk)
+            self.assertTrue(np.array_equal(np.load(io.BytesIO(data)),
+                                           simplices))
+        self.assertRaises(ValueError, self.written, simplices, format='vtk')
+        self.assertRaises(ValueError, self.written, simplices, format='off')
+
+    def test_meshes(self):
+        for dimension, points in self.points.items():
+            simplices = self.simplices[dimension]
+            facets = {frozenset(row[:k] + row[k + 1:])
+                      for row in simplices.tolist() for k in range(4)}
+            triangles = (simplices if dimension == 2 else
+                         [list(facet) for facet in facets])
+            lines = self.written(simplices, points, format='off',
+                                 chunk=9).decode().splitlines()
+            self.assertEqual(lines[:2], ['OFF', '40 {} 0'.format(
+                len(triangles))])
+            vertices = np.loadtxt(lines[2:42])
+            self.assertTrue(np.array_equal(vertices[:, :dimension], points))
+            faces = np.loadtxt(lines[42:], dtype=np.int64)
+            self.assertTrue((faces[:, 0] == 3).all())
+            self.assertEqual({frozenset(row) for row in faces[:, 1:].tolist()},
+                             {frozenset(row) for row in triangles.tolist()}
+                             if dimension == 2 else facets)
+            data = self.written(simplices, points, format='ply', chunk=9)
+            header, body = data.split(b'end_header\n')
+            self.assertIn('element face {}'.format(len(triangles)).encode(),
+                          header)
+            vertices = np.frombuffer(body[:40 * 24], dtype='<f8')
+            self.assertTrue(np.array_equal(
+                vertices.reshape(40, 3)[:, :dimension], points))
+            faces = np.frombuffer(body[40 * 24:], dtype=[
+                ('count', 'u1'), ('vertices', '<i4', (3,))])
+            self.assertEqual(len(faces), len(triangles))
+        self.assertRaises(ValueError, self.written, np.zeros((1, 5), int),
+                          np.zeros((5, 4)), format='ply')
+
+
+if __name__ == '__main__':
+    unittest.main()
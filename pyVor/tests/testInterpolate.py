@@ -0,0 +1,64 @@
+"""Unit tests for interpolation."""
+
+import unittest
+
+import numpy as np
+
+from pyVor.interpolate import barycentric, sibson
+from pyVor.structures import DelaunayTriangulation as DelT
+from pyVor.mesh import ArrayDelaunayTriangulation as ArrayDelT
+
+
+class InterpolateTestCase(unittest.TestCase):
+
+    def test_linear_precision(self):
+        """Both methods reproduce linear functions inside the hull"""
+        rand = np.random.RandomState(19)
+        for dimension in (1, 2, 3):
+            sites = rand.uniform(0, 1, (50, dimension))
+            slope = np.arange(1, dimension + 1)
+            values = np.stack([sites @ slope + 2, 3 - sites[:, 0]], axis=1)
+            queries = rand.uniform(-0.1, 1.1, (200, dimension))
+            expected = np.stack([queries @ slope + 2, 3 - queries[:, 0]],
+                                axis=1)
+            for engine in (DelT, ArrayDelT):
+                del_tri = engine.from_array(sites, seed=1)
+                linear = barycentric(del_tri, values, queries)
+                natural = sibson(del_tri, values, queries)
+                self.assertEqual(linear.shape, (200, 2))
+                outside = np.isnan(linear).any(axis=1)
+                self.assertTrue(outside.any() and not outside.all())
+                self.assertTrue(np.array_equal(np.isnan(natural),
+                                               np.isnan(linear)))
+                self.assertTrue(np.allclose(linear[~outside],
+                                            expected[~outside]))
+                self.assertTrue(np.allclose(natural[~outside],
+                                            expected[~outside]))
+
+    def test_sites_and_outside(self):
+        rand = np.random.RandomState(20)
+        sites = rand.uniform(0, 1, (40, 2))
+        values = rand.uniform(0, 1, 40)
+        del_tri = ArrayDelT.from_array(sites, seed=1)
+        # Exact at the sites, and only using the natural neighbors
+        self.assertTrue(np.allclose(sibson(del_tri, values, sites), values))
+        self.assertTrue(np.allclose(barycentric(del_tri, values, sites),
+                                    values))
+        queries = rand.uniform(0.3, 0.7, (30, 2))
+        natural = sibson(del_tri, values, queries)
+        self.assertEqual(natural.shape, (30,))
+        self.assertTrue((values.min() <= natural).all() and
+                        (natural <= values.max()).all())
+        # Outside of the hull
+        far = np.array([[5.0, 5.0], [-3.0, 0.5]])
+        for method in (barycentric, sibson):
+            self.assertTrue(np.isnan(method(del_tri, values, far)).all())
+            self.assertTrue(np.array_equal(
+                method(del_tri, values, far, outside='nearest'),
+                values[del_tri.nearest_vertices(far)]))
+            self.assertRaises(ValueError, method, del_tri, values, far,
+                              outside='linear')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the array-backed triangulation
+"""
+
+import unittest
+from unittest import mock
+import csv
+import os
+import random
+import shutil
+import tempfile
+
+import numpy as np
+
+from pyVor.primitives import Point
+from pyVor.structures import DelaunayTriangulation as DelT
+from pyVor.structures import Voronoi
+from pyVor.mesh import ArrayDelaunayTriangulation as ArrayDelT
+from pyVor.mesh import SimplexMesh
+from pyVor import storage
+from pyVor.utils import circumcenter
+
+
+class SimplexMeshTestCase(unittest.TestCase):
+    """Tests for the raw storage."""
+
+    def test_free_list(self):
+        """Deleted rows get recycled before the arrays grow."""
+        mesh = SimplexMesh(2, capacity=2)
+        for i in range(3):
+            mesh.add_vertex([i, i * i, 1])
+        first = mesh.add_simplex([0, 1, 2])
+        second = mesh.add_simplex([2, 1, 0])
+        self.assertEqual(len(mesh), 2)
+        mesh.remove_simplex(first)
+        self.assertEqual(len(mesh), 1)
+        self.assertEqual(list(mesh.alive()), [second])
+        self.assertEqual(mesh.add_simplex([1, 2, 0]), first)
+        self.assertEqual(mesh.add_simplex([1, 0, 2]), 2)
+        self.assertEqual(len(mesh), 3)
+        self.assertEqual(mesh.vertex_simplex[0], 2)
+
+
+class ArrayDelaunayTriangulationTestCase(unittest.TestCase):
+    """The array engine should agree with the object engine."""
+
+    def test_2d_case(self):
+        """Same notebook example as the object engine tests"""
+        points = [Point(-0.6, 3.2), Point(3.2, 2.1), Point(-2, 0),
+                  Point(1, -0.2), Point(3.6, -0.3), Point(-1.4, -2.1),
+                  Point(2.5, -1.7)]
+        del_tri = ArrayDelT(points, homogeneous=False, randomize=False)
+        self.assertTrue(del_tri.test_is_delaunay())
+        self.assertEqual(
+            del_tri.face_point_sets(),
+            DelT(points, homogeneous=False, randomize=False).face_point_sets())
+        self.assertEqual(len(del_tri.face_point_sets()), 6)
+
+    def test_3d_case(self):
+        fn = os.path.join(os.path.dirname(__file__), 'data/points.csv')
+        with open(fn) as f:
+            points = [Point(*(float(y) for y in x)) for x in csv.reader(f)]
+        del_tri = ArrayDelT(points, homogeneous=False, randomize=False)
+        self.assertTrue(del_tri.test_is_delaunay())
+        fn = os.path.join(os.path.dirname(__file__), 'data/dt.csv')
+        with open(fn) as f:
+            expected_face_sets = set(
+                frozenset(points[int(y) - 1] for y in x)
+                for x in csv.reader(f))
+        self.assertEqual(del_tri.face_point_sets(), expected_face_sets)
+
+    def test_random_agreement(self):
+        """Random inputs in a few dimensions, against the object engine"""
+        rand = random.Random(4)
+        for dimension in (1, 2, 3):
+            points = [Point(*(rand.uniform(-10, 10)
+                              for i in range(dimension)))
+                      for j in range(25)]
+            del_tri = ArrayDelT(points, homogeneous=False, randomize=False)
+            obj_tri = DelT(points, homogeneous=False, randomize=False)
+            self.assertTrue(del_tri.test_is_delaunay())
+            self.assertEqual(del_tri.face_point_sets(),
+                             obj_tri.face_point_sets())
+            self.assertEqual(len(del_tri.faces), len(obj_tri.faces))
+
+    def test_views(self):
+        """The object API should work on top of the arrays."""
+        point = Point(-3, 2, 1)
+        del_tri = ArrayDelT([point])
+        self.assertEqual(len(del_tri.faces), 3)
+        self.assertEqual(len(del_tri.vertices), 4)
+        null_twin_count = 0
+        for face in del_tri.faces:
+            self.assertIn(face, del_tri.faces)
+            self.assertIn(point, face.points())
+            for halffacet in face.iter_facets():
+                self.assertNotIn(halffacet.opposite, halffacet.vertices())
+                self.assertEqual(halffacet.lineside(halffacet.opposite.point),
+                                 1)
+                if halffacet.twin is None:
+                    null_twin_count += 1
+                else:
+                    self.assertEqual(halffacet.twin.twin, halffacet)
+                    self.assertTrue(halffacet.locally_delaunay())
+        self.assertEqual(null_twin_count, 3)
+        located = del_tri.locate(Point(-3, 1, 1))
+        self.assertIn(located, del_tri.faces)
+        self.assertIn(point, located.points())
+
+    def test_duplicates(self):
+        """Duplicates are found through the shared PointIndex"""
+        del_tri = ArrayDelT([Point(0, 0), Point(1, 0), Point(0, 1)],
+                            homogeneous=False, randomize=False)
+        vertex = del_tri.delaunay_add(Point(2, 2), homogeneous=False)
+        self.assertEqual(del_tri.delaunay_add(Point(2.0, 2.0),
+                                              homogeneous=False), vertex)
+        self.assertEqual(del_tri.delaunay_add(Point(1, 0, 1)).point,
+                         Point(1, 0, 1))
+        self.assertEqual(len(del_tri.point_history), 4)
+        self.assertEqual(len(del_tri.vertices), 7)
+
+    def test_nearest(self):
+        """Nearest vertex queries on the arrays"""
+        rand = np.random.RandomState(18)
+        arr = rand.uniform(-10, 10, (80, 2))
+        del_tri = ArrayDelT.from_array(arr, seed=1)
+        queries = rand.uniform(-15, 15, (300, 2))
+        expected = np.argmin(((queries[:, None] - arr) ** 2).sum(axis=2),
+                             axis=1)
+        self.assertTrue(np.array_equal(del_tri.nearest_vertices(queries),
+                                       expected))
+        vertex = del_tri.nearest_vertex(Point(*queries[0], 1))
+        self.assertEqual(vertex.point, Point(*arr[expected[0]], 1))
+        del_tri.delaunay_remove(vertex.point)
+        self.assertNotEqual(del_tri.nearest_vertices(queries[:1])[0],
+                            expected[0])
+
+    def test_voronoi(self):
+        """Voronoi should run on top of the array engine"""
+        del_tri = ArrayDelT([Point(3, 4), Point(-3, 4), Point(0, -5)],
+                            homogeneous=False, randomize=False)
+        vor = Voronoi(del_tri)
+        self.assertIn(Point(0.0, 0.0, 1.0), vor.points)
+        self.assertEqual(len(vor.points), 1)
+        self.assertEqual(len(vor.edges), 3)
+
+    def test_voronoi_engines(self):
+        """Both engines give exactly the same diagram, in one batch"""
+        arr = np.random.RandomState(16).uniform(-10, 10, (200, 2))
+        vor = Voronoi(ArrayDelT.from_array(arr, seed=1))
+        expected = Voronoi(DelT.from_array(arr, seed=2))
+        self.assertEqual(vor.points, expected.points)
+        self.assertEqual(vor.edges, expected.edges)
+
+    def test_voronoi_cells(self):
+        """Cells on the arrays match those on the objects"""
+        arr = np.random.RandomState(17).uniform(-10, 10, (80, 3))
+        cells = Voronoi(ArrayDelT.from_array(arr, seed=1)).cells()
+        expected = Voronoi(DelT.from_array(arr, seed=1)).cells()
+        self.assertEqual(cells.sites, expected.sites)
+        self.assertTrue(np.array_equal(cells.bounded, expected.bounded))
+        self.assertTrue(np.allclose(cells.measures, expected.measures,
+                                    equal_nan=True))
+        self.assertTrue(np.allclose(cells.centroids, expected.centroids,
+                                    equal_nan=True))
+        self.assertGreater(cells.bounded.sum(), 10)
+        self.assertTrue(np.array_equal(cells.points, arr))
+        self.assertTrue(np.array_equal(
+            ArrayDelT.from_array(arr, seed=1).voronoi_cells().measures,
+            cells.measures, equal_nan=True))
+
+    def test_voronoi_follow(self):
+        """Face births and deaths are reported for the arrays too"""
+        rand = random.Random(14)
+        points = [Point(rand.uniform(-10, 10), rand.uniform(-10, 10))
+                  for i in range(30)]
+        del_tri = ArrayDelT(points[:15], homogeneous=False)
+        vor = Voronoi(del_tri, follow=True)
+        for point in points[15:]:
+            del_tri.delaunay_add(point, homogeneous=False)
+        new_points = [Point(x + rand.gauss(0, 0.05), y + rand.gauss(0, 0.05))
+                      for x, y in points]
+        del_tri.move_many(points, new_points, homogeneous=False)
+        for point in new_points[:10]:
+            del_tri.delaunay_remove(point, homogeneous=False)
+        fresh = Voronoi(del_tri)
+        self.assertEqual(vor.points, fresh.points)
+        self.assertEqual(vor.edges, fresh.edges)
+
+    def test_locate_hints(self):
+        """Simplex hints and jump-and-walk on the arrays"""
+        rand = random.Random(6)
+        points = [Point(rand.uniform(-10, 10), rand.uniform(-10, 10))
+                  for i in range(60)]
+        del_tri = ArrayDelT(points, homogeneous=False, jump=True)
+        self.assertEqual(del_tri.face_point_sets(),
+                         DelT(points, homogeneous=False).face_point_sets())
+        query = Point(0.5, 0.5, 1)
+        face = del_tri.locate(query)
+        self.assertEqual(del_tri.locate(query, hint=face.index), face)
+        self.assertEqual(del_tri.walk_length, 1)
+        self.assertEqual(del_tri.locate(query, jump=False), face)
+
+    def test_hierarchy(self):
+        """The hierarchy works the same way on the arrays"""
+        class Coarse(ArrayDelT):
+            HIERARCHY_RATIO = 4
+        rand = random.Random(7)
+        points = [Point(rand.uniform(-10, 10), rand.uniform(-10, 10))
+                  for i in range(150)]
+        del_tri = Coarse(points, homogeneous=False, hierarchy=True, seed=7)
+        self.assertEqual(del_tri.face_point_sets(),
+                         DelT(points, homogeneous=False).face_point_sets())
+        self.assertGreater(len(del_tri._levels), 2)
+        for level in del_tri._levels:
+            self.assertIsInstance(level, Coarse)
+            self.assertTrue(level.test_is_delaunay())
+
+    def test_from_array(self):
+        """Index arrays refer back to the rows of the input"""
+        arr = np.random.RandomState(9).uniform(-10, 10, (40, 2))
+        arr[5] = arr[3]  # a duplicate
+        original = arr.copy()
+        del_tri = ArrayDelT.from_array(arr, seed=1)
+        self.assertTrue(np.array_equal(arr, original))
+        simplices = del_tri.simplex_indices()
+        self.assertEqual(simplices.shape, (len(del_tri.face_point_sets()), 3))
+        self.assertNotIn(5, simplices)
+        self.assertEqual(
+            {frozenset(Point(*arr[i]) for i in row) for row in simplices},
+            del_tri.face_point_sets())
+        neighbors = del_tri.neighbor_indices()
+        for row, column in zip(*np.nonzero(neighbors >= 0)):
+            other = neighbors[row, column]
+            self.assertIn(row, neighbors[other])
+            shared = set(simplices[row]) - {simplices[row, column]}
+            self.assertLess(shared, set(simplices[other]))
+        # Euler: hull edges = 2 * points - 2 - triangles
+        self.assertEqual((neighbors < 0).sum(), 2 * 39 - 2 - len(simplices))
+        homogeneous = ArrayDelT.from_array(np.hstack([arr, np.ones((40, 1))]),
+                                           homogeneous=True, seed=1)
+        self.assertEqual(homogeneous.face_point_sets(),
+                         del_tri.face_point_sets())
+        # The circumcenters line up with the rows, for both engines
+        row = simplices[0].tolist()
+        expected = circumcenter(*(Point(*arr[i]) for i in row),
+                                homogeneous=False)
+        self.assertTrue(np.allclose(del_tri.circumcenters()[0],
+                                    expected.to_array()))
+        obj_tri = DelT.from_array(arr, seed=1)
+        self.assertEqual(*({frozenset(row): tuple(np.round(center, 6))
+                            for row, center in zip(
+                                tri.simplex_indices().tolist(),
+                                tri.circumcenters())}
+                           for tri in (del_tri, obj_tri)))
+        vertex = del_tri.delaunay_add(Point(20, 20), homogeneous=False)
+        self.assertIsNone(vertex.input_index)
+        self.assertIn(-1, del_tri.simplex_indices())
+
+    def test_parallel(self):
+        """Building with workers gives the same triangulation"""
+        rand = np.random.RandomState(20)
+        for dimension, size in ((2, 1200), (3, 600)):
+            arr = rand.uniform(-10, 10, (size, dimension))
+            arr[7] = arr[3]  # a duplicate
+            sequential = ArrayDelT.from_array(arr, seed=1)
+            parallel = ArrayDelT.from_array(arr, workers=2, seed=1)
+            self.assertEqual(
+                *({frozenset(row) for row in tri.simplex_indices().tolist()}
+                  for tri in (sequential, parallel)))
+            self.assertEqual(len(parallel.mesh), len(sequential.mesh))
+            self.assertTrue(parallel.test_is_delaunay())
+            neighbors = parallel.neighbor_indices()
+            self.assertEqual((neighbors < 0).sum(),
+                             (sequential.neighbor_indices() < 0).sum())
+            # It carries on like any other
+            self.assertEqual(parallel.delaunay_add(
+                Point(*arr[7]), homogeneous=False).input_index, 3)
+            parallel.delaunay_add(Point(*[20] * dimension), homogeneous=False)
+            parallel.delaunay_remove(Point(*arr[0]), homogeneous=False)
+            self.assertTrue(parallel.test_is_delaunay())
+
+    def test_remove(self):
+        """Removing points leaves the triangulation of the rest"""
+        rand = random.Random(12)
+        for dimension in (1, 2, 3):
+            points = [Point(*(rand.uniform(-10, 10)
+                              for i in range(dimension)))
+                      for j in range(30)]
+            del_tri = ArrayDelT(points, homogeneous=False, hierarchy=True,
+                                seed=2)
+            for point in points[:20]:
+                del_tri.delaunay_remove(point, homogeneous=False)
+            self.assertTrue(del_tri.test_is_delaunay())
+            self.assertEqual(
+                del_tri.face_point_sets(),
+                DelT(points[20:], homogeneous=False).face_point_sets())
+            self.assertEqual(len(del_tri.vertices), dimension + 11)
+            self.assertEqual(set(del_tri.point_history),
+                             {pt.lift(lambda x: 1) for pt in points[20:]})
+            for face in del_tri.faces:
+                for halffacet in face.iter_facets():
+                    if halffacet.twin is not None:
+                        self.assertEqual(halffacet.twin.twin, halffacet)
+            for level in del_tri._levels:
+                self.assertLessEqual(set(level.point_history),
+                                     set(del_tri.point_history))
+            # Hints and jumps still work afterwards
+            query = Point(*([0.5] * dimension), 1)
+            self.assertEqual(del_tri.locate(query, jump=True),
+                             del_tri.locate(query))
+            for point in points[20:]:
+                del_tri.delaunay_remove(point, homogeneous=False)
+            self.assertEqual(len(del_tri.faces), 1)
+            del_tri.delaunay_add(points[0], homogeneous=False)
+            self.assertEqual(len(del_tri.faces), dimension + 1)
+        self.assertRaises(KeyError, del_tri.delaunay_remove, points[1],
+                          homogeneous=False)
+
+    def test_save_load(self):
+        """Either engine opens what either one saved, and carries on"""
+        rand = np.random.RandomState(24)
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'saved')
+        try:
+            for dimension in (2, 3):
+                arr = rand.uniform(-10, 10, (60, dimension))
+                for engine in (DelT, ArrayDelT):
+                    del_tri = engine.from_array(arr, seed=1)
+                    del_tri.delaunay_remove(Point(*arr[4]), homogeneous=False)
+                    del_tri.save(path)
+                    for loader in (DelT, ArrayDelT):
+                        for mmap in (True, False):
+                            loaded = loader.load(path, mmap=mmap)
+                            self.assertEqual(loaded.face_point_sets(),
+                                             del_tri.face_point_sets())
+                            self.assertEqual(*(
+                                {frozenset(row) for row in
+                                 tri.simplex_indices().tolist()}
+                                for tri in (loaded, del_tri)))
+                            self.assertTrue(loaded.test_is_delaunay())
+                            duplicate = loaded.delaunay_add(
+                                Point(*arr[9]), homogeneous=False)
+                            self.assertEqual(duplicate.input_index, 9)
+                            loaded.delaunay_add(Point(*[0.5] * dimension),
+                                                homogeneous=False)
+                            loaded.delaunay_remove(Point(*arr[0]),
+                                                   homogeneous=False)
+                            self.assertTrue(loaded.test_is_delaunay())
+            loaded = ArrayDelT.load(path)
+            self.assertIsInstance(loaded.mesh.coords, np.memmap)
+            # Queries do not need the point index filled in
+            vertex = loaded.nearest_vertex(Point(*arr[7]), homogeneous=False)
+            self.assertEqual(vertex.input_index, 7)
+            self.assertTrue(loaded.point_index._pending)
+            self.assertEqual(len(Voronoi(loaded).points),
+                             len(del_tri.simplex_indices()))
+            with open(path, 'r+b') as saved:
+                saved.write(b'nope')
+            self.assertRaises(ValueError, ArrayDelT.load, path)
+            with open(path, 'r+b') as saved:
+                saved.write(storage.MAGIC + bytes([storage.VERSION + 1]))
+            self.assertRaises(ValueError, ArrayDelT.load, path)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_load_then_remove(self):
+        """The array engine can empty out what the object engine saved"""
+        rand = np.random.RandomState(3)
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'saved')
+        try:
+            for dimension in (2, 3):
+                arr = rand.uniform(-10, 10, (40, dimension))
+                DelT.from_array(arr, seed=1).save(path)
+                loaded = ArrayDelT.load(path)
+                for row in arr[:-1]:
+                    loaded.delaunay_remove(Point(*row), homogeneous=False)
+                    self.assertTrue(loaded.test_is_delaunay())
+                self.assertEqual(len(loaded.simplex_indices()), 0)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_move(self):
+        """Moved vertices end up where a fresh triangulation puts them"""
+        rand = random.Random(13)
+        for dimension in (2, 3):
+            points = [Point(*(rand.uniform(-10, 10)
+                              for i in range(dimension)))
+                      for j in range(40)]
+            del_tri = ArrayDelT(points, homogeneous=False, hierarchy=True,
+                                seed=3)
+            # A few vertices move one at a time (small moves mostly in
+            # place, big ones not), and so does a whole frame of a small
+            # triangulation. Otherwise a whole frame rebuilds.
+            for minimum, count, scale in ((0, 5, 0.01), (0, 5, 5),
+                                          (0, 40, 0.01), (0, 40, 5),
+                                          (500, 40, 0.01), (500, 40, 5)):
+                del_tri.REBUILD_MIN_VERTICES = minimum
+                new_points = [Point(*(x + rand.gauss(0, scale) for x in pt))
+                              for pt in points[:count]] + points[count:]
+                with mock.patch.object(del_tri, '_rebuild',
+                                       wraps=del_tri._rebuild) as rebuild:
+                    moved = del_tri.move_many(points[:count],
+                                              new_points[:count],
+                                              homogeneous=False)
+                self.assertEqual(rebuild.called, minimum == 0 and count == 40)
+                self.assertEqual([vert.input_index for vert in moved],
+                                 list(range(count)))
+                points = new_points
+                self.assertTrue(del_tri.test_is_delaunay())
+                self.assertEqual(
+                    del_tri.face_point_sets(),
+                    DelT(points, homogeneous=False).face_point_sets())
+                for level in del_tri._levels:
+                    self.assertTrue(level.test_is_delaunay())
+            # Swapping two vertices
+            moved = del_tri.move_many(points[:2], points[1::-1],
+                                      homogeneous=False)
+            self.assertEqual([vert.input_index for vert in moved], [0, 1])
+            self.assertEqual(moved[0].point, points[1].lift(lambda x: 1))
+            far = Point(*([20] * dimension))
+            vertex = del_tri.move_vertex(points[2], far, homogeneous=False)
+            self.assertEqual(vertex.point, far.lift(lambda x: 1))
+            self.assertEqual(vertex.input_index, 2)
+            self.assertTrue(del_tri.test_is_delaunay())
+            # Moving onto another vertex merges them
+            del_tri.move_vertex(far, points[3], homogeneous=False)
+            self.assertEqual(len(del_tri.point_history), 39)
+        self.assertRaises(KeyError, del_tri.move_vertex, far, points[3],
+                          homogeneous=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
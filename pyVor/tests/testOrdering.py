@@ -0,0 +1,42 @@
+"""Unit tests for the insertion orders."""
+
+import unittest
+import random
+from itertools import product
+
+import numpy as np
+
+from pyVor.ordering import hilbert_keys, morton_keys, insertion_order
+
+
+class OrderingTestCase(unittest.TestCase):
+
+    def test_hilbert_keys(self):
+        """Consecutive cells along the curve are always neighbors"""
+        for dimension, bits in ((2, 3), (3, 2), (4, 2)):
+            grid = np.array(list(product(range(1 << bits),
+                                         repeat=dimension)), dtype=float)
+            keys = hilbert_keys(grid, bits)
+            self.assertEqual(sorted(keys.tolist()), list(range(len(grid))))
+            steps = np.diff(grid[np.argsort(keys)], axis=0)
+            self.assertTrue(np.all(np.abs(steps).sum(axis=1) == 1))
+
+    def test_morton_keys(self):
+        keys = morton_keys([[0, 0], [1, 0], [0, 1], [1, 1]], 1)
+        self.assertEqual(keys.tolist(), [0, 2, 1, 3])
+
+    def test_insertion_order(self):
+        """Every order is a permutation, and seeds make them repeatable"""
+        rand = random.Random(8)
+        coords = [[rand.random() for i in range(3)] for j in range(200)]
+        self.assertEqual(insertion_order(coords, 'input'), list(range(200)))
+        for order in ('random', 'hilbert', 'morton'):
+            indices = insertion_order(coords, order, random.Random(1))
+            self.assertEqual(sorted(indices), list(range(200)))
+            self.assertEqual(
+                indices, insertion_order(coords, order, random.Random(1)))
+        self.assertRaises(ValueError, insertion_order, coords, 'sorted')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,9 +4,16 @@ Some of these are relics from an older design.
 """
 
 import unittest
+import random
+from fractions import Fraction
+
+import numpy as np
 
 from pyVor.primitives import Point, Vector
 from pyVor.predicates import incircle, ccw
+from pyVor.predicates import filter_stats, reset_filter_stats, exact_sign_det
+from pyVor.predicates import ccw_coords, incircle_coords, filtered_sign_det
+from pyVor.predicates import ccw_many, incircle_many
 
 
 class PredicatesTestCase(unittest.TestCase):
@@ -261,5 +268,115 @@ class PredicatesTestCase(unittest.TestCase):
             self.assertEqual(ccw(Point(0, 1, 0), Point(-1, -1, 0), query), 1)
             self.assertEqual(ccw(Point(1, 0, 0), Point(0, 1, 0), query), 1)
 
+    def test_near_degenerate(self):
+        """The floating point filter must hand hard cases to exact math."""
+        reset_filter_stats()
+        # Points on the line y = x really are colinear, even though
+        # floating point determinants tend to disagree.
+        for a, b, c in [(0.1, 0.2, 0.3), (1e-17, 3.7, 1e17), (0.7, 0.3, 11)]:
+            self.assertEqual(ccw(Point(a, a), Point(b, b), Point(c, c),
+                                 homogeneous=False), 0)
+        self.assertEqual(filter_stats['ccw'], 3)
+        self.assertEqual(filter_stats['ccw_exact'], 3)
+
+        # Tiny perturbations of a colinear triple, checked against the
+        # exact determinant.
+        ulp = 2.0 ** -53
+        for i in range(8):
+            for j in range(8):
+                rows = [(0.5 + i * ulp, 0.5 + j * ulp, 1), (12, 12, 1),
+                        (24, 24, 1)]
+                expected = exact_sign_det(
+                    [[Fraction(x) for x in row] for row in rows])
+                self.assertEqual(ccw(*(Point(*row) for row in rows)),
+                                 expected)
+
+        # Nearly cocircular points
+        tiny = 2.0 ** -50
+        self.assertEqual(incircle(self.homo_east, self.homo_north,
+                                  self.homo_west, Point(0, -1 + tiny, 1)), 1)
+        self.assertEqual(incircle(self.homo_east, self.homo_north,
+                                  self.homo_west, Point(0, -1 - tiny, 1)), -1)
+        self.assertGreater(filter_stats['incircle_exact'], 0)
+
+        # Easy cases should never need the fallback
+        reset_filter_stats()
+        self.assertEqual(ccw(self.homo_north, self.homo_south,
+                             self.homo_east), 1)
+        self.assertEqual(filter_stats['ccw_exact'], 0)
+
+    def test_closed_forms(self):
+        """The 2D and 3D kernels must agree with the general determinant."""
+        rand = random.Random(7)
+
+        def general_ccw(rows):
+            if not any(row[-1] == 1 for row in rows):
+                return general_ccw([row + [1] for row in rows] +
+                                   [[0] * (len(rows[0]) - 1) + [-1, 1]])
+            return filtered_sign_det(rows, 'general')
+
+        def general_incircle(rows):
+            rows = [[x * 1000000000 for x in row[:-1]] + [1]
+                    if row[-1] == 0 else row for row in rows]
+            return -filtered_sign_det(
+                [row + [sum(x * x for x in row[:-1])] for row in rows],
+                'general')
+
+        for dimension in (2, 3):
+            for trial in range(200):
+                rows = [[rand.uniform(-5, 5) for i in range(dimension)] +
+                        [rand.choice([0, 1, 1])]
+                        for j in range(dimension + 2)]
+                self.assertEqual(ccw_coords(*rows[1:]),
+                                 general_ccw(rows[1:]))
+                self.assertEqual(incircle_coords(*rows),
+                                 general_incircle(rows))
+        # Rows can be tuples or numpy arrays, too
+        rows = np.array([(1, 0, 1), (0, 1, 1), (-1, 0, 1), (0, 0, 1)],
+                        dtype=float)
+        self.assertEqual(incircle_coords(*rows), 1)
+        self.assertEqual(ccw_coords(*map(tuple, rows[:3])), 1)
+        self.assertEqual(ccw_coords((0, 1, 0), (-1, -1, 0), (1, 0, 0)), 1)
+
+    def test_batches(self):
+        """ccw_many and incircle_many must agree with ccw and incircle."""
+        rand = random.Random(11)
+        for dimension in (1, 2, 3, 4):
+            stack = np.array([[[rand.uniform(-5, 5) for i in range(dimension)]
+                               + [rand.choice([0, 1, 1, 1])]
+                               for j in range(dimension + 2)]
+                              for k in range(50)])
+            # Make a few of them degenerate
+            stack[:5, 0] = stack[:5, 1]
+            circles = incircle_many(stack)
+            orientations = ccw_many(stack[:, 1:])
+            self.assertEqual(circles.dtype, np.int8)
+            self.assertEqual(orientations.shape, (50,))
+            for points, circle, orientation in zip(stack, circles,
+                                                   orientations):
+                points = [Point(*row) for row in points]
+                self.assertEqual(circle, incircle(*points))
+                self.assertEqual(orientation, ccw(*points[1:]))
+        stack = [[(1, 0), (0, 1), (-1, 0), (0, 0)],
+                 [(1, 0), (0, 1), (-1, 0), (0, 5)]]
+        self.assertEqual(list(incircle_many(stack, homogeneous=False)),
+                         [1, -1])
+        self.assertEqual(list(ccw_many([s[:3] for s in stack],
+                                       homogeneous=False)), [1, 1])
+        self.assertEqual(len(ccw_many(np.zeros((0, 3, 3)))), 0)
+        self.assertRaises(ValueError, ccw_many, np.zeros((2, 4, 3)))
+        self.assertRaises(ValueError, incircle_many, np.zeros((2, 3, 3)))
+
+    def test_exact_sign_det(self):
+        """Exact determinants for a few small matrices"""
+        self.assertEqual(exact_sign_det([[1, 2], [3, 4]]), -1)
+        self.assertEqual(exact_sign_det([[0, 1], [1, 0]]), -1)
+        self.assertEqual(exact_sign_det([[2, 4], [1, 2]]), 0)
+        self.assertEqual(exact_sign_det([[0, 0, 1], [0, 1, 0], [1, 0, 0]]),
+                         -1)
+        self.assertEqual(exact_sign_det([[-1, 0, 0], [0, -1, 0],
+                                         [0, 0, 3]]), 1)
+        self.assertRaises(ValueError, exact_sign_det, [[1, 2]])
+
 if __name__ == "__main__":
     unittest.main()
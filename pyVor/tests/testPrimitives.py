@@ -276,6 +276,15 @@ class PointTestCase(unittest.TestCase):
         self.assertEqual(self.b.to_vector(), Vector(1, 2))
         self.assertNotEqual(self.b.to_vector(), Vector(1, 2, 0))
 
+    def test_to_array(self):
+        """The array of a point can't be used to change the point"""
+        point = Point(1, 2, 3)
+        before = hash(point)
+        with self.assertRaises(ValueError):
+            point.to_array()[0] = 5
+        self.assertEqual(point, Point(1, 2, 3))
+        self.assertEqual(hash(point), before)
+
     def test_hashing(self):
         """Make sure point hashing works and does not cause collisions"""
         # Add 400 points' hashes to a set and make sure 400 things are in the
@@ -288,6 +297,9 @@ class PointTestCase(unittest.TestCase):
 
         self.assertEqual(hash(Point(0, 1, 2)),
                          hash(Point(0, 1, 2)))
+        # Equal points must hash equal, whatever their dtype
+        self.assertEqual(hash(Point(-2, 0, 1)),
+                         hash(Point(-2.0, -0.0, 1.0)))
 
 
 class MatrixTestCase(unittest.TestCase):
@@ -0,0 +1,128 @@
+"""Unit tests for the command line interface."""
+
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from pyVor.structures import DelaunayTriangulation as DelT
+from pyVor.triangulate import (batch, batch_inputs, read_array, read_text,
+                               result_path)
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        rand = np.random.RandomState(21)
+        self.points = {}
+        for name, dimension in (('a.txt', 2), ('b.txt', 3)):
+            points = rand.uniform(0, 1, (30, dimension))
+            with open(os.path.join(self.directory, name), 'w') as out:
+                out.write('# some points\n')
+                for row in points:
+                    out.write('({})\n'.format(' '.join(map(str, row))))
+            self.points[name] = points
+        with open(os.path.join(self.directory, 'bad.txt'), 'w') as out:
+            out.write('1 2\n3 4 5\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_batch(self):
+        paths = batch_inputs([self.directory])
+        self.assertEqual([os.path.basename(path) for path in paths],
+                         ['a.txt', 'b.txt', 'bad.txt'])
+        out = io.StringIO()
+        output = os.path.join(self.directory, 'out')
+        self.assertEqual(batch(paths, output, workers=2, out=out), 1)
+        summary = out.getvalue()
+        self.assertIn('3 files, 1 failed', summary)
+        self.assertEqual(summary.count('failed:'), 1)
+        for name, points in self.points.items():
+            path = os.path.join(self.directory, name)
+            self.assertIn(path, summary)
+            with open(result_path(path, output)) as result:
+                simplices = {frozenset(map(int, line.split()))
+                             for line in result}
+            expected = DelT.from_array(points).simplex_indices()
+            self.assertEqual(simplices,
+                             {frozenset(row) for row in expected.tolist()})
+        # A manifest, with paths relative to it
+        manifest = os.path.join(self.directory, 'list')
+        with open(manifest, 'w') as out:
+            out.write('a.txt\n\nb.txt\n')
+        self.assertEqual(batch_inputs([], [manifest]),
+                         [os.path.join(self.directory, name)
+                          for name in ('a.txt', 'b.txt')])
+        self.assertEqual(batch(batch_inputs([], [manifest]), output,
+                               out=io.StringIO()), 0)
+
+    def test_read_array(self):
+        points = read_text(['(1 2)\n', '\n', 'x\n', '3.5, -4\n', '5 6'],
+                           chunk=2)
+        self.assertTrue(np.array_equal(points, [[1, 2], [3.5, -4], [5, 6]]))
+        self.assertRaises(ValueError, read_text, ['1 2\n', '3 4 5\n'])
+        # Ragged lines are caught even when the total adds up
+        with self.assertRaisesRegex(ValueError, 'line 4'):
+            read_text(['1 2\n', 'x\n', '3 4\n', '5 6 7\n', '8\n'],
+                      chunk=3)
+        self.assertRaises(ValueError, read_text, ['no points\n'])
+        points = self.points['b.txt']
+        self.assertTrue(np.array_equal(
+            read_array(os.path.join(self.directory, 'b.txt')), points))
+        path = os.path.join(self.directory, 'b.npy')
+        np.save(path, points)
+        self.assertTrue(np.array_equal(read_array(path), points))
+        path = os.path.join(self.directory, 'b.bin')
+        points.astype('<f8').tofile(path)
+        self.assertTrue(np.array_equal(read_array(path, dimension=3),
+                                       points))
+        self.assertTrue(np.array_equal(
+            read_array(path, 'binary', dimension=2), points.reshape(-1, 2)))
+        self.assertRaises(ValueError, read_array, path)
+        self.assertRaises(ValueError, read_array, path, dimension=4)
+        self.assertRaises(ValueError, read_array, path, 'csv')
+
+    def test_degenerate(self):
+        collinear = ''.join('{0} {0}\n'.format(x) for x in range(5))
+        result = subprocess.run(
+            [sys.executable, '-m', 'pyVor.triangulate'],
+            input=collinear.encode(), stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        self.assertEqual(result.returncode, 1)
+        self.assertIn(b'might not have worked', result.stderr)
+        path = os.path.join(self.directory, 'line.txt')
+        with open(path, 'w') as out:
+            out.write(collinear)
+        out = io.StringIO()
+        self.assertEqual(batch([path], out=out), 1)
+        self.assertIn('not a Delaunay triangulation', out.getvalue())
+        self.assertTrue(os.path.exists(result_path(path)))
+
+    def test_stdin_npy(self):
+        points = self.points['a.txt']
+        path = os.path.join(self.directory, 'a.npy')
+        np.save(path, points)
+        with open(path, 'rb') as saved:
+            data = saved.read()
+        for args in (['-f', 'npy'], ['-f', 'npy', '-']):
+            # A pipe, which np.load cannot seek in
+            result = subprocess.run(
+                [sys.executable, '-m', 'pyVor.triangulate'] + args,
+                input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                check=True)
+            simplices = {frozenset(map(int, line.split()))
+                         for line in result.stdout.decode().splitlines()}
+            expected = DelT.from_array(points).simplex_indices()
+            self.assertEqual(simplices,
+                             {frozenset(row) for row in expected.tolist()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,8 +2,10 @@
 
 import unittest
 
+import numpy as np
+
 from pyVor.primitives import Point
-from pyVor.utils import circumcenter
+from pyVor.utils import circumcenter, circumcenters
 
 
 class UtilsTestCase(unittest.TestCase):
@@ -48,5 +50,35 @@ class UtilsTestCase(unittest.TestCase):
                          0)
 """
 
+
+class CircumCentersTestCase(unittest.TestCase):
+
+    def testCircumCenters(self):
+        """The batch version agrees with circumcenter"""
+        rand = np.random.RandomState(16)
+        for dimension in (1, 2, 3, 4):
+            coords = rand.uniform(-10, 10, (20, dimension + 1, dimension))
+            centers = circumcenters(coords)
+            self.assertEqual(centers.shape, (20, dimension))
+            for simplex, center in zip(coords, centers):
+                expected = circumcenter(*(Point(*row) for row in simplex),
+                                        homogeneous=False)
+                self.assertTrue(np.allclose(center, expected.to_array()))
+        # Flat simplices are flagged with nans
+        centers = circumcenters([[[1, 0], [0, 1], [0, -1]],
+                                 [[0, 0], [1, 1], [2, 2]]])
+        self.assertTrue(np.array_equal(centers[0], [0, 0]))
+        self.assertTrue(np.isnan(centers[1]).all())
+        # Homogeneous points, including an infinite one
+        centers = circumcenters([[[2, 3, 1], [3, 2, 1], [2, 1, 1]],
+                                 [[3, 4, 1], [-3, 4, 1], [1, 0, 0]]],
+                                homogeneous=True)
+        self.assertTrue(np.array_equal(centers[0], [2, 2, 1]))
+        expected = circumcenter(Point(3, 4, 1), Point(-3, 4, 1),
+                                Point(1, 0, 0))
+        self.assertTrue(np.allclose(centers[1], expected.to_array()))
+        self.assertEqual(circumcenters(np.zeros((0, 3, 2))).shape, (0, 2))
+
+
 if __name__ == "__main__":
     unittest.main()
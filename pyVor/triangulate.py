@@ -1,14 +1,51 @@
 #!/usr/bin/env python3
 
-"""This should be the main command line interface to our project."""
+"""This should be the main command line interface to our project.
+
+With no arguments, one set of points is read from stdin, and its simplices
+go to stdout (or to --output). Given files, directories (every file in them)
+or --manifest files (one path per line), each point file is triangulated in a
+pool of worker processes, and its simplices are written next to it (or in the
+--output directory), with the name of the input plus one of RESULT_SUFFIXES.
+
+The exit status is 1 if any result fails test_is_delaunay (which it can on
+degenerate input) or, for a batch, if any file could not be triangulated.
+
+The simplices are written as the positions of their points in the input
+(counting from 0, and skipping lines of text without any digits), in one of
+the formats of pyVor.export (see --to).
+
+Points can come as text (a point per line, with the coordinates separated by
+whitespace or commas), as .npy files, or as raw little-endian float64 binary
+(which needs --dimension). Either way they end up in one array, which goes
+to ArrayDelaunayTriangulation.from_array.
+"""
 
 import argparse
-import sys
+import io
+import os
 import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
 
-from pyVor.structures import DelaunayTriangulation as DelT
+from pyVor.export import FORMATS as OUTPUT_FORMATS
+from pyVor.export import format_for, write_simplices
+from pyVor.mesh import ArrayDelaunayTriangulation as ArrayDelT
 from pyVor.primitives import Point
 
+RESULT_SUFFIXES = {'text': '.simplices', 'npy': '.simplices.npy',
+                   'off': '.off', 'ply': '.ply'}
+FORMATS = ('text', 'npy', 'binary')
+# File extensions for the formats, when --format is not given
+EXTENSIONS = {'.npy': 'npy', '.bin': 'binary', '.f64': 'binary',
+              '.raw': 'binary'}
+# How many lines of text to convert at a time
+CHUNK_LINES = 1 << 16
+
 
 def line_to_point(line):
     """Convert a line of user input to a point.
@@ -20,6 +57,183 @@ def line_to_point(line):
     return Point(*(float(x) for x in line.split()))
 
 
+def read_text(lines, chunk=CHUNK_LINES):
+    """The points on the lines that have any digits on them, as an array
+
+    The lines are converted a chunk at a time: numpy turns all of the
+    numbers in a chunk into floats in one go. Raises ValueError (with the
+    line number) for a line with a different number of coordinates than
+    the first one.
+    """
+    not_empty = re.compile(r'\d')
+    separators = str.maketrans('(),', '   ')
+    lines = iter(lines)
+    blocks = []
+    width = None
+    start = 1  # the number of the first line of the chunk
+    while True:
+        raw = list(islice(lines, chunk))
+        if not raw:
+            break
+        block = [line for line in raw if not_empty.search(line)]
+        if block:
+            # Lines are kept apart by NULs, to count the numbers on each
+            text = '\0'.join(block).translate(separators)
+            rows = text.split('\0')
+            counts = np.fromiter(map(len, map(str.split, rows)),
+                                 dtype=np.int64, count=len(rows))
+            if width is None:
+                width = int(counts[0])
+            wrong = np.flatnonzero(counts != width)
+            if len(wrong):
+                bad = block[wrong[0]]
+                number = start + next(k for k, line in enumerate(raw)
+                                      if line is bad)
+                raise ValueError(
+                    "Expected {} coordinates on line {}, not {}".format(
+                        width, number, counts[wrong[0]]))
+            values = np.array(text.replace('\0', ' ').split(), dtype=float)
+            blocks.append(values.reshape(len(block), width))
+        start += len(raw)
+    if not blocks:
+        raise ValueError("No points in the input")
+    return np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+
+
+def read_array(path, format=None, dimension=None):
+    """The points in a file (or stdin for '-') as an (n, d) array
+
+    format is one of FORMATS, and is guessed from the extension if it is not
+    given. .npy files are memory-mapped, and so are binary ones, which need
+    the dimension since they are just the coordinates one after another.
+    """
+    if format is None:
+        format = EXTENSIONS.get(os.path.splitext(path)[1].lower(), 'text')
+    if format not in FORMATS:
+        raise ValueError("format must be one of {}, not {!r}".format(
+            ', '.join(FORMATS), format))
+    if format == 'text':
+        if path == '-':
+            return read_text(sys.stdin)
+        with open(path) as lines:
+            return read_text(lines)
+    if format == 'npy':
+        if path == '-':
+            # np.load needs to seek, which a pipe cannot
+            arr = np.load(io.BytesIO(sys.stdin.buffer.read()))
+        else:
+            arr = np.load(path, mmap_mode='r')
+    else:
+        if not dimension:
+            raise ValueError("Binary input needs the dimension")
+        if path == '-':
+            arr = np.frombuffer(sys.stdin.buffer.read(), dtype='<f8')
+        else:
+            arr = np.memmap(path, dtype='<f8', mode='r')
+        if len(arr) % dimension:
+            raise ValueError("{} numbers do not make {}-dimensional "
+                             "points".format(len(arr), dimension))
+        arr = arr.reshape(-1, dimension)
+    if arr.ndim != 2:
+        raise ValueError("Expected an (n, d) array, not {}".format(
+            arr.shape))
+    return arr
+
+
+def result_path(path, output=None, to='text'):
+    """Where the result (in the format to) for the point file at path goes"""
+    return os.path.join(os.path.dirname(path) if output is None else output,
+                        os.path.basename(path) + RESULT_SUFFIXES[to])
+
+
+def write_result(out, del_tri, points, homogeneous=False, to=None):
+    """Write the simplices of del_tri, built from the array points, to out
+
+    See pyVor.export.write_simplices.
+    """
+    if homogeneous:
+        points = points[:, :-1] / points[:, -1:]
+    write_simplices(out, del_tri.simplex_indices(), points, to)
+
+
+def batch_inputs(paths, manifests=()):
+    """The point files named by paths and manifests, in order
+
+    Directories stand for the files in them (but not earlier results), and
+    manifests list one path per line, relative to the manifest.
+    """
+    for manifest in manifests:
+        with open(manifest) as lines:
+            base = os.path.dirname(manifest)
+            paths = list(paths) + [os.path.join(base, line.strip())
+                                   for line in lines if line.strip()]
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if os.path.isfile(os.path.join(path, name)) and
+                not name.endswith(tuple(RESULT_SUFFIXES.values())))
+        else:
+            files.append(path)
+    return files
+
+
+def triangulate_file(path, output=None, homogeneous=False, format=None,
+                     dimension=None, to='text'):
+    """Triangulate one point file and write its result file
+
+    This is what each worker of a batch runs, so it reports rather than
+    raises: it returns (path, points, simplices, seconds, error), with
+    error None if all went well. A result that fails test_is_delaunay (on
+    degenerate input, say) is still written, but counts as an error.
+    """
+    start = time.perf_counter()
+    count = simplices = 0
+    try:
+        points = read_array(path, format, dimension)
+        count = len(points)
+        del_tri = ArrayDelT.from_array(points, homogeneous=homogeneous)
+        simplices = len(del_tri.simplex_indices())
+        write_result(result_path(path, output, to), del_tri, points,
+                     homogeneous, to)
+        error = (None if del_tri.test_is_delaunay() else
+                 'the result is not a Delaunay triangulation')
+    except Exception as exception:
+        error = '{}: {}'.format(type(exception).__name__, exception)
+    return path, count, simplices, time.perf_counter() - start, error
+
+
+def batch(paths, output=None, homogeneous=False, workers=None, format=None,
+          dimension=None, to='text', out=sys.stdout):
+    """Triangulate each point file in paths in a process pool
+
+    format and dimension are as for read_array, and to is the format of the
+    results. Prints a line per file (in the order of paths) and a total to
+    out, and returns the number of files that failed.
+    """
+    if output is not None:
+        os.makedirs(output, exist_ok=True)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(triangulate_file, path, output,
+                                   homogeneous, format, dimension, to)
+                   for path in paths]
+        results = [future.result() for future in futures]
+    print('{:>9} {:>9} {:>9}  {}'.format('points', 'simplices', 'seconds',
+                                         'file'), file=out)
+    failures = 0
+    for path, points, simplices, seconds, error in results:
+        print('{:>9} {:>9} {:>9.3f}  {}'.format(points, simplices, seconds,
+                                                path), file=out)
+        if error is not None:
+            failures += 1
+            print('{:>30}  failed: {}'.format('', error), file=out)
+    print('{} files, {} failed, {:.3f} seconds'.format(
+        len(results), failures, time.perf_counter() - start), file=out)
+    return failures
+
+
 def main():
     """See argument parser or output of --help"""
     parser = argparse.ArgumentParser(
@@ -30,18 +244,52 @@ def main():
     parser.add_argument("-g", "--homogeneous", action='store_true',
                         help="Set this flag if the input has homogeneous "
                         "coordinates already.")
+    parser.add_argument("inputs", nargs='*',
+                        help="Point files, or directories of them, to "
+                        "triangulate in a batch instead of reading stdin "
+                        "(which a lone - also stands for).")
+    parser.add_argument("-m", "--manifest", action='append', default=[],
+                        help="A file listing point files, one per line.")
+    parser.add_argument("-o", "--output",
+                        help="Directory for the results of a batch (by "
+                        "default, next to each input), or the file for the "
+                        "result for stdin (by default, stdout).")
+    parser.add_argument("-t", "--to", choices=OUTPUT_FORMATS,
+                        help="Format of the results (by default text, or "
+                        "going by the extension of --output for stdin).")
+    parser.add_argument("-j", "--workers", type=int,
+                        help="Number of processes for a batch (by default, "
+                        "one per CPU), or to build the triangulation of "
+                        "stdin with (see pyVor.parallel).")
+    parser.add_argument("-f", "--format", choices=FORMATS,
+                        help="Format of the input (by default, .npy files "
+                        "are npy, .bin, .f64 and .raw are binary and "
+                        "anything else is text).")
+    parser.add_argument("-d", "--dimension", type=int,
+                        help="Number of coordinates per point, for binary "
+                        "input (including the homogeneous one, with -g).")
     args = parser.parse_args()
-    # I'm happy with no arguments for now. Let's just do sys.stdin.
-    not_empty = re.compile(r'.*\d+.*')
-    points = []
-    for line in sys.stdin:
-        if not_empty.match(line):
-            points.append(line_to_point(line))
-    del_tri = DelT(points, homogeneous=args.homogeneous)
+    if args.inputs == ['-'] and not args.manifest:
+        args.inputs = []
+    if args.inputs or args.manifest:
+        paths = batch_inputs(args.inputs, args.manifest)
+        if not paths:
+            parser.error("no point files to triangulate")
+        failures = batch(paths, args.output, args.homogeneous, args.workers,
+                         args.format, args.dimension, args.to or 'text')
+        sys.exit(1 if failures else 0)
+    try:
+        points = read_array('-', args.format or 'text', args.dimension)
+    except ValueError as error:
+        parser.error(str(error))
+    del_tri = ArrayDelT.from_array(points, homogeneous=args.homogeneous,
+                                   workers=args.workers)
+    output = args.output or '-'
+    write_result(output, del_tri, points, args.homogeneous,
+                 args.to or format_for(output))
     if not del_tri.test_is_delaunay():
-        print("It might not have worked. Oh, well!")
-    print("Done!")  # I'm so mean. TODO output something reasonable here.
-    exit(1337)
+        print("It might not have worked. Oh, well!", file=sys.stderr)
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
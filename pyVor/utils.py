@@ -5,8 +5,16 @@ These are different from predicates in that they are,
 well, not linear predicates.
 """
 
+from itertools import permutations
+from math import factorial
+
+import numpy as np
+
 from pyVor.primitives import Point, Vector, Matrix
 
+# Simplices flatter than this (relative to their size) have no circumcenter
+DEGENERATE_TOLERANCE = 1e-12
+
 
 def circumcenter(*points, homogeneous=True):
     """Computes a circumcenter for a set of n+1 points in n dimensions,
@@ -39,3 +47,120 @@ def circumcenter(*points, homogeneous=True):
     # If the arguments had homogeneous coordinates, we want to tack the extra
     # coordinate back on:
     return Point(*x, *([1] if homogeneous else []))
+
+
+def circumcenters(simplex_coords, homogeneous=False):
+    """Circumcenters of m simplices at once, as an (m, d) array
+
+    simplex_coords is an (m, d+1, d) array, the points of each simplex in
+    R^d. All of the linear systems are solved with one call to
+    np.linalg.solve. Degenerate (flat) simplices get a row of nans instead
+    of an error.
+
+    Lower dimensional simplices work too: for an (m, k+1, d) array with
+    k < d, each center is the one in the affine hull of the simplex (the
+    midpoint of an edge, say). Any number of leading axes can stand in for
+    m.
+
+    With homogeneous=True the points have an extra coordinate, which is
+    handled like circumcenter does: infinite points (last coordinate 0) are
+    put very far away, and the centers get a coordinate of 1 tacked on.
+    """
+    coords = np.asarray(simplex_coords, dtype=float)
+    shape = coords.shape
+    if homogeneous:
+        weights = coords[..., -1:]
+        coords = np.where(weights == 0, coords[..., :-1] * 1000000000,
+                          coords[..., :-1] / np.where(weights == 0, 1,
+                                                      weights))
+    coords = coords.reshape((-1,) + coords.shape[-2:])
+    size, dimension = coords.shape[1] - 1, coords.shape[2]
+    # Solve for the center relative to the first point
+    vectors = coords[:, 1:] - coords[:, :1]
+    b = 0.5 * (vectors ** 2).sum(axis=2)
+    # Compare the volume to the largest it could be for edges that long
+    scale = np.sqrt(2 * b).prod(axis=1)
+    if size == dimension:
+        system = vectors
+    else:  # find the combination of the edge vectors instead
+        system = vectors @ vectors.transpose(0, 2, 1)
+        scale = scale ** 2
+    flat = np.abs(np.linalg.det(system)) <= DEGENERATE_TOLERANCE * scale
+    system[flat] = np.eye(size)
+    centers = np.linalg.solve(system, b[..., None])[..., 0]
+    if size != dimension:
+        centers = (centers[:, None] @ vectors)[:, 0]
+    centers += coords[:, 0]
+    centers[flat] = np.nan
+    if homogeneous:
+        centers = np.hstack([centers, np.ones((len(centers), 1))])
+    return centers.reshape(shape[:-2] + centers.shape[-1:])
+
+
+def clip_polygon(polygon, low, high):
+    """Clip a convex polygon, a (k, 2) array of its corners in order, to the
+    box with opposite corners low and high (Sutherland-Hodgman)
+    """
+    polygon = np.asarray(polygon, dtype=float).reshape(-1, 2)
+    for axis in range(2):
+        for bound, side in ((low[axis], 1), (high[axis], -1)):
+            inside = side * (polygon[:, axis] - bound) >= 0
+            clipped = []
+            for k in range(len(polygon)):
+                here, there = polygon[k], polygon[(k + 1) % len(polygon)]
+                if inside[k]:
+                    clipped.append(here)
+                if inside[k] != inside[(k + 1) % len(polygon)]:
+                    t = (bound - here[axis]) / (there[axis] - here[axis])
+                    clipped.append(here + t * (there - here))
+            polygon = np.array(clipped).reshape(-1, 2)
+    return polygon
+
+
+def polygon_area_centroid(polygon):
+    """The signed area (positive if counterclockwise) and the centroid of a
+    polygon, given as a (k, 2) array of its corners in order
+    """
+    x, y = np.asarray(polygon, dtype=float).reshape(-1, 2).T
+    x_next, y_next = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y_next - x_next * y
+    area = cross.sum() / 2
+    if area == 0:
+        return 0.0, np.full(2, np.nan)
+    return area, np.array([((x + x_next) * cross).sum(),
+                           ((y + y_next) * cross).sum()]) / (6 * area)
+
+
+def voronoi_pieces(simplex_coords, centers=None):
+    """The pieces of the Voronoi cells of its corners that each simplex of a
+    Delaunay triangulation accounts for
+
+    simplex_coords is an (m, d+1, d) array (see circumcenters, whose result
+    can be passed as centers if it is at hand). The piece of the cell of a
+    corner is cut into the simplices whose corners are that corner, and then
+    the circumcenters of an edge, a triangle and so on up to the whole
+    simplex, all containing it. Their signed volumes (negative where a
+    circumcenter is outside of its simplex) over all of the simplices
+    around a site add up to the volume of its cell.
+
+    Returns the volumes of the pieces as an (m, d+1) array, and their first
+    moments (volume times centroid) as an (m, d+1, d) array.
+    """
+    coords = np.asarray(simplex_coords, dtype=float)
+    count, dimension = len(coords), coords.shape[2]
+    if centers is None:
+        centers = circumcenters(coords)
+    # All orders of the corners, grouped by the first one
+    chains = coords[:, np.array(list(permutations(range(dimension + 1))))]
+    simplices = np.stack(
+        [chains[:, :, 0]] +
+        [circumcenters(chains[:, :, :k + 1]) for k in range(1, dimension)] +
+        [np.broadcast_to(centers[:, None], chains.shape[:2] + (dimension,))],
+        axis=2)
+    sign = np.sign(np.linalg.det(chains[:, :, 1:] - chains[:, :, :1]))
+    volumes = (np.linalg.det(simplices[:, :, 1:] - simplices[:, :, :1]) *
+               sign / factorial(dimension))
+    moments = volumes[..., None] * simplices.mean(axis=2)
+    shape = (count, dimension + 1, factorial(dimension))
+    return (volumes.reshape(shape).sum(axis=2),
+            moments.reshape(shape + (dimension,)).sum(axis=2))